@@ -0,0 +1,339 @@
+"""
+Compact action log for the Virtual Economy Simulator.
+Every round's decisions are stored as one uint8 code per household, object agent, business and the
+government, together with the draws that shaped their outcomes (price adjustments, limit prices),
+in zlib-compressed chunks. Replay rebuilds any logged round without calling decide() or the LLM,
+and diff_logs finds the first round and the agents where two runs part ways.
+"""
+import types
+import zlib
+from bisect import bisect_right
+import numpy as np
+from checkpoint import write_checkpoint, read_checkpoint
+from population import ACTIONS
+
+FORMAT_VERSION = 2
+CHUNK_ROUNDS = 64  # Rounds per compressed chunk
+LEVEL = 6  # zlib compression level
+NO_ACTION = ''  # Code name of a government round without a policy move (decide() returned None)
+
+def param_values(params):
+    """
+    The upper-case settings of a config module or params namespace, as a dict.
+    """
+    return {name: getattr(params, name) for name in dir(params) if name.isupper()}
+
+class ActionLog:
+    """
+    One row of action codes per round: households first, then object agents, businesses and the
+    government. Codes index vocab, which starts with population.ACTIONS so household codes are
+    stored as they are. Each round also keeps its draws (float64, in the order step() consumed them).
+    Rows are compressed chunk_rounds at a time; keyframes (compressed Simulation checkpoints taken
+    before a round) let a Replay start near the round it is asked for.
+    """
+    def __init__(self, chunk_rounds=CHUNK_ROUNDS, start=0, params=None, level=LEVEL):
+        self.chunk_rounds = max(1, chunk_rounds)
+        self.start = start
+        self.params = params or {}
+        self.level = level
+        self.vocab = list(ACTIONS) + [NO_ACTION]
+        self._code_of = {name: code for code, name in enumerate(self.vocab)}
+        self.width = None  # Codes per round, fixed by the first round
+        self.chunks = []  # (first round, rounds, codes, draws, draw counts) as compressed bytes
+        self._firsts = []
+        self.keyframes = {}  # Round -> compressed checkpoint of the state before it
+        self._rows, self._draw_rows = [], []  # Finished rounds not compressed yet
+        self._codes, self._draws = [], []  # Parts of the round being recorded
+        self._cached = (None, None)  # Last decompressed chunk, for sequential reads
+
+    def __len__(self):
+        return self._pending_start() - self.start + len(self._rows)
+
+    @property
+    def stop(self):
+        """
+        Round after the last logged one.
+        """
+        return self.start + len(self)
+
+    def _pending_start(self):
+        if not self.chunks:
+            return self.start
+        first, rounds = self.chunks[-1][:2]
+        return first + rounds
+
+    # --- Recording (called by Economy.step) ---
+    def add_codes(self, codes):
+        self._codes.append(np.array(codes, dtype=np.uint8))
+
+    def add_actions(self, actions):
+        self._codes.append(np.fromiter((self._code(action) for action in actions), dtype=np.uint8, count=len(actions)))
+
+    def _code(self, action):
+        name = NO_ACTION if action is None else action
+        code = self._code_of.get(name)
+        if code is None:
+            if len(self.vocab) == 256:
+                raise ValueError("An action log holds at most 256 distinct actions")
+            code = self._code_of[name] = len(self.vocab)
+            self.vocab.append(name)
+        return code
+
+    def add_draws(self, values):
+        self._draws.append(np.array(values, dtype=np.float64).ravel())
+
+    def end_round(self):
+        row = np.concatenate(self._codes) if self._codes else np.empty(0, dtype=np.uint8)
+        if self.width is None:
+            self.width = len(row)
+        elif len(row) != self.width:
+            raise ValueError(f"Round has {len(row)} action codes, the log {self.width}")
+        self._rows.append(row)
+        self._draw_rows.append(np.concatenate([np.empty(0)] + self._draws))
+        self._codes, self._draws = [], []
+        if len(self._rows) == self.chunk_rounds:
+            self.chunks.append(self._compress())
+            self._firsts.append(self.chunks[-1][0])
+            self._rows, self._draw_rows = [], []
+
+    def _compress(self):
+        counts = np.array([len(draws) for draws in self._draw_rows], dtype=np.int64)
+        return (self._pending_start(), len(self._rows),
+                zlib.compress(np.stack(self._rows).tobytes(), self.level),
+                zlib.compress(np.concatenate(self._draw_rows).tobytes(), self.level),
+                zlib.compress(counts.tobytes(), self.level))
+
+    def restart(self, round_num, checkpoint):
+        """
+        Drop everything logged and go on from round_num, whose state checkpoint becomes the first keyframe.
+        """
+        self.start = round_num
+        self.chunks, self._firsts, self.keyframes = [], [], {}
+        self._rows, self._draw_rows, self._codes, self._draws = [], [], [], []
+        self._cached = (None, None)
+        self.add_keyframe(round_num, checkpoint)
+
+    def add_keyframe(self, round_num, checkpoint):
+        self.keyframes[round_num] = zlib.compress(checkpoint, self.level)
+
+    def keyframe(self, round_num):
+        """
+        (round, checkpoint bytes) of the latest keyframe at or before round_num, or None.
+        """
+        rounds = [r for r in self.keyframes if r <= round_num]
+        if not rounds:
+            return None
+        return max(rounds), zlib.decompress(self.keyframes[max(rounds)])
+
+    # --- Reading ---
+    def _chunk(self, i):
+        # (first round, codes, draws, draw offsets) of chunk i, or of the uncompressed rows for i == len(chunks)
+        if i == len(self.chunks):
+            counts = [len(draws) for draws in self._draw_rows]
+            codes = np.stack(self._rows) if self._rows else np.empty((0, self.width or 0), dtype=np.uint8)
+            return (self._pending_start(), codes, np.concatenate([np.empty(0)] + self._draw_rows),
+                    np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]))
+        if self._cached[0] != i:
+            first, rounds, codes, draws, counts = self.chunks[i]
+            counts = np.frombuffer(zlib.decompress(counts), dtype=np.int64)
+            self._cached = (i, (first, np.frombuffer(zlib.decompress(codes), dtype=np.uint8).reshape(rounds, -1),
+                                np.frombuffer(zlib.decompress(draws), dtype=np.float64),
+                                np.concatenate([[0], np.cumsum(counts)])))
+        return self._cached[1]
+
+    def blocks(self, start=None, stop=None):
+        """
+        Yield (first round, codes, draws, draw offsets) per chunk for rounds [start, stop): codes is
+        (rounds, width) uint8 and the draws of round first + k are draws[offsets[k]:offsets[k + 1]].
+        """
+        lo = self.start if start is None else max(start, self.start)
+        hi = self.stop if stop is None else min(stop, self.stop)
+        i = max(0, bisect_right(self._firsts, lo) - 1)
+        while lo < hi and i <= len(self.chunks):
+            first, codes, draws, offsets = self._chunk(i)
+            a, b = lo - first, min(hi - first, len(codes))
+            if a < b:
+                yield lo, codes[a:b], draws[offsets[a]:offsets[b]], offsets[a:b + 1] - offsets[a]
+                lo = first + b
+            i += 1
+
+    def window(self, start, stop):
+        """
+        (codes, draws, draw offsets) of rounds [start, stop), like one block of blocks().
+        """
+        parts = list(self.blocks(start, stop))
+        if len(parts) == 1:
+            return parts[0][1:]
+        if not parts:
+            return np.empty((0, self.width or 0), dtype=np.uint8), np.empty(0), np.zeros(1, dtype=np.int64)
+        offsets = [parts[0][3]]
+        for part in parts[1:]:
+            offsets.append(part[3][1:] + offsets[-1][-1])
+        return (np.concatenate([part[1] for part in parts]), np.concatenate([part[2] for part in parts]),
+                np.concatenate(offsets))
+
+    def round(self, round_num):
+        """
+        (codes, draws) of round_num.
+        """
+        if not self.start <= round_num < self.stop:
+            raise IndexError(f"Round {round_num} is not in the log")
+        codes, draws, offsets = self.window(round_num, round_num + 1)
+        return codes[0], draws
+
+    def actions(self, round_num):
+        """
+        The action names of round_num, in log order.
+        """
+        return [self.vocab[code] for code in self.round(round_num)[0]]
+
+    # --- Files ---
+    def save(self, path):
+        chunks = self.chunks + ([self._compress()] if self._rows else [])
+        arrays = {}
+        for i, (first, rounds, codes, draws, counts) in enumerate(chunks):
+            arrays[f"chunk/{i}/codes"] = np.frombuffer(codes, dtype=np.uint8)
+            arrays[f"chunk/{i}/draws"] = np.frombuffer(draws, dtype=np.uint8)
+            arrays[f"chunk/{i}/counts"] = np.frombuffer(counts, dtype=np.uint8)
+        for round_num, frame in self.keyframes.items():
+            arrays[f"keyframe/{round_num}"] = np.frombuffer(frame, dtype=np.uint8)
+        header = {'version': FORMAT_VERSION, 'start': self.start, 'chunk_rounds': self.chunk_rounds,
+                  'level': self.level, 'vocab': self.vocab, 'width': self.width, 'params': self.params,
+                  'chunks': [chunk[:2] for chunk in chunks]}
+        with open(path, 'wb') as f:
+            write_checkpoint(arrays, header, f)
+
+    @classmethod
+    def load(cls, path):
+        arrays, header = read_checkpoint(path)
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported action log version {header['version']}")
+        log = cls(header['chunk_rounds'], header['start'], header['params'], header['level'])
+        log.vocab = header['vocab']
+        log._code_of = {name: code for code, name in enumerate(log.vocab)}
+        log.width = header['width']
+        for i, (first, rounds) in enumerate(header['chunks']):
+            log.chunks.append((first, rounds) + tuple(arrays[f"chunk/{i}/{part}"].tobytes()
+                                                     for part in ('codes', 'draws', 'counts')))
+            log._firsts.append(first)
+        for name, frame in arrays.items():
+            if name.startswith('keyframe/'):
+                log.keyframes[int(name.split('/')[1])] = frame.tobytes()
+        return log
+
+class LogCursor:
+    """
+    Hands one logged round at a time back to Economy.step in the order it was recorded.
+    """
+    def __init__(self, log):
+        self.log = log
+        self._codes, self._draws = None, None
+        self._code_at = self._draw_at = 0
+
+    def begin(self, round_num):
+        self._codes, self._draws = self.log.round(round_num)
+        self._code_at = self._draw_at = 0
+
+    def take_codes(self, n):
+        codes = self._codes[self._code_at:self._code_at + n]
+        self._code_at += n
+        return codes
+
+    def take_actions(self, n):
+        vocab = self.log.vocab
+        return [vocab[code] or None for code in self.take_codes(n)]
+
+    def take_draws(self, n):
+        draws = self._draws[self._draw_at:self._draw_at + n]
+        if len(draws) < n:
+            raise ValueError("The step asked for more draws than the log recorded")
+        self._draw_at += n
+        return draws
+
+class Replay:
+    """
+    Steps a Simulation through logged rounds: everyone takes their logged action and price
+    adjustments and limit prices use the logged draws, so nothing calls decide() or the LLM.
+    Events, the network, matching, policies and prices are recomputed, so new metrics can be
+    collected (pass params with ENABLE_METRICS) while the results stay those of the logged run.
+    """
+    def __init__(self, log, params=None):
+        from simulation import Simulation
+        self.log = log
+        values = dict(log.params) if params is None else param_values(params)
+        # The replay writes nothing of its own: no log, no spilled history or flows, households in RAM
+        values.update(ACTION_LOG=False, ACTION_LOG_PATH='', HISTORY_PATH='', POPULATION_PATH='',
+                      NETWORK_FLOWS_PATH='', LLM_CACHE_SIZE=0, SAVE_RESULTS=False)
+        self.sim = Simulation(types.SimpleNamespace(**values))
+        self.sim.env.replay = LogCursor(log)
+        if log.start:
+            self._rewind(log.start)
+
+    def _rewind(self, round_num):
+        frame = self.log.keyframe(round_num)
+        if frame is None and self.log.start:
+            raise ValueError(f"No keyframe at or before round {round_num}")
+        if frame is None:
+            self.sim.reset()
+            self.sim.env.replay = LogCursor(self.log)
+        else:
+            self.sim.restore(frame[1])
+
+    def seek(self, round_num):
+        """
+        Bring the simulation to the start of round_num (rounds before it stepped) and return it.
+        Starts from the latest keyframe at or before round_num when stepping on would take longer.
+        """
+        if not self.log.start <= round_num <= self.log.stop:
+            raise ValueError(f"Round {round_num} is outside the log [{self.log.start}, {self.log.stop}]")
+        frame = self.log.keyframe(round_num)
+        if self.sim.round_num > round_num or (frame is not None and frame[0] > self.sim.round_num):
+            self._rewind(round_num)
+        while self.sim.round_num < round_num:
+            self.sim.step()
+        return self.sim
+
+    def rounds(self, stop=None):
+        """
+        Step to the end of the log (or to stop), yielding the simulation after each round.
+        """
+        stop = self.log.stop if stop is None else min(stop, self.log.stop)
+        while self.sim.round_num < stop:
+            self.sim.step()
+            yield self.sim
+
+def diff_logs(a, b, start=None, stop=None):
+    """
+    First round where action logs a and b disagree, as {'round', 'agents' (positions in the log
+    row whose codes differ: households, object agents, businesses, government), 'a' and 'b'
+    (their action names) and 'draws' (whether that round's draws differ)}, or None when both
+    logs hold the same rounds. A log that stops early diverges where it stops.
+    """
+    if a.width is not None and b.width is not None and a.width != b.width:
+        raise ValueError(f"Logs have {a.width} and {b.width} codes per round")
+    lo = max(a.start, b.start) if start is None else start
+    hi = min(a.stop, b.stop) if stop is None else min(stop, a.stop, b.stop)
+    names = a.vocab + [name for name in b.vocab if name not in a._code_of]
+    lookup = np.array([names.index(name) for name in b.vocab], dtype=np.int16)
+    same_vocab = names[:len(b.vocab)] == b.vocab
+    for first, codes_a, draws_a, offsets_a in a.blocks(lo, hi):
+        n = len(codes_a)
+        codes_b, draws_b, offsets_b = b.window(first, first + n)
+        if not same_vocab:
+            codes_b = lookup[codes_b]
+        changed = np.flatnonzero((codes_a != codes_b).any(axis=1))
+        # Draws line up until the first round whose number of draws differs
+        counts_differ = np.flatnonzero(np.diff(offsets_a) != np.diff(offsets_b))
+        aligned = counts_differ[0] if len(counts_differ) else n
+        values_differ = np.flatnonzero(draws_a[:offsets_a[aligned]] != draws_b[:offsets_a[aligned]])
+        draw_round = np.searchsorted(offsets_a, values_differ[0], side='right') - 1 if len(values_differ) else aligned
+        code_round = changed[0] if len(changed) else n
+        k = min(code_round, draw_round)
+        if k < n:
+            agents = np.flatnonzero(codes_a[k] != codes_b[k])
+            return {'round': first + k, 'agents': agents,
+                    'a': [names[code] for code in codes_a[k][agents]], 'b': [names[code] for code in codes_b[k][agents]],
+                    'draws': bool(k == draw_round)}
+    if a.stop != b.stop and (stop is None or hi < stop):
+        return {'round': hi, 'agents': np.empty(0, dtype=np.int64), 'a': [], 'b': [], 'draws': False}
+    return None
\ No newline at end of file
@@ -3,26 +3,40 @@ Agent classes for the Virtual Economy Simulator.
 Includes: BaseAgent, RuleBasedAgent, LLMAgent, BusinessAgent, GovernmentAgent.
 """
 import random
+from collections import deque
 from typing import List, Dict, Any
 import numpy as np
 
 class BaseAgent:
     """
     Base class for all agents. Handles wealth, memory, risk, and basic actions.
+    Inside an Economy, memory is a view onto the shared MemoryStore (memory.py), which the
+    Economy fills every round; on their own, agents keep a private bounded deque.
     """
+    __slots__ = ('agent_id', 'wealth', 'risk_profile', 'memory_length', 'mood', 'last_action',
+                 'inventory', '_memory')
+
     def __init__(self, agent_id, initial_wealth, risk_profile, memory_length=5):
         self.agent_id = agent_id
         self.wealth = initial_wealth
         self.risk_profile = risk_profile
-        self.memory = []  # Stores last N decisions, moods, etc.
+        self._memory = deque(maxlen=memory_length)  # Stores last N decisions, moods, etc.
         self.memory_length = memory_length
         self.mood = 'neutral'  # 'optimistic', 'pessimistic', etc.
         self.last_action = None
+        self.inventory = 0  # Units held (order-book mode)
+
+    @property
+    def memory(self):
+        return self._memory
+
+    def attach_memory(self, store, row):
+        self._memory = store.agent_view(row)
 
     def update_memory(self, info):
-        self.memory.append(info)
-        if len(self.memory) > self.memory_length:
-            self.memory.pop(0)
+        if not isinstance(self._memory, deque):
+            raise RuntimeError("Memory is managed by the Economy's MemoryStore")
+        self._memory.append(info)
 
     def perceive(self, market_news, prices, policies):
         """Process market news, prices, and policies."""
@@ -40,6 +54,8 @@ class RuleBasedAgent(BaseAgent):
     """
     Agent with simple rule-based decision logic.
     """
+    __slots__ = ()
+
     def decide(self, env_state):
         # Example: buy if price dropped, sell if price rose, else hold
         prices = env_state['prices']
@@ -60,11 +76,18 @@ class LLMAgent(BaseAgent):
     """
     Agent that uses an LLM or prompt-based logic for decisions.
     """
+    __slots__ = ('llm_interface', 'prefetched_action')
+
     def __init__(self, *args, llm_interface=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.llm_interface = llm_interface
+        self.prefetched_action = None
 
     def decide(self, env_state):
+        if self.prefetched_action is not None:
+            action, self.prefetched_action = self.prefetched_action, None
+            self.last_action = action
+            return action
         if self.llm_interface is None:
             return self._rule_based_decision(env_state)
         prompt = self._build_prompt(env_state)
@@ -72,12 +95,40 @@ class LLMAgent(BaseAgent):
         self.last_action = action
         return action
 
+    @staticmethod
+    def prefetch_decisions(agents, env_state):
+        """
+        Send the prompts of all LLM-backed agents concurrently and store each result
+        for the agent's next decide() call. With a batch size above 1, the shared news and
+        options are sent once per batch of agent profiles.
+        """
+        groups = {}
+        for agent in agents:
+            if agent.llm_interface is not None:
+                groups.setdefault(id(agent.llm_interface), []).append(agent)
+        for group in groups.values():
+            llm = group[0].llm_interface
+            prompts = [agent._build_prompt(env_state) for agent in group]
+            if llm.batch_size > 1:
+                profiles = [agent._profile_line() for agent in group]
+                actions = llm.get_actions_batched(LLMAgent._context(env_state), profiles, prompts)
+            else:
+                actions = llm.get_actions(prompts)
+            for agent, action in zip(group, actions):
+                agent.prefetched_action = action
+
+    def _profile_line(self):
+        return f"Agent profile: {self.risk_profile}, wealth: {self.wealth}."
+
+    @staticmethod
+    def _context(env_state):
+        return f"Market news: {env_state['news']}\nOptions: buy, sell, save, invest."
+
     def _build_prompt(self, env_state):
         # Compose a prompt for the LLM
-        profile = f"Agent profile: {self.risk_profile}, wealth: {self.wealth}."
         news = f"Market news: {env_state['news']}"
         options = "Options: buy, sell, save, invest."
-        return f"{profile}\n{news}\nWhat will you do? {options}"
+        return f"{self._profile_line()}\n{news}\nWhat will you do? {options}"
 
     def _rule_based_decision(self, env_state):
         # Fallback: mimic RuleBasedAgent logic
@@ -97,6 +148,8 @@ class BusinessAgent(BaseAgent):
     """
     Agent that produces goods and sets prices.
     """
+    __slots__ = ()
+
     def decide(self, env_state):
         # Simple production/price logic
         action = 'produce'
@@ -109,6 +162,8 @@ class GovernmentAgent(BaseAgent):
     """
     Special agent that can set policies (UBI, taxes, shocks).
     """
+    __slots__ = ('policies',)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.policies = {}
@@ -0,0 +1,141 @@
+"""
+Scaling benchmarks for the Virtual Economy Simulator.
+Times Economy.step per round and the inequality, data and plotting paths, reports peak memory,
+writes JSON and compares against a stored baseline. Runs offline (LLM agents use mock_action).
+
+Example:
+    python benchmark.py --output bench.json --baseline bench_baseline.json --threshold 0.2
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from agents import GovernmentAgent
+from sweep import default_params
+
+DEFAULT_AGENTS = [200, 2000, 20000, 200000, 1000000]
+DEFAULT_BUSINESSES = [10, 100, 1000]
+DEFAULT_IO_SIZES = [200, 2000, 20000]
+
+def measure(fn, repeat=3):
+    """
+    Best wall time of fn() over repeat calls, then peak traced memory of one extra call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak_mb': peak / 2**20}
+
+class AlwaysUBIGovernment(GovernmentAgent):
+    """
+    Keeps UBI switched on so its transfer path is timed every round.
+    """
+    __slots__ = ()
+
+    def decide(self, env_state):
+        return 'enable_UBI'
+
+def make_simulation(num_agents, num_businesses, policies, backend, use_llm):
+    from simulation import Simulation
+    params = default_params(NUM_AGENTS=num_agents, NUM_BUSINESSES=num_businesses, AGENT_BACKEND=backend,
+                            USE_LLM=use_llm, LLM_API_KEY='', LLM_API_BASE='', NUM_ROUNDS=10**6,
+                            ENABLE_WEALTH_TAX=policies, ENABLE_MARKET_SHOCKS=policies, SAVE_RESULTS=False)
+    sim = Simulation(params)
+    if policies:
+        sim.government = sim.env.government = AlwaysUBIGovernment("GOV", 0, 'neutral')
+    return sim
+
+def bench_step(num_agents, num_businesses, policies, rounds, backend='vectorized', use_llm=False):
+    sim = make_simulation(num_agents, num_businesses, policies, backend, use_llm)
+    sim.step()  # Warm-up
+    result = measure(lambda: [sim.step() for _ in range(rounds)], repeat=1)
+    return {'seconds_per_round': result['seconds'] / rounds, 'peak_mb': result['peak_mb']}
+
+def bench_io(n, tmpdir):
+    from inequality import inequality_stats
+    from population import AgentPopulation
+    from data import save_wealth_history, ResultsWriter
+    from visualization import plot_wealth_distribution, WealthFigure
+    population = AgentPopulation(n, 1000, ['cautious', 'neutral', 'risk_taker'], seed=0)
+    population.wealth[:] = np.random.default_rng(1).lognormal(7, 1, n)
+    writer = ResultsWriter(os.path.join(tmpdir, f"store_{n}"), n, ['GoodA'])
+    figure = WealthFigure()
+
+    def draw_and_save():
+        figure.draw(population.wealth, 0)
+        figure.save(os.path.join(tmpdir, f"fig_{n}.png"))
+
+    results = {
+        f"gini/n={n}": measure(lambda: inequality_stats(population.wealth)),
+        f"save_wealth_history/n={n}": measure(lambda: save_wealth_history(population, 0, tmpdir)),
+        f"results_writer_append/n={n}": measure(lambda: writer.append(0, population.wealth, {'GoodA': 1.0}, 0.1)),
+        f"plot_wealth_distribution/n={n}": measure(lambda: plot_wealth_distribution(population, 0, tmpdir), repeat=1),
+        f"wealth_figure_update/n={n}": measure(draw_and_save),
+    }
+    writer.close()
+    return results
+
+def run_benchmarks(agents, businesses, io_sizes, rounds, backend, use_llm, log=print):
+    results = {}
+    for num_agents, num_businesses, policies in itertools.product(agents, businesses, [False, True]):
+        name = f"step/agents={num_agents}/businesses={num_businesses}/policies={'on' if policies else 'off'}"
+        results[name] = bench_step(num_agents, num_businesses, policies, rounds, backend, use_llm)
+        log(f"{name}: {results[name]['seconds_per_round'] * 1e3:.3f} ms/round, peak {results[name]['peak_mb']:.1f} MB")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n in io_sizes:
+            for name, result in bench_io(n, tmpdir).items():
+                results[name] = result
+                log(f"{name}: {result['seconds'] * 1e3:.3f} ms, peak {result['peak_mb']:.1f} MB")
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Return (name, baseline_seconds, seconds) for cases slower than baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        key = 'seconds_per_round' if 'seconds_per_round' in result else 'seconds'
+        old, new = baseline[name][key], result[key]
+        if old > 0 and new > old * (1 + threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--agents', type=int, nargs='+', default=DEFAULT_AGENTS)
+    parser.add_argument('--businesses', type=int, nargs='+', default=DEFAULT_BUSINESSES)
+    parser.add_argument('--io-sizes', type=int, nargs='+', default=DEFAULT_IO_SIZES)
+    parser.add_argument('--rounds', type=int, default=10, help="Timed rounds per step case")
+    parser.add_argument('--backend', default='vectorized', choices=['vectorized', 'objects'])
+    parser.add_argument('--llm', action='store_true', help="Use LLM agents (mock_action, no network)")
+    parser.add_argument('--output', help="Write results JSON to this path")
+    parser.add_argument('--baseline', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown fraction vs baseline")
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.agents, args.businesses, args.io_sizes, args.rounds, args.backend, args.llm)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old * 1e3:.3f} ms -> {new * 1e3:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Binary checkpoint/restore for the Virtual Economy Simulator.
+Bulk state is stored as raw NumPy arrays in an uncompressed .npz; small Python state
+(policies, memories, RNG states) goes into a JSON header stored as a byte array. Nothing is
+unpickled on load, so checkpoints from untrusted sources (e.g. server uploads) are safe to read.
+"""
+import io
+import json
+import random
+import numpy as np
+
+FORMAT_VERSION = 3
+
+def _encode(value):
+    # JSON has no tuples, arrays or non-string keys; tag them so they decode to the same types
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {'__items__': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return {'__array__': value.tolist(), 'dtype': value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot store {type(value).__name__} in a checkpoint header")
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__tuple__' in value:
+        return tuple(_decode(item) for item in value['__tuple__'])
+    if '__array__' in value:
+        return np.array(value['__array__'], dtype=np.dtype(value['dtype']))
+    if '__items__' in value:
+        return {_decode(key): _decode(item) for key, item in value['__items__']}
+    return {key: _decode(item) for key, item in value.items()}
+
+def _agent_state(agent):
+    state = {name: getattr(agent, name) for name in ('risk_profile', 'mood', 'last_action', 'inventory')}
+    state['prefetched_action'] = getattr(agent, 'prefetched_action', None)
+    return state
+
+def _restore_agent(agent, wealth, state):
+    agent.wealth = float(wealth)
+    for name, value in state.items():
+        if name == 'prefetched_action' and not hasattr(agent, name):
+            continue
+        setattr(agent, name, value)
+
+def capture(sim, mapped_arrays=True):
+    """
+    Return (arrays, header) describing the full state of a Simulation. With mapped_arrays=False,
+    arrays backed by memory-mapped files (see mapped.py) are left out: they stay on disk.
+    """
+    env = sim.env
+    arrays = {
+        'agent_wealth': np.array([a.wealth for a in env.agents], dtype=np.float64),
+        'business_wealth': np.array([b.wealth for b in env.businesses], dtype=np.float64),
+        'gini_history': np.asarray(env.gini_history, dtype=np.float64),
+        'memory_shared': env.memory.shared,
+    }
+    if mapped_arrays or env.memory.path is None:
+        arrays['memory_data'] = env.memory.data
+    for name in env.market.goods:
+        arrays[f"price_history/{name}"] = np.asarray(env.market.history[name], dtype=np.float64)
+    header = {
+        'version': FORMAT_VERSION,
+        'round_num': sim.round_num,
+        'done': sim.done,
+        'env_round': env.round,
+        'news': env.news,
+        'policies': env.policies,
+        'memory_cursor': (env.memory.head, env.memory.count),
+        'goods': {name: (g.price, g.supply, g.demand) for name, g in env.market.goods.items()},
+        'agents': [_agent_state(a) for a in env.agents],
+        'businesses': [_agent_state(b) for b in env.businesses],
+        'government': (env.government.wealth, env.government.policies, _agent_state(env.government)),
+        'random_state': random.getstate(),
+        'np_random_state': np.random.get_state(),
+    }
+    engine = env.policy_engine
+    arrays['fiscal_revenue'] = engine.revenue[:engine.rounds]
+    arrays['fiscal_spending'] = engine.spending[:engine.rounds]
+    population = env.population
+    if population is not None:
+        if mapped_arrays or getattr(population, 'path', None) is None:
+            arrays['pop_wealth'] = population.wealth
+            arrays['pop_risk'] = population.risk
+            arrays['pop_last_action'] = population.last_action
+            arrays['pop_inventory'] = population.inventory
+        header['pop_rng_state'] = population.rng_state()
+    if env.network is not None:
+        arrays['network_sentiment'] = env.sentiment
+        arrays['network_imbalance'] = env.local_imbalance
+        header['network_rng_state'] = env.network_rng.bit_generator.state
+    return arrays, header
+
+def apply(sim, arrays, header):
+    """
+    Load captured state into a Simulation built with the same population shape.
+    """
+    if header['version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {header['version']}")
+    env = sim.env
+    if len(env.agents) != len(arrays['agent_wealth']) or len(env.businesses) != len(arrays['business_wealth']):
+        raise ValueError("Checkpoint agent counts do not match this simulation")
+    sim.round_num = header['round_num']
+    sim.done = header['done']
+    env.round = header['env_round']
+    env.news = header['news']
+    env.policies = header['policies']
+    env.gini_history.load(arrays['gini_history'])
+    for name in env.history.names('metrics/'):
+        env.history[name].truncate(env.round)
+    env._inequality_round = -1
+    if 'memory_data' in arrays:
+        if env.memory.data.shape != arrays['memory_data'].shape:
+            env.memory.resize(arrays['memory_data'].shape[0])
+        env.memory.data[:] = arrays['memory_data']
+    env.memory.shared[:] = arrays['memory_shared']
+    env.memory.head, env.memory.count = header['memory_cursor']
+    for name, (price, supply, demand) in header['goods'].items():
+        good = env.market.goods[name]
+        good.price, good.supply, good.demand = price, supply, demand
+        env.market.history[name].load(arrays[f"price_history/{name}"])
+    for agent, wealth, state in zip(env.agents, arrays['agent_wealth'], header['agents']):
+        _restore_agent(agent, wealth, state)
+    for business, wealth, state in zip(env.businesses, arrays['business_wealth'], header['businesses']):
+        _restore_agent(business, wealth, state)
+    gov_wealth, gov_policies, gov_state = header['government']
+    _restore_agent(env.government, gov_wealth, gov_state)
+    env.government.policies = gov_policies
+    if 'fiscal_revenue' in arrays:
+        env.policy_engine.restore(arrays['fiscal_revenue'], arrays['fiscal_spending'])
+    population = env.population
+    if population is not None:
+        if 'pop_wealth' in arrays:
+            if len(population) != len(arrays['pop_wealth']):
+                raise ValueError("Checkpoint population size does not match this simulation")
+            population.wealth[:] = arrays['pop_wealth']
+            population.risk[:] = arrays['pop_risk']
+            population.last_action[:] = arrays['pop_last_action']
+            population.inventory[:] = arrays['pop_inventory']
+        population.set_rng_state(header['pop_rng_state'])
+    if env.network is not None:
+        env.sentiment = arrays['network_sentiment'].copy()
+        env.local_imbalance = arrays['network_imbalance'].copy()
+        env.network_rng.bit_generator.state = header['network_rng_state']
+    random.setstate(header['random_state'])
+    np.random.set_state(header['np_random_state'])
+
+def save_checkpoint(sim, target=None):
+    """
+    Write a checkpoint to a path or file object; with no target, return it as bytes.
+    """
+    arrays, header = capture(sim)
+    return write_checkpoint(arrays, header, target)
+
+def write_checkpoint(arrays, header, target=None):
+    arrays = dict(arrays)
+    arrays['header'] = np.frombuffer(json.dumps(_encode(header)).encode(), dtype=np.uint8)
+    if target is None:
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+    np.savez(target, **arrays)
+
+def read_checkpoint(source):
+    """
+    (arrays, header) from a path, file object or bytes produced by save_checkpoint.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with np.load(source, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if 'header' not in arrays:
+        raise ValueError("Not a checkpoint: no header")
+    try:
+        header = json.loads(arrays.pop('header').tobytes())
+    except ValueError:
+        raise ValueError("Unsupported checkpoint format (written by an older version?)") from None
+    return arrays, _decode(header)
+
+def load_checkpoint(sim, source):
+    """
+    Restore a Simulation from a path, file object or bytes produced by save_checkpoint.
+    """
+    apply(sim, *read_checkpoint(source))
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+Headless command-line runner for the Virtual Economy Simulator.
+Runs one simulation from config overrides and prints a JSON summary. The LLM client, matplotlib
+and pandas are only imported when the chosen options need them, so rule-based batch jobs start fast.
+
+Example:
+    python cli.py --agents 10000 --rounds 200 --seed 7 --wealth-tax 0.02 --format npy --output results/run7
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+def parse_override(text):
+    """
+    KEY=VALUE with VALUE parsed as JSON when possible (numbers, booleans, lists), else a string.
+    """
+    name, sep, value = text.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {text!r}")
+    try:
+        return name.upper(), json.loads(value)
+    except ValueError:
+        return name.upper(), value
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--agents', type=int, help="NUM_AGENTS")
+    parser.add_argument('--businesses', type=int, help="NUM_BUSINESSES")
+    parser.add_argument('--rounds', type=int, help="NUM_ROUNDS")
+    parser.add_argument('--seed', type=int, help="RANDOM_SEED")
+    parser.add_argument('--backend', choices=['vectorized', 'objects'], help="AGENT_BACKEND")
+    parser.add_argument('--shards', type=int, help="NUM_SHARDS (worker processes)")
+    parser.add_argument('--market', choices=['dealer', 'orderbook'], help="MARKET_MODE")
+    parser.add_argument('--ubi-amount', type=float, help="UBI_AMOUNT paid while UBI is on")
+    parser.add_argument('--wealth-tax', type=float, metavar='RATE', help="Enable the wealth tax at RATE per round")
+    parser.add_argument('--no-shocks', action='store_true', help="Disable market shocks")
+    parser.add_argument('--scenario', help="SCENARIO_PATH (JSON list of round-pinned events)")
+    parser.add_argument('--llm', action='store_true', help="Use LLM agents (imports the LLM client)")
+    parser.add_argument('--replicas', type=int, metavar='K',
+                        help="Run K seeds as one ensemble (ensemble.py) and summarize their spread")
+    parser.add_argument('--format', choices=['none', 'npy', 'csv'], default='none',
+                        help="Results output: none, npy store, or CSV (needs pandas)")
+    parser.add_argument('--output', default='results/', help="Results directory (RESULTS_PATH)")
+    parser.add_argument('--plot', action='store_true', help="Save price and Gini plots (needs matplotlib)")
+    parser.add_argument('--set', type=parse_override, action='append', default=[], metavar='KEY=VALUE',
+                        help="Override any config value, e.g. --set MEMORY_LENGTH=20")
+    return parser
+
+def build_params(args):
+    from sweep import default_params
+    overrides = {
+        'NUM_AGENTS': args.agents, 'NUM_BUSINESSES': args.businesses, 'NUM_ROUNDS': args.rounds,
+        'RANDOM_SEED': args.seed, 'AGENT_BACKEND': args.backend, 'NUM_SHARDS': args.shards,
+        'MARKET_MODE': args.market, 'UBI_AMOUNT': args.ubi_amount, 'SCENARIO_PATH': args.scenario,
+    }
+    overrides = {name: value for name, value in overrides.items() if value is not None}
+    if args.wealth_tax is not None:
+        overrides.update(ENABLE_WEALTH_TAX=True, WEALTH_TAX_RATE=args.wealth_tax)
+    if args.no_shocks:
+        overrides['ENABLE_MARKET_SHOCKS'] = False
+    overrides.update(USE_LLM=args.llm, SAVE_RESULTS=args.format != 'none', RESULTS_PATH=args.output,
+                     RESULTS_FORMAT=args.format, ENABLE_DASHBOARD=False)
+    overrides.update(dict(args.set))
+    return default_params(**overrides)
+
+def run(params, output_format='none', plot=False):
+    """
+    Run params to completion, writing results as requested. Returns the summary dict.
+    """
+    from simulation import Simulation
+    start = time.perf_counter()
+    sim = Simulation(params)
+    try:
+        writer = None
+        if output_format == 'npy':
+            from data import ResultsWriter
+            writer = ResultsWriter(params.RESULTS_PATH, len(sim.env.wealths()), list(sim.env.market.goods),
+                                   chunk_rounds=getattr(params, 'RESULTS_CHUNK_ROUNDS', 64))
+            for snapshot in sim.stream():
+                writer.append(snapshot['round'] - 1, snapshot['wealths'], snapshot['prices'], snapshot['gini'])
+            writer.close()
+        else:
+            while not sim.done:
+                sim.step()
+        if output_format == 'csv':
+            from data import save_wealth_history, save_price_history, save_gini_history
+            save_wealth_history(sim.agents, sim.round_num, params.RESULTS_PATH)
+            save_price_history(sim.env.market, params.RESULTS_PATH)
+            save_gini_history(sim.env.gini_history, params.RESULTS_PATH)
+        if plot:
+            from visualization import plot_price_history, plot_gini
+            plot_price_history(sim.env.market, params.RESULTS_PATH)
+            plot_gini(sim.env.gini_history, params.RESULTS_PATH)
+        # The summary reads household arrays, so it is built before close() releases them
+        wealths = sim.env.wealths()
+        return {
+            'rounds': sim.round_num,
+            'seconds': time.perf_counter() - start,
+            'gini': sim.env.gini_history[-1] if sim.env.gini_history else None,
+            'prices': {name: good.price for name, good in sim.env.market.goods.items()},
+            'mean_wealth': float(wealths.mean()) if len(wealths) else None,
+            'results_path': os.path.abspath(params.RESULTS_PATH) if output_format != 'none' or plot else None,
+        }
+    finally:
+        sim.env.close()
+
+def run_ensemble(params, replicas, level=0.9):
+    """
+    Run replicas seeds of params as one Ensemble; returns final-round medians and quantile bands.
+    """
+    from ensemble import Ensemble
+    start = time.perf_counter()
+    ensemble = Ensemble(params, replicas=replicas)
+    try:
+        ensemble.run()
+        bands = {name: {key: float(values[-1]) for key, values in band.items()}
+                 for name, band in ensemble.summary(level).items()} if ensemble.round else {}
+    finally:
+        ensemble.close()
+    return {
+        'rounds': ensemble.round,
+        'replicas': ensemble.replicas,
+        'seconds': time.perf_counter() - start,
+        'level': level,
+        'final': bands,
+    }
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.replicas:
+        summary = run_ensemble(build_params(args), args.replicas)
+    else:
+        summary = run(build_params(args), args.format, args.plot)
+    json.dump(summary, sys.stdout)
+    sys.stdout.write('\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Python client for the simulation server (server.py), standard library plus NumPy.
+Dashboards and batch tools can drive shared, already-warm sessions through it instead of
+building their own Simulation.
+
+Example:
+    client = SimulationClient(port=8765)
+    session = client.create(NUM_AGENTS=10000, RANDOM_SEED=7)
+    client.run(session['id'], rounds=200, every=10)
+    for snapshot in client.stream(session['id'], rate=5):
+        print(snapshot['round'], snapshot['gini'])
+        if snapshot['done']:
+            break
+"""
+import base64
+import http.client
+import json
+import secrets
+import socket
+import struct
+from urllib.parse import urlencode
+import numpy as np
+from server import encode_frame, parse_frame_header, unmask, TEXT, BINARY, CLOSE, PING, PONG
+
+class ServerError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+class SimulationClient:
+    """
+    Blocking client over one keep-alive HTTP connection; stream() opens its own websocket.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, timeout=None):
+        self.host, self.port, self.timeout = host, port, timeout
+        self._conn = None
+
+    def _request(self, method, path, payload=None, data=None):
+        body, headers = None, {}
+        if data is not None:
+            body, headers['Content-Type'] = data, 'application/octet-stream'
+        elif payload is not None:
+            body, headers['Content-Type'] = json.dumps(payload).encode(), 'application/json'
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                content = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The server may have closed an idle keep-alive connection; retry once on a fresh one.
+                # Only reads are retried: a POST may already have been applied (e.g. stepped rounds).
+                self.close()
+                if attempt or method != 'GET':
+                    raise
+        if response.getheader('Content-Type') == 'application/octet-stream':
+            result = content
+        else:
+            result = json.loads(content) if content else None
+        if response.status >= 400:
+            raise ServerError(response.status, result.get('error') if isinstance(result, dict) else result)
+        return result
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Sessions ---
+    def health(self):
+        return self._request('GET', '/health')
+
+    def sessions(self):
+        return self._request('GET', '/sessions')
+
+    def create(self, **params):
+        """
+        New session from config overrides; returns its summary, including 'id'.
+        """
+        return self._request('POST', '/sessions', params)
+
+    def status(self, session_id):
+        return self._request('GET', f'/sessions/{session_id}')
+
+    def step(self, session_id, rounds=1):
+        return self._request('POST', f'/sessions/{session_id}/step', {'rounds': rounds})
+
+    def run(self, session_id, rounds=None, every=1):
+        """
+        Step in the background (until done when rounds is None), publishing every `every` rounds.
+        """
+        return self._request('POST', f'/sessions/{session_id}/run', {'rounds': rounds, 'every': every})
+
+    def pause(self, session_id):
+        return self._request('POST', f'/sessions/{session_id}/pause')
+
+    def checkpoint(self, session_id):
+        return self._request('GET', f'/sessions/{session_id}/checkpoint')
+
+    def restore(self, session_id, data):
+        return self._request('POST', f'/sessions/{session_id}/restore', data=bytes(data))
+
+    def destroy(self, session_id):
+        return self._request('DELETE', f'/sessions/{session_id}')
+
+    # --- Streaming ---
+    def stream(self, session_id, rate=None, wealths=False):
+        """
+        Yield snapshot summaries (with a 'wealths' array when wealths is set) until the server
+        closes the stream or the generator is closed. rate caps snapshots per second.
+        """
+        query = {'wealths': int(bool(wealths))}
+        if rate is not None:
+            query['rate'] = rate
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        try:
+            key = base64.b64encode(secrets.token_bytes(16)).decode()
+            sock.sendall((f"GET /sessions/{session_id}/stream?{urlencode(query)} HTTP/1.1\r\n"
+                          f"Host: {self.host}:{self.port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode('latin-1'))
+            reader = sock.makefile('rb')
+            status_line = reader.readline().decode('latin-1')
+            while reader.readline() not in (b'\r\n', b''):
+                pass
+            if ' 101 ' not in status_line:
+                raise ServerError(int(status_line.split()[1]), "Websocket upgrade refused")
+            snapshot = None
+            while True:
+                try:
+                    opcode, payload = _read_frame(reader)
+                except (ConnectionError, OSError):
+                    return  # Server went away without a close frame
+                if opcode == TEXT:
+                    snapshot = json.loads(payload)
+                    if not snapshot.pop('wealths_follow', False):
+                        yield snapshot
+                        snapshot = None
+                elif opcode == BINARY and snapshot is not None:
+                    snapshot['wealths'] = np.frombuffer(payload, dtype='<f8')
+                    yield snapshot
+                    snapshot = None
+                elif opcode == PING:
+                    sock.sendall(encode_frame(PONG, payload, mask=True))
+                elif opcode == CLOSE:
+                    return
+        finally:
+            try:
+                sock.sendall(encode_frame(CLOSE, struct.pack('>H', 1000), mask=True))
+            except OSError:
+                pass
+            sock.close()
+
+def _read_exactly(reader, n):
+    data = reader.read(n)
+    if len(data) < n:
+        raise ConnectionError("Stream closed")
+    return data
+
+def _read_frame(reader):
+    opcode, masked, length = parse_frame_header(_read_exactly(reader, 2))
+    if length == 126:
+        length = struct.unpack('>H', _read_exactly(reader, 2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', _read_exactly(reader, 8))[0]
+    key = _read_exactly(reader, 4) if masked else None
+    payload = _read_exactly(reader, length)
+    return opcode, unmask(payload, key) if masked else payload
\ No newline at end of file
@@ -10,21 +10,61 @@ NUM_ROUNDS = 1000  # Number of time steps
 GOODS = ['GoodA']  # List of tradable goods
 INITIAL_WEALTH = 1000  # Starting wealth for each agent
 INITIAL_BUSINESS_WEALTH = 5000
+INITIAL_INVENTORY = 5  # Units of each agent's starting stock (used for selling in order-book mode)
 RISK_PROFILES = ['cautious', 'neutral', 'risk_taker']
+MEMORY_LENGTH = 5  # Rounds of price/action/wealth each agent remembers
+AGENT_BACKEND = 'vectorized'  # 'vectorized' (NumPy arrays) or 'objects' (one Python object per agent)
+NUM_SHARDS = 1  # Worker processes for the vectorized population (1 = in-process)
+RNG_BLOCK_SIZE = 4096  # Agents per independent random stream; results do not depend on NUM_SHARDS
+POPULATION_PATH = ''  # Directory for memory-mapped household arrays (mapped.py); empty keeps them in RAM
+MAP_CHUNK_SIZE = 1 << 20  # Households per decide/apply chunk of a mapped population
+MAP_COMMIT_EVERY = 1  # Rounds between restart points of a mapped run (Simulation.resume)
+ENSEMBLE_REPLICAS = 100  # Replicas stepped together by ensemble.Ensemble (seeds RANDOM_SEED, RANDOM_SEED + 1, ...)
 
 # --- LLM / Agent Reasoning ---
 USE_LLM = False  # Set True to use LLMs for agent decisions
-LLM_MODEL = 'gpt-3.5-turbo'  # or 'phi-3', 'mistral', etc.
+LLM_MODEL = 'gpt-3.5-turbo'  # or 'phi-3', 'mistral', etc.; 'fake' runs a deterministic offline model
 LLM_API_KEY = ''  # Set your OpenAI or local LLM API key
 LLM_MAX_TOKENS = 64
 LLM_TEMPERATURE = 0.7
+LLM_API_BASE = ''  # OpenAI-compatible base URL (e.g. http://localhost:8000/v1); empty uses the openai package
+LLM_CONCURRENCY = 16  # Max in-flight LLM requests per round
+LLM_TIMEOUT = 30  # Seconds per request
+LLM_RETRIES = 2  # Retries per request before falling back to mock_action
+LLM_BACKOFF = 0.5  # Base delay in seconds for exponential backoff between retries
+LLM_CACHE_SIZE = 10000  # In-process prompt->action LRU entries (0 disables the cache)
+LLM_CACHE_PATH = ''  # Optional SQLite file so cached answers survive across runs and sweeps
+LLM_CACHE_WEALTH_BUCKET = 0  # Round prompt wealth down to this bucket before lookup (0 = exact)
+LLM_CACHE_DETERMINISTIC_ONLY = True  # Only use the cache at temperature 0, so sampled answers are never replayed
+LLM_BATCH_SIZE = 1  # Max agents packed into one prompt per round (1 = one prompt per agent, no batching)
+LLM_TOKENS_PER_DECISION = 5  # Answer tokens budgeted per agent line ("12: invest"); caps the batch at LLM_MAX_TOKENS / this
+LLM_BATCH_REQUERIES = 2  # Follow-up prompts for agents missing or malformed in a batched answer before mock fallback
 
 # --- Policy Layer ---
 ENABLE_UBI = False
 UBI_AMOUNT = 50
 ENABLE_WEALTH_TAX = False
 WEALTH_TAX_RATE = 0.01  # 1% per round
+POLICIES = []  # Extra policy specs (see policy.py), e.g. {'type': 'progressive_tax', 'thresholds': [0, 1000, 5000], 'rates': [0, 0.005, 0.02]}
 ENABLE_MARKET_SHOCKS = True
+SHOCK_PROBABILITY = 0.05  # Chance of a shock (news.SHOCK_EVENTS) in any round
+SCENARIO_PATH = ''  # Optional JSON list of round-pinned events merged into the timeline (see events.py)
+CUSTOM_NEWS = []  # Extra headlines; "round: text" pins one to a round, otherwise one per round from 0
+
+# --- Market ---
+MARKET_MODE = 'dealer'  # 'dealer' (demand/supply counters nudge the price) or 'orderbook' (matched limit orders)
+ORDER_SPREAD = 0.02  # Max fractional distance of limit prices from the current price
+
+# --- Trade Network (vectorized households only) ---
+NETWORK_TYPE = ''  # '' (one global market), 'lattice', 'small_world' or 'scale_free'
+NETWORK_DEGREE = 10  # Average links per agent
+NETWORK_REWIRE = 0.1  # Small-world rewiring probability
+NETWORK_PRICE_SENSITIVITY = 0.05  # Local price shift per unit of neighbours' net demand per link
+NETWORK_PRICE_NOISE = 0.01  # Std. dev. of each household's log price observation error
+NETWORK_NEWS_SEED = 0.01  # Share of households who hear a price headline first
+NETWORK_NEWS_SPREAD = 0.5  # Weight of neighbours' sentiment each round
+NETWORK_NEWS_DECAY = 0.9  # Sentiment kept from one round to the next
+NETWORK_FLOWS_PATH = ''  # Directory for per-round edge money flows (network.EdgeFlowLog); empty disables
 
 # --- Visualization ---
 PLOT_INTERVAL = 10  # Plot every N rounds
@@ -33,6 +73,30 @@ ENABLE_DASHBOARD = True
 # --- Data Storage ---
 SAVE_RESULTS = True
 RESULTS_PATH = 'results/'
+RESULTS_FORMAT = 'npy'  # 'npy' (one append-only store per run) or 'csv' (one file per round)
+RESULTS_CHUNK_ROUNDS = 64  # Rounds buffered in memory before each background write
+HISTORY_PATH = ''  # Directory where price/Gini/fiscal/metrics series spill old rounds (history.py); empty keeps them in RAM
+HISTORY_SPILL_ROUNDS = 1 << 16  # Raw rounds each spilled series keeps in memory
+ACTION_LOG = False  # Record every round's decisions and draws in Economy.action_log (actionlog.py)
+ACTION_LOG_PATH = ''  # File the action log is saved to when the run is closed; setting it also enables the log
+ACTION_LOG_CHUNK_ROUNDS = 64  # Rounds per zlib-compressed chunk of the log
+ACTION_LOG_KEYFRAME_EVERY = 0  # Store a checkpoint in the log every N rounds so replays can seek (0: replay from the start)
+
+# --- Instrumentation ---
+ENABLE_METRICS = False  # Per-phase timers and counters (Simulation.metrics)
+METRICS_TRACE = False  # Also keep per-phase events for export_chrome_trace
+METRICS_PATH = ''  # main.py writes <path>.json/.csv (and .trace.json with METRICS_TRACE) when set
+PROFILE_START_ROUND = 0  # First round wrapped in cProfile
+PROFILE_ROUNDS = 0  # Number of profiled rounds (0 disables profiling)
+PROFILE_PATH = 'results/profile.prof'
+
+# --- Simulation Server (server.py) ---
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_WORKERS = 2  # Worker processes hosting sessions
+SERVER_MAX_SESSIONS = 64
+SERVER_RATE_LIMIT = 50  # HTTP requests per second per client address (0 disables)
+SERVER_STREAM_RATE = 10  # Max snapshots per second per websocket client (0 = unlimited)
 
 # --- Random Seed ---
 RANDOM_SEED = 42 
\ No newline at end of file
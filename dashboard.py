@@ -4,9 +4,15 @@ Full-featured interactive simulation lab.
 """
 import streamlit as st
 import pandas as pd
-from simulation import Simulation
+import numpy as np
+from simulation import Simulation, SimulationWorker
+import time
 import types
 
+REFRESH_SECONDS = 0.5
+HIST_BINS = 50
+CHART_POINTS = 500  # Points drawn per history chart (bucket means from the history tiers)
+
 st.set_page_config(page_title="Virtual Economy Simulator", layout="wide")
 st.title("🌍💡 Virtual Economy Simulator Dashboard")
 
@@ -38,13 +44,13 @@ plot_interval = st.sidebar.slider("Plot Interval (Rounds)", 1, 100, 10)
 
 # --- Custom News/Events ---
 st.sidebar.header("Custom News & Events")
-custom_news = st.sidebar.text_area("Custom News (one per line)")
+custom_news = st.sidebar.text_area("Custom News (one per line, 'round: text' to pin)")
 
 # --- Simulation State ---
-if 'sim' not in st.session_state:
-    st.session_state['sim'] = None
-if 'running' not in st.session_state:
-    st.session_state['running'] = False
+if 'worker' not in st.session_state:
+    st.session_state['worker'] = None
+if 'downloads' not in st.session_state:
+    st.session_state['downloads'] = None  # (round, csv bytes per file), built on request
 
 # --- Parameter Object (use SimpleNamespace for dynamic attributes) ---
 params = types.SimpleNamespace()
@@ -55,6 +61,7 @@ params.GOODS = ['GoodA']
 params.INITIAL_WEALTH = initial_wealth
 params.INITIAL_BUSINESS_WEALTH = initial_business_wealth
 params.RISK_PROFILES = risk_profiles or ["cautious", "neutral", "risk_taker"]
+params.AGENT_BACKEND = 'vectorized'
 params.USE_LLM = use_llm
 params.LLM_MODEL = llm_model
 params.LLM_API_KEY = llm_api_key
@@ -72,63 +79,96 @@ params.RANDOM_SEED = 42
 params.CUSTOM_NEWS = [line.strip() for line in custom_news.splitlines() if line.strip()]
 
 # --- Controls ---
+def new_worker():
+    if st.session_state['worker'] is not None:
+        st.session_state['worker'].stop()
+    st.session_state['worker'] = SimulationWorker(Simulation(params), publish_every=params.PLOT_INTERVAL)
+    st.session_state['downloads'] = None
+
 col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("Start/Resume Simulation"):
-        if st.session_state['sim'] is None or not st.session_state['running']:
-            st.session_state['sim'] = Simulation(params)
-            st.session_state['running'] = True
-            st.success("Simulation started!")
+        if st.session_state['worker'] is None:
+            new_worker()
+        st.session_state['worker'].resume()
+        st.success("Simulation started!")
 with col2:
     if st.button("Pause Simulation"):
-        st.session_state['running'] = False
+        if st.session_state['worker'] is not None:
+            st.session_state['worker'].pause()
         st.success("Simulation paused.")
 with col3:
     if st.button("Reset Simulation"):
-        st.session_state['sim'] = Simulation(params)
-        st.session_state['running'] = False
+        new_worker()
         st.success("Simulation reset.")
 
-# --- Main Simulation Loop ---
-if st.session_state['sim'] and st.session_state['running']:
-    steps = params.PLOT_INTERVAL
-    for _ in range(steps):
-        st.session_state['sim'].set_running(True)
-        st.session_state['sim'].step()
-    st.session_state['sim'].set_running(False)
+def wealth_histogram(wealths):
+    counts, edges = np.histogram(wealths, bins=HIST_BINS)
+    return pd.DataFrame({'Agents': counts}, index=pd.Index(np.round(edges[:-1], 1), name="Wealth"))
+
+def history_frames(worker, start, stop):
+    prices, gini = worker.history_since(start, stop)
+    index = pd.RangeIndex(start, start + len(gini))
+    return pd.DataFrame(prices, index=index), pd.DataFrame({'Gini': gini}, index=index)
+
+def chart_frames(worker, stop):
+    # Fixed number of points for the whole run, so reruns do not slow down as it grows
+    rounds, prices, gini = worker.history_points(0, stop, CHART_POINTS)
+    index = pd.Index(rounds)
+    return pd.DataFrame(prices, index=index), pd.DataFrame({'Gini': gini}, index=index)
 
 # --- Results ---
-if st.session_state['sim']:
-    state = st.session_state['sim'].get_state()
-    agents = state['agents']
-    market = state['market']
-    gini_history = state['gini_history']
-    round_num = state['round']
+worker = st.session_state['worker']
+if worker is not None:
+    snapshot = worker.latest()
+    drawn = snapshot['round']
     # Wealth Distribution
-    st.subheader(f"Wealth Distribution (Round {round_num})")
-    wealths = [a.wealth for a in agents]
-    st.bar_chart(pd.Series(wealths, name="Wealth"))
+    wealth_title = st.empty()
+    wealth_chart = st.empty()
+    wealth_title.subheader(f"Wealth Distribution (Round {drawn})")
+    wealth_chart.bar_chart(wealth_histogram(snapshot['wealths']))
+    price_df, gini_df = chart_frames(worker, drawn)
     # Price History
     st.subheader("Price History")
-    price_df = pd.DataFrame(market.history)
-    st.line_chart(price_df)
+    price_chart = st.line_chart(price_df)
     # Gini Coefficient
     st.subheader("Gini Coefficient Over Time")
-    st.line_chart(pd.Series(gini_history, name="Gini"))
-    # Download Results
+    gini_chart = st.line_chart(gini_df)
+    # Download Results (CSV is only encoded when requested, and cached per round)
     st.subheader("Download Results")
-    df = pd.DataFrame({'agent_id': [a.agent_id for a in agents], 'wealth': wealths})
-    csv = df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download Wealth Data", csv, "wealth.csv", "text/csv")
-    price_csv = price_df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download Price Data", price_csv, "prices.csv", "text/csv")
-    gini_csv = pd.Series(gini_history, name="Gini").to_csv(index=False).encode('utf-8')
-    st.download_button("Download Gini Data", gini_csv, "gini.csv", "text/csv")
+    if st.button("Prepare Downloads"):
+        downloads = st.session_state['downloads']
+        if downloads is None or downloads[0] != drawn:
+            price_all, gini_all = history_frames(worker, 0, drawn)
+            wealth_df = pd.DataFrame({'agent_id': np.arange(len(snapshot['wealths'])), 'wealth': snapshot['wealths']})
+            st.session_state['downloads'] = (drawn, {
+                'wealth.csv': wealth_df.to_csv(index=False).encode('utf-8'),
+                'prices.csv': price_all.to_csv(index=False).encode('utf-8'),
+                'gini.csv': gini_all.to_csv(index=False).encode('utf-8'),
+            })
+    if st.session_state['downloads'] is not None:
+        csv_round, files = st.session_state['downloads']
+        st.caption(f"Data as of round {csv_round}")
+        st.download_button("Download Wealth Data", files['wealth.csv'], "wealth.csv", "text/csv")
+        st.download_button("Download Price Data", files['prices.csv'], "prices.csv", "text/csv")
+        st.download_button("Download Gini Data", files['gini.csv'], "gini.csv", "text/csv")
     # Custom News/Events (display)
     if params.CUSTOM_NEWS:
         st.subheader("Custom News/Events Used")
         for news in params.CUSTOM_NEWS:
             st.info(news)
+    # --- Live updates: poll the worker and draw only what changed (raw rounds after the bucketed ones) ---
+    while worker.running:
+        time.sleep(REFRESH_SECONDS)
+        snapshot = worker.latest()
+        if snapshot['round'] == drawn:
+            continue
+        new_prices, new_gini = history_frames(worker, drawn, snapshot['round'])
+        price_chart.add_rows(new_prices)
+        gini_chart.add_rows(new_gini)
+        wealth_title.subheader(f"Wealth Distribution (Round {snapshot['round']})")
+        wealth_chart.bar_chart(wealth_histogram(snapshot['wealths']))
+        drawn = snapshot['round']
 
 st.markdown("---")
 st.caption("Made with ❤️ for economics, AI, and complexity science.") 
\ No newline at end of file
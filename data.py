@@ -1,14 +1,18 @@
 """
 Data storage and analysis utilities for the Virtual Economy Simulator.
-Handles saving/loading results as CSV.
+Handles saving/loading results as CSV, or as an append-only columnar store of .npy files.
 """
-import pandas as pd
+import numpy as np
+import json
 import os
+import queue
+import threading
 
 def save_wealth_history(agents, round_num, save_path):
     """
     Save agent wealths to CSV.
     """
+    import pandas as pd  # Only the CSV paths need pandas
     data = {'agent_id': [a.agent_id for a in agents], 'wealth': [a.wealth for a in agents]}
     df = pd.DataFrame(data)
     os.makedirs(save_path, exist_ok=True)
@@ -18,6 +22,7 @@ def save_price_history(market, save_path):
     """
     Save price history for all goods to CSV.
     """
+    import pandas as pd
     os.makedirs(save_path, exist_ok=True)
     for name, history in market.history.items():
         df = pd.DataFrame({'price': history})
@@ -27,6 +32,167 @@ def save_gini_history(gini_history, save_path):
     """
     Save Gini coefficient history to CSV.
     """
+    import pandas as pd
     os.makedirs(save_path, exist_ok=True)
     df = pd.DataFrame({'gini': gini_history})
-    df.to_csv(os.path.join(save_path, "gini.csv"), index=False) 
\ No newline at end of file
+    df.to_csv(os.path.join(save_path, "gini.csv"), index=False) 
+
+class NpyAppender:
+    """
+    Append-only .npy file whose leading dimension grows as rows are written.
+    The header has a fixed size and is rewritten after every block, so the file can
+    always be opened with np.load(..., mmap_mode='r').
+    """
+    HEADER_LEN = 128
+
+    def __init__(self, path, row_shape=(), dtype=np.float64):
+        self.path = path
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                       'shape': (self.rows,) + self.row_shape})
+        prefix = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+        pad = self.HEADER_LEN - len(prefix) - 2 - len(header) - 1
+        header = (header + ' ' * pad + '\n').encode('latin1')
+        self.file.seek(0)
+        self.file.write(prefix + len(header).to_bytes(2, 'little') + header)
+
+    def append(self, block):
+        block = np.ascontiguousarray(block, dtype=self.dtype)
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(block.tobytes())
+        self.rows += len(block)
+        self._write_header()
+        self.file.flush()
+        return block.nbytes
+
+    def close(self):
+        self.file.close()
+
+class ResultsWriter:
+    """
+    Buffers per-round wealth vectors, prices and Gini into chunks and appends them to
+    one store directory (wealth.npy, prices.npy, gini.npy, rounds.npy, meta.json)
+    from a background thread, so the simulation loop does not wait on disk.
+    """
+    def __init__(self, save_path, num_agents, goods, chunk_rounds=64, max_pending=4):
+        os.makedirs(save_path, exist_ok=True)
+        self.save_path = save_path
+        self.num_agents = num_agents
+        self.goods = list(goods)
+        self.chunk_rounds = chunk_rounds
+        self.bytes_written = 0
+        self._files = {
+            'wealth': NpyAppender(os.path.join(save_path, 'wealth.npy'), (num_agents,)),
+            'prices': NpyAppender(os.path.join(save_path, 'prices.npy'), (len(self.goods),)),
+            'gini': NpyAppender(os.path.join(save_path, 'gini.npy')),
+            'rounds': NpyAppender(os.path.join(save_path, 'rounds.npy'), dtype=np.int64),
+        }
+        self._new_buffers()
+        # A full queue blocks append() (backpressure) instead of growing memory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _new_buffers(self):
+        self._buffers = {
+            'wealth': np.empty((self.chunk_rounds, self.num_agents)),
+            'prices': np.empty((self.chunk_rounds, len(self.goods))),
+            'gini': np.empty(self.chunk_rounds),
+            'rounds': np.empty(self.chunk_rounds, dtype=np.int64),
+        }
+        self._filled = 0
+
+    def append(self, round_num, wealths, prices, gini):
+        """
+        Record one round. prices maps good name to price.
+        """
+        if self._error is not None:
+            raise self._error
+        i = self._filled
+        self._buffers['wealth'][i] = wealths
+        self._buffers['prices'][i] = [prices[name] for name in self.goods]
+        self._buffers['gini'][i] = gini
+        self._buffers['rounds'][i] = round_num
+        self._filled += 1
+        if self._filled == self.chunk_rounds:
+            self.flush()
+
+    def flush(self):
+        if self._filled:
+            # Hand the filled buffers to the writer thread and start new ones
+            self._queue.put({name: buf[:self._filled] for name, buf in self._buffers.items()})
+            self._new_buffers()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            try:
+                for name, block in chunk.items():
+                    self.bytes_written += self._files[name].append(block)
+            except Exception as e:
+                self._error = e
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.save_path, 'meta.json'), 'w') as f:
+            json.dump({'num_agents': self.num_agents, 'goods': self.goods,
+                       'rounds': self._files['rounds'].rows}, f)
+        if self._error is not None:
+            raise self._error
+
+class ResultsReader:
+    """
+    Memory-mapped reader for a ResultsWriter store. Slices are read from disk on demand.
+    """
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self.wealth = np.load(os.path.join(save_path, 'wealth.npy'), mmap_mode='r')
+        self.prices = np.load(os.path.join(save_path, 'prices.npy'), mmap_mode='r')
+        self.gini = np.load(os.path.join(save_path, 'gini.npy'), mmap_mode='r')
+        self.rounds = np.load(os.path.join(save_path, 'rounds.npy'))
+        meta_path = os.path.join(save_path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.goods = json.load(f)['goods']
+        else:
+            self.goods = [f"good_{i}" for i in range(self.prices.shape[1])]
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def _row(self, round_num):
+        i = int(np.searchsorted(self.rounds, round_num))
+        if i >= len(self.rounds) or self.rounds[i] != round_num:
+            raise KeyError(f"Round {round_num} not in store")
+        return i
+
+    def wealth_at(self, round_num):
+        """
+        Wealth of every agent at one round.
+        """
+        return np.array(self.wealth[self._row(round_num)])
+
+    def agent_trajectory(self, agent_index):
+        """
+        Wealth of one agent over all stored rounds.
+        """
+        return np.array(self.wealth[:, agent_index])
+
+    def price_history(self, good):
+        return np.array(self.prices[:, self.goods.index(good)])
+
+    def gini_history(self):
+        return np.array(self.gini)
\ No newline at end of file
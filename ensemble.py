@@ -0,0 +1,233 @@
+"""
+Ensemble mode for the Virtual Economy Simulator.
+Steps K replicas of one configuration together. Every replica is a Simulation running the usual
+Economy round; the household step, where the work is, runs once for all replicas over (K, n)
+arrays with a leading replica axis instead of K times over n households.
+
+Example:
+    ensemble = Ensemble(default_params(NUM_ROUNDS=200), replicas=100)
+    ensemble.run()
+    band = quantile_band(ensemble.gini_history, level=0.9)
+"""
+import random
+import statistics
+import types
+import numpy as np
+import config
+from population import AgentPopulation, AgentStreams, BLOCK_SIZE, rule_actions, apply_actions
+from simulation import Simulation
+
+# Settings every replica runs with: replicas share one process and their households live in the
+# ensemble's arrays, so there is nothing to shard, map, spill, log or profile per replica
+REPLICA_SETTINGS = dict(AGENT_BACKEND='vectorized', NUM_SHARDS=1, POPULATION_PATH='', HISTORY_PATH='',
+                        ACTION_LOG=False, ACTION_LOG_PATH='', ENABLE_METRICS=False, PROFILE_ROUNDS=0)
+
+# --- Reductions over the replica axis of (K, rounds) series ---
+def ensemble_mean(series):
+    return np.mean(series, axis=0)
+
+def ensemble_quantiles(series, q):
+    """
+    Per-round quantiles across replicas; shape (len(q), rounds) for a list of q.
+    """
+    return np.quantile(series, q, axis=0)
+
+def quantile_band(series, level=0.9):
+    """
+    Median and the central `level` range of the replicas, per round.
+    """
+    lower, median, upper = np.quantile(series, [(1 - level) / 2, 0.5, (1 + level) / 2], axis=0)
+    return {'median': median, 'lower': lower, 'upper': upper}
+
+def confidence_band(series, level=0.95):
+    """
+    Mean with a normal-approximation confidence interval for it (mean +/- z * standard error).
+    """
+    series = np.asarray(series, dtype=np.float64)
+    mean = series.mean(axis=0)
+    if len(series) < 2:
+        return {'mean': mean, 'lower': mean.copy(), 'upper': mean.copy()}
+    z = statistics.NormalDist().inv_cdf((1 + level) / 2)
+    error = z * series.std(axis=0, ddof=1) / np.sqrt(len(series))
+    return {'mean': mean, 'lower': mean - error, 'upper': mean + error}
+
+def replica_seeds(params, replicas):
+    """
+    RANDOM_SEED, RANDOM_SEED + 1, ... or fresh entropy for unseeded runs.
+    """
+    seed = getattr(params, 'RANDOM_SEED', None)
+    if seed is None:
+        return np.random.SeedSequence().generate_state(replicas).tolist()
+    return list(range(seed, seed + replicas))
+
+class ReplicaPopulation:
+    """
+    Rule-based households of K replicas as (K, n) arrays, with one AgentStreams per replica seed.
+    rows[k] is an AgentPopulation over row k (no copy), used by replica k's Economy like any
+    population; step() runs decide() and apply() for every replica in one set of array operations.
+    """
+    def __init__(self, seeds, num_agents, initial_wealth, risk_profiles, initial_inventory=0, block_size=BLOCK_SIZE,
+                 good='GoodA'):
+        self.profile_names = list(dict.fromkeys(risk_profiles))
+        codes = [self.profile_names.index(p) for p in risk_profiles]
+        replicas = len(seeds)
+        self.wealth = np.full((replicas, num_agents), float(initial_wealth))
+        # Profiles are assigned round-robin, as in Simulation.reset
+        self.risk = np.resize(np.array(codes, dtype=np.int8), num_agents)
+        self.last_action = np.zeros((replicas, num_agents), dtype=np.uint8)
+        self.inventory = np.full((replicas, num_agents), float(initial_inventory))
+        self.streams = [AgentStreams(seed, num_agents, block_size) for seed in seeds]
+        self.good = good
+        self.rows = [AgentPopulation.from_arrays(self.profile_names, self.wealth[k], self.risk, self.last_action[k],
+                                                 self.inventory[k], streams, good)
+                     for k, streams in enumerate(self.streams)]
+        taker = self.profile_names.index('risk_taker') if 'risk_taker' in self.profile_names else -1
+        self.risk_taker = self.risk == taker
+
+    def step(self, prices):
+        """
+        AgentPopulation.decide and apply for every replica at its own price; returns (K, actions) counts.
+        """
+        price = np.asarray(prices, dtype=np.float64)[:, None]
+        last = np.array([row.last_price for row in self.rows], dtype=np.float64)[:, None]
+        draws = np.empty(self.wealth.shape)
+        for row, streams in zip(draws, self.streams):
+            row[:] = streams.uniform()
+        actions = rule_actions(price, last, self.risk_taker, draws)
+        self.last_action[:] = actions
+        return apply_actions(actions, price, self.wealth)
+
+class Replica(Simulation):
+    """
+    One replica of an Ensemble: a Simulation whose households are a row of the ensemble's arrays.
+    It keeps private random states (see Simulation.isolate), so replicas can take turns.
+    """
+    def __init__(self, params, population):
+        self._population = population
+        super().__init__(params)
+        self.isolate()
+
+    def _build_population(self, resume=False):
+        return self._population
+
+    # Within a round only businesses draw, from random; np.random is left alone
+    def _load_rng(self):
+        random.setstate(self._rng_states[0])
+
+    def _save_rng(self):
+        self._rng_states = (random.getstate(), self._rng_states[1])
+
+    def start_round(self):
+        return self.env.start_round()  # News and shocks come from the seeded timeline, not random
+
+    def finish_round(self, env_state, counts):
+        # counts: this replica's household action counts from ReplicaPopulation.step
+        self._load_rng()
+        self.env.add_household_counts(counts)
+        self.env.finish_round(env_state)
+        self._end_round()
+
+class Ensemble:
+    """
+    K replicas of the rule-based, dealer-market economy stepped in lockstep. Replica k (sims[k])
+    is the vectorized Simulation with RANDOM_SEED = seeds[k]: it runs the same Economy round, and
+    its households take the same draws, so any replica can be re-run on its own with identical
+    results. Replicas run with REPLICA_SETTINGS. Histories are (K, rounds) arrays.
+    """
+    def __init__(self, params=None, replicas=None, seeds=None):
+        self.params = params or config
+        if getattr(self.params, 'USE_LLM', False) or getattr(self.params, 'NETWORK_TYPE', ''):
+            raise ValueError("Ensemble mode supports rule-based households on the global market only")
+        if getattr(self.params, 'MARKET_MODE', 'dealer') != 'dealer':
+            raise ValueError("Ensemble mode needs MARKET_MODE = 'dealer'")
+        if seeds is None:
+            seeds = replica_seeds(self.params, replicas or getattr(self.params, 'ENSEMBLE_REPLICAS', 100))
+        self.seeds = list(seeds)
+        self.reset()
+
+    def reset(self):
+        params = self.params
+        values = {name: getattr(params, name) for name in dir(params) if name.isupper()}
+        values.update(REPLICA_SETTINGS)
+        self.replicas = len(self.seeds)
+        self.round = self.round_num = 0
+        self.done = False
+        self.goods = list(params.GOODS)
+        self.population = ReplicaPopulation(self.seeds, getattr(params, 'NUM_AGENTS', 100), params.INITIAL_WEALTH,
+                                            params.RISK_PROFILES, getattr(params, 'INITIAL_INVENTORY', 0),
+                                            getattr(params, 'RNG_BLOCK_SIZE', BLOCK_SIZE))
+        # Building a Simulation seeds the global generators; replicas keep their own copies
+        states = (random.getstate(), np.random.get_state())
+        self.sims = [Replica(types.SimpleNamespace(**dict(values, RANDOM_SEED=seed)), row)
+                     for seed, row in zip(self.seeds, self.population.rows)]
+        random.setstate(states[0])
+        np.random.set_state(states[1])
+
+    # --- Round ---
+    def step(self):
+        if self.done:
+            return
+        states = [sim.start_round() for sim in self.sims]
+        counts = self.population.step([state['prices'][self.population.good] for state in states])
+        for sim, state, row in zip(self.sims, states, counts):
+            sim.finish_round(state, row)
+        self.round += 1
+        self.round_num = self.round
+        self.done = all(sim.done for sim in self.sims)
+
+    def run(self, rounds=None):
+        """
+        Step every replica for rounds (default: until NUM_ROUNDS).
+        """
+        for _ in range(rounds if rounds is not None else getattr(self.params, 'NUM_ROUNDS', 1000)):
+            if self.done:
+                break
+            self.step()
+        return self
+
+    def close(self):
+        for sim in self.sims:
+            sim.env.close()
+
+    # --- Results ---
+    @property
+    def wealth(self):
+        """
+        Household wealth of every replica: (K, n), row k being sims[k]'s households.
+        """
+        return self.population.wealth
+
+    @property
+    def gini_history(self):
+        return np.array([sim.env.gini_history.values() for sim in self.sims]).reshape(self.replicas, self.round)
+
+    @property
+    def price_history(self):
+        """
+        Good name -> (K, rounds) prices at the end of each round.
+        """
+        return {name: np.array([sim.env.market.history[name].values() for sim in self.sims]).reshape(self.replicas, self.round)
+                for name in self.goods}
+
+    def flows(self):
+        """
+        Per-policy revenue and spending as (K, rounds) arrays.
+        """
+        flows = [sim.env.policy_engine.flows() for sim in self.sims]
+        return {name: {kind: np.array([flow[name][kind] for flow in flows]) for kind in ('revenue', 'spending')}
+                for name in (flows[0] if flows else {})}
+
+    def wealth_quantiles(self, q):
+        """
+        Household wealth quantiles of every replica now: (K, len(q)).
+        """
+        return np.quantile(self.wealth, q, axis=1).T
+
+    def summary(self, level=0.9):
+        """
+        Quantile bands of the Gini and price histories across replicas.
+        """
+        bands = {'gini': quantile_band(self.gini_history, level)}
+        for name, history in self.price_history.items():
+            bands[name] = quantile_band(history, level)
+        return bands
\ No newline at end of file
@@ -5,6 +5,17 @@ Handles prices, goods, supply/demand, shocks, and aggregate actions.
 import numpy as np
 import random
 from typing import Dict, List
+from inequality import inequality_stats
+from population import ACTIONS, ACTION_CODES, HOLD, BUY, SELL
+from orderbook import OrderBook, BID, ASK
+from agents import LLMAgent
+from instrumentation import NULL_METRICS
+from memory import MemoryStore, SHARED_FIELDS, AGENT_FIELDS
+from network import TradeNetwork, EdgeFlowLog, NETWORK_STREAM
+from events import timeline_for, PRICE_MULTIPLIER, WEALTH_SHOCK, POLICY_TOGGLE
+from policy import PolicyEngine, build_policies
+from history import HistoryStore
+from actionlog import ActionLog, param_values
 
 class Good:
     """
@@ -21,16 +32,19 @@ class Good:
         if self.supply == 0:
             self.price *= 1.05
         else:
-            self.price *= (1 + 0.01 * (self.demand - self.supply) / max(self.supply, 1))
+            # Excess demand relative to traded volume keeps each move within +/-1%
+            self.price *= (1 + 0.01 * (self.demand - self.supply) / max(self.demand + self.supply, 1))
         self.price = max(1, self.price)
 
 class Market:
     """
     The market where agents trade goods.
+    Price history is one Series per good, recorded in a HistoryStore as 'price/<good>'.
     """
-    def __init__(self, goods: List[str]):
+    def __init__(self, goods: List[str], history=None):
         self.goods = {name: Good(name) for name in goods}
-        self.history = {name: [] for name in goods}
+        store = history if history is not None else HistoryStore()
+        self.history = {name: store.series(f"price/{name}") for name in goods}
 
     def record(self):
         for name, good in self.goods.items():
@@ -48,43 +62,242 @@ class Market:
 class Economy:
     """
     The main environment: manages agents, market, policies, and shocks.
+    Rule-based households can live in a vectorized AgentPopulation; per-object agents
+    (LLM or custom) are stepped one at a time as before.
+    With MARKET_MODE = 'orderbook', buy/sell/produce become limit orders matched in an
+    OrderBook per good, and wealth and inventory move between the actual counterparties.
+    News and shocks come from an EventTimeline built once for the run (see events.py).
+    With NETWORK_TYPE set, households trade only with neighbours on a TradeNetwork, perceive
+    a local price and pass price headlines along edges as sentiment.
+    Prices, Gini, fiscal flows and metrics are recorded in one multi-resolution HistoryStore.
+    With ACTION_LOG, every decision and outcome-shaping draw goes into an ActionLog; with a
+    LogCursor in replay, step() takes them from a log instead of deciding or drawing.
     """
-    def __init__(self, agents, businesses, government, config):
+    def __init__(self, agents, businesses, government, config, population=None, metrics=None, timeline=None):
         self.agents = agents
+        self.population = population
         self.businesses = businesses
         self.government = government
         self.config = config
-        self.market = Market(config.GOODS)
+        self.history = HistoryStore(path=getattr(config, 'HISTORY_PATH', '') or None,
+                                    capacity=getattr(config, 'NUM_ROUNDS', 1000),
+                                    spill_rounds=getattr(config, 'HISTORY_SPILL_ROUNDS', 1 << 16))
+        self.market = Market(config.GOODS, self.history)
         self.round = 0
         self.news = ""
+        self.timeline = timeline if timeline is not None else timeline_for(config)
         self.policies = {}
-        self.gini_history = []
+        self.policy_engine = PolicyEngine(build_policies(config), getattr(config, 'NUM_ROUNDS', 1000), self.history)
+        self.gini_history = self.history.series('gini')
+        self.inequality = None  # Stats for the current wealth state
+        self._inequality_round = -1
+        self.metrics = metrics or NULL_METRICS
+        if self.metrics.enabled:
+            self.metrics.history = self.history
+        self.action_log = None
+        if getattr(config, 'ACTION_LOG', False) or getattr(config, 'ACTION_LOG_PATH', ''):
+            self.action_log = ActionLog(getattr(config, 'ACTION_LOG_CHUNK_ROUNDS', 64), params=param_values(config))
+        self.replay = None  # LogCursor set by actionlog.Replay
+        self.network = None
+        if getattr(config, 'NETWORK_TYPE', '') and population is not None:
+            self._init_network(config, len(population))
+        # Households (population rows first, then object agents) share one memory ring buffer;
+        # on a network each household remembers its own local price
+        num_population = len(population) if population is not None else 0
+        shared_fields, agent_fields = SHARED_FIELDS, AGENT_FIELDS
+        if self.network is not None:
+            shared_fields, agent_fields = (), ('price',) + AGENT_FIELDS
+        if hasattr(population, 'open_memory'):
+            self.memory = population.open_memory(num_population + len(agents), getattr(config, 'MEMORY_LENGTH', 5),
+                                                 shared_fields, agent_fields)
+        else:
+            self.memory = MemoryStore(num_population + len(agents), getattr(config, 'MEMORY_LENGTH', 5),
+                                      shared_fields, agent_fields)
+        if population is not None:
+            population.memory = self.memory
+        for i, agent in enumerate(agents):
+            agent.attach_memory(self.memory, num_population + i)
+        self.books = None
+        if getattr(config, 'MARKET_MODE', 'dealer') == 'orderbook':
+            self.books = {name: OrderBook() for name in self.market.goods}
+            self._orders = []  # (account, side, limit price) from per-object agents this round
+            # Account ids: population indices first, then object agents, then businesses
+            self._account_offset = len(population) if population is not None else 0
+            self._accounts = agents + businesses
+            self._account_ids = {id(a): self._account_offset + i for i, a in enumerate(self._accounts)}
+            if self.network is not None:
+                raise ValueError("NETWORK_TYPE needs MARKET_MODE = 'dealer'")
+
+    def _init_network(self, config, num_agents):
+        seed = getattr(config, 'RANDOM_SEED', None)
+        # Own stream, so the graph and news seeding do not shift the agents' draws
+        self.network_rng = np.random.default_rng(None if seed is None else [seed, NETWORK_STREAM])
+        self.network = TradeNetwork.generate(config.NETWORK_TYPE, num_agents, getattr(config, 'NETWORK_DEGREE', 10),
+                                             getattr(config, 'NETWORK_REWIRE', 0.1), self.network_rng)
+        self.sentiment = np.zeros(num_agents)  # Log price expectation from headlines heard
+        self.local_imbalance = np.zeros(num_agents)  # Neighbours' net demand last round, per link
+        self.local_prices = None
+        flows_path = getattr(config, 'NETWORK_FLOWS_PATH', '')
+        self.flow_log = EdgeFlowLog(flows_path, self.network) if flows_path else None
 
     def step(self):
+        env_state = self.start_round()
+        if self.population is not None:
+            self._step_population(env_state)
+        self.finish_round(env_state)
+
+    def start_round(self):
+        """
+        First part of step(): news and shocks, then the state agents decide on (returned).
+        ensemble.py starts the round of every replica, steps all their households at once
+        (add_household_counts) and then finishes each round.
+        """
+        metrics = self.metrics
+        if hasattr(self.population, 'begin_round'):
+            self.population.begin_round()  # Memory-mapped households keep the committed round intact
+        if self.replay is not None:
+            self.replay.begin(self.round)
         # 1. Generate news/shocks
-        self.news = self._generate_news()
+        with metrics.phase('news'):
+            self.news = self._apply_events()
         # 2. Agents perceive and decide
-        env_state = self._get_env_state()
-        for agent in self.agents + self.businesses:
-            agent.perceive(self.news, self.market.goods, self.policies)
-            action = agent.decide(env_state)
-            self._apply_action(agent, action)
+        with metrics.phase('env_state'):
+            return self._get_env_state()
+
+    def finish_round(self, env_state):
+        """
+        Rest of step() once the households have acted: other agents, government, market and stats.
+        """
+        metrics = self.metrics
+        llm_agents = [a for a in self.agents if isinstance(a, LLMAgent)]
+        if llm_agents and self.replay is None:
+            with metrics.phase('llm_dispatch'):
+                LLMAgent.prefetch_decisions(llm_agents, env_state)
+        movers = self.agents + self.businesses
+        if self.replay is not None:
+            with metrics.phase('decide'):
+                actions = self._decide_movers(movers, env_state)
+            with metrics.phase('apply'):
+                for agent, action in zip(movers, actions):
+                    self._apply_action(agent, action)
+        else:
+            # Each agent acts before the next one decides: decisions and actions share the
+            # global random draws, so this order is what seeded runs reproduce
+            actions = []
+            for agent in movers:
+                with metrics.phase('decide'):
+                    action = self._decide(agent, env_state)
+                with metrics.phase('apply'):
+                    self._apply_action(agent, action)
+                actions.append(action)
+            if self.action_log is not None:
+                self.action_log.add_actions(actions)
+        if metrics.enabled:
+            for action in actions:
+                metrics.count(f"action_{action}")
+        if self.books is not None:
+            with metrics.phase('matching'):
+                self._match_orders()
         # 3. Government acts
-        gov_action = self.government.decide(env_state)
-        self._apply_gov_action(gov_action)
+        with metrics.phase('government'):
+            gov_action = self._decide_movers([self.government], env_state)[0]
+            self._apply_gov_action(gov_action)
         # 4. Update market
-        self.market.update_prices()
-        self.market.record()
-        self.market.clear()
+        with metrics.phase('market'):
+            if self.books is None:
+                self.market.update_prices()
+            self.market.record()
+            self.market.clear()
         # 5. Update stats
-        self.gini_history.append(self._gini())
+        with metrics.phase('memory'):
+            self._record_memory(env_state, actions)
+        if self.action_log is not None:
+            self.action_log.end_round()
         self.round += 1
+        with metrics.phase('inequality'):
+            self.gini_history.append(self._gini())
+
+    def _decide_movers(self, movers, env_state):
+        if self.replay is not None:
+            actions = self.replay.take_actions(len(movers))
+            for agent, action in zip(movers, actions):
+                agent.last_action = action
+            return actions
+        actions = [self._decide(agent, env_state) for agent in movers]
+        if self.action_log is not None:
+            self.action_log.add_actions(actions)
+        return actions
+
+    def _decide(self, agent, env_state):
+        agent.perceive(self.news, self.market.goods, self.policies)
+        return agent.decide(env_state)
+
+    def _decide_population(self, env_state, **kwargs):
+        population = self.population
+        if self.replay is not None:
+            population.last_action[:] = self.replay.take_codes(len(population))
+            return population.last_action
+        actions = population.decide(env_state, **kwargs)
+        if self.action_log is not None:
+            self.action_log.add_codes(actions)
+        return actions
 
-    def _generate_news(self):
-        # Placeholder: random news
-        if self.config.ENABLE_MARKET_SHOCKS and random.random() < 0.05:
-            return "Shock: sudden interest rate change!"
-        return "Normal trading day."
+    def _draws(self, n, draw):
+        # n values from draw(), or the logged ones when replaying
+        if self.replay is not None:
+            return self.replay.take_draws(n)
+        values = draw()
+        if self.action_log is not None:
+            self.action_log.add_draws(values)
+        return values
+
+    def _record_memory(self, env_state, actions):
+        # One vectorized write per round: price seen, action taken and resulting wealth
+        codes = np.fromiter((ACTION_CODES.get(a, HOLD) for a in actions[:len(self.agents)]),
+                            dtype=np.float64, count=len(self.agents))
+        price = env_state['prices']['GoodA']
+        if self.population is not None:
+            codes = [self.population.last_action, codes]
+            if self.network is not None:
+                price = np.concatenate([self.local_prices, np.full(len(self.agents), price)])
+        # Written in parts, so a memory-mapped population is never copied whole
+        wealth = [self.wealths(lo, hi) for lo, hi in self.household_spans()]
+        self.memory.record(price=price, action=codes, wealth=wealth)
+
+    def _apply_events(self):
+        # Only this round's slice of the timeline is touched
+        timeline = self.timeline
+        start, stop = timeline.span(self.round)
+        for i in range(start, stop):
+            effect, value = timeline.effects[i], timeline.values[i]
+            target = timeline.targets[timeline.target_ids[i]]
+            if effect == PRICE_MULTIPLIER and self.network is not None and target in ('', self.population.good):
+                self._seed_sentiment(value)
+            elif effect == PRICE_MULTIPLIER:
+                for name, good in self.market.goods.items():
+                    if not target or name == target:
+                        good.price *= value
+            elif effect == WEALTH_SHOCK:
+                self._wealth_shock(value, target)
+            elif effect == POLICY_TOGGLE:
+                self.policies[target] = bool(value)
+        return timeline.news(self.round)
+
+    def _wealth_shock(self, factor, target):
+        # target: '' for all households, a risk profile, or 'businesses'
+        if target == 'businesses':
+            for business in self.businesses:
+                business.wealth *= factor
+        else:
+            if self.population is not None:
+                if target:
+                    self.population.wealth[self.population.profile_mask(target)] *= factor
+                else:
+                    self.population.wealth *= factor
+            for agent in self.agents:
+                if not target or agent.risk_profile == target:
+                    agent.wealth *= factor
+        self._inequality_round = -1
 
     def _get_env_state(self):
         prices = {name: good.price for name, good in self.market.goods.items()}
@@ -95,7 +308,161 @@ class Economy:
             'gini': self._gini(),
         }
 
+    def _seed_sentiment(self, factor):
+        # A headline reaches a few households first and spreads along edges in later rounds
+        heard = self.network_rng.random(len(self.sentiment)) < getattr(self.config, 'NETWORK_NEWS_SEED', 0.01)
+        self.sentiment[heard] += np.log(factor)
+
+    def _step_network(self, env_state):
+        population, network = self.population, self.network
+        good = self.market.goods[population.good]
+        if self.sentiment.any():
+            spread = getattr(self.config, 'NETWORK_NEWS_SPREAD', 0.5)
+            self.sentiment = getattr(self.config, 'NETWORK_NEWS_DECAY', 0.9) * (
+                (1 - spread) * self.sentiment + spread * network.neighbor_mean(self.sentiment))
+            self.sentiment[np.abs(self.sentiment) < 1e-6] = 0.0  # Let faded news stop costing a pass
+        # Local price: global price, neighbours' net demand, news heard and observation noise
+        sensitivity = getattr(self.config, 'NETWORK_PRICE_SENSITIVITY', 0.05)
+        noise = getattr(self.config, 'NETWORK_PRICE_NOISE', 0.01) * self.network_rng.standard_normal(len(population))
+        local = good.price * (1 + sensitivity * self.local_imbalance) * np.exp(self.sentiment + noise)
+        self.local_prices = local
+        with self.metrics.phase('decide'):
+            # Households compare their local price with their neighbourhood's: buy below it, sell above it
+            local_state = dict(env_state, prices=dict(env_state['prices'], **{population.good: local}))
+            actions = self._decide_population(local_state, last_price=network.neighbor_mean(local))
+        with self.metrics.phase('apply'):
+            buy = ((actions == BUY) & (population.wealth > local)).astype(np.float64)
+            sell = (actions == SELL).astype(np.float64)
+            # Neighbour counts of sellers and buyers in one pass over the edges
+            sellers, buyers = network.neighbor_sum(np.column_stack([sell, buy])).T
+            # A buyer with selling neighbours pays its local price, split evenly among them
+            buy *= sellers > 0
+            share = buy / np.maximum(sellers, 1)
+            paid = buy * local
+            received = network.neighbor_sum(paid * share) * sell
+            population.wealth -= paid
+            population.wealth += received
+            self.local_imbalance = (buyers - sellers) / np.maximum(network.degree, 1)
+            # Non-trading effects (invest) go through apply; trades replace holds in the counts
+            counts = population.apply(np.where((actions == BUY) | (actions == SELL), HOLD, actions), good.price)
+            counts[BUY] = np.count_nonzero(buy)
+            counts[SELL] = np.count_nonzero(received)
+            counts[HOLD] -= counts[BUY] + counts[SELL]
+        if self.flow_log is not None:
+            with self.metrics.phase('flows'):
+                self.flow_log.append(self.round, *network.edge_values(paid * share, sell))
+        return counts
+
+    def _step_population(self, env_state):
+        good = self.market.goods[self.population.good]
+        if self.network is not None:
+            counts = self._step_network(env_state)
+        else:
+            with self.metrics.phase('decide'):
+                actions = self._decide_population(env_state)
+            if self.books is not None:
+                self._queue_population_orders(actions, good.price)
+                # Only non-trading effects (invest) are applied directly
+                actions = np.where((actions == BUY) | (actions == SELL), HOLD, actions)
+            with self.metrics.phase('apply'):
+                counts = self.population.apply(actions, good.price)
+        self.add_household_counts(counts)
+
+    def add_household_counts(self, counts):
+        """
+        Book the households' effective actions this round (counts per action code) as market
+        demand and supply.
+        """
+        good = self.market.goods[self.population.good]
+        good.demand += int(counts[BUY])
+        # On a network every unit bought was sold to a neighbour, so the market sees matched demand and supply
+        good.supply += int(counts[BUY] if self.network is not None else counts[SELL])
+        if self.metrics.enabled:
+            for code, n in enumerate(counts):
+                if n:
+                    self.metrics.count(f"action_{ACTIONS[code]}", int(n))
+
+    def _queue_population_orders(self, actions, price):
+        population = self.population
+        spread = getattr(self.config, 'ORDER_SPREAD', 0.02)
+        bids = (actions == BUY) & (population.wealth > price * (1 + spread))
+        asks = (actions == SELL) & (population.inventory >= 1)
+        bid_ids, ask_ids = np.flatnonzero(bids), np.flatnonzero(asks)
+        if self.replay is None:
+            uniform = population.uniform()  # Drawn for every household, so the streams stay aligned
+        draws = self._draws(len(bid_ids) + len(ask_ids), lambda: np.concatenate([uniform[bid_ids], uniform[ask_ids]]))
+        self._population_orders = (bid_ids, ask_ids, draws[:len(bid_ids)], draws[len(bid_ids):])
+
+    def _queue_object_order(self, agent, side):
+        price = self.market.goods['GoodA'].price
+        spread = getattr(self.config, 'ORDER_SPREAD', 0.02)
+        u = self._draws(1, lambda: [random.random()])[0]
+        limit = price * (1 + spread * u) if side == BID else price * (1 - spread * u)
+        if side == BID and agent.wealth < limit:
+            return
+        self._orders.append((self._account_ids[id(agent)], side, limit))
+
+    def _match_orders(self):
+        good = self.market.goods['GoodA']
+        book = self.books['GoodA']
+        book.round = self.round
+        spread = getattr(self.config, 'ORDER_SPREAD', 0.02)
+        owners, sides, limits = [], [], []
+        if self.population is not None and getattr(self, '_population_orders', None) is not None:
+            bid_ids, ask_ids, bid_u, ask_u = self._population_orders
+            owners += [bid_ids, ask_ids]
+            sides += [np.full(len(bid_ids), BID, dtype=np.int8), np.full(len(ask_ids), ASK, dtype=np.int8)]
+            limits += [good.price * (1 + spread * bid_u), good.price * (1 - spread * ask_u)]
+            self._population_orders = None
+        if self._orders:
+            account, side, limit = zip(*self._orders)
+            owners.append(np.array(account, dtype=np.int64))
+            sides.append(np.array(side, dtype=np.int8))
+            limits.append(np.array(limit, dtype=np.float64))
+            self._orders = []
+        if not owners:
+            return
+        sides = np.concatenate(sides)
+        good.demand, good.supply = int(np.sum(sides == BID)), int(np.sum(sides == ASK))
+        start = len(book.tape['qty'])
+        book.submit_batch(np.concatenate(owners), sides, np.ones(len(sides)), np.concatenate(limits))
+        book.match_batch()
+        book.clear_orders()  # Day orders: unfilled remainders are cancelled
+        trades = book.trades(start)
+        self._settle(trades)
+        if len(trades['qty']):
+            good.price = float(np.sum(trades['price'] * trades['qty']) / np.sum(trades['qty']))
+        else:
+            good.update_price()
+        self.metrics.count('trades', len(trades['qty']))
+
+    def _settle(self, trades):
+        cost = trades['price'] * trades['qty']
+        offset, accounts = self._account_offset, self._accounts
+        if self.population is not None:
+            population = self.population
+            for ids, sign in ((trades['buyer'], -1), (trades['seller'], 1)):
+                mine = ids < offset
+                population.wealth += sign * np.bincount(ids[mine], weights=cost[mine], minlength=offset)
+                population.inventory -= sign * np.bincount(ids[mine], weights=trades['qty'][mine], minlength=offset)
+        for buyer, seller, value, qty in zip(trades['buyer'], trades['seller'], cost, trades['qty']):
+            if buyer >= offset:
+                accounts[buyer - offset].wealth -= value
+                accounts[buyer - offset].inventory += qty
+            if seller >= offset:
+                accounts[seller - offset].wealth += value
+                accounts[seller - offset].inventory -= qty
+
     def _apply_action(self, agent, action):
+        if self.books is not None and action in ('buy', 'sell', 'produce'):
+            if action == 'buy':
+                self._queue_object_order(agent, BID)
+            elif action == 'sell' and agent.inventory >= 1:
+                self._queue_object_order(agent, ASK)
+            elif action == 'produce':
+                agent.inventory += 1
+                self._queue_object_order(agent, ASK)
+            return
         # Example: buy/sell logic
         if action == 'buy' and agent.wealth > self.market.goods['GoodA'].price:
             agent.wealth -= self.market.goods['GoodA'].price
@@ -110,27 +477,60 @@ class Economy:
         elif action == 'produce':
             self.market.goods['GoodA'].supply += 1
         elif action == 'adjust_price':
-            self.market.goods['GoodA'].price *= random.uniform(0.95, 1.05)
+            self.market.goods['GoodA'].price *= self._draws(1, lambda: [random.uniform(0.95, 1.05)])[0]
 
     def _apply_gov_action(self, action):
         if action == 'enable_UBI':
             self.policies['UBI'] = True
         elif action == 'disable_UBI':
             self.policies['UBI'] = False
-        # Apply UBI
-        if self.policies.get('UBI', False):
-            for agent in self.agents:
-                agent.wealth += self.config.UBI_AMOUNT
-        # Apply wealth tax
-        if self.config.ENABLE_WEALTH_TAX:
-            for agent in self.agents:
-                tax = agent.wealth * self.config.WEALTH_TAX_RATE
-                agent.wealth -= tax
+        # UBI, taxes and subsidies as array transforms; the net budget goes to the government
+        self.government.wealth += self.policy_engine.apply(self)
+
+    def close(self):
+        # Release run resources: shard workers, the edge-flow log and spilled history files; save the action log
+        self.history.close()
+        if self.action_log is not None and getattr(self.config, 'ACTION_LOG_PATH', ''):
+            self.action_log.save(self.config.ACTION_LOG_PATH)
+        if self.network is not None and self.flow_log is not None:
+            self.flow_log.close()
+            self.flow_log = None
+        if hasattr(self.population, 'close'):
+            self.population.close()
+
+    def wealths(self, lo=0, hi=None):
+        # Household wealth (rows lo:hi, as a fresh array): vectorized population first, then per-object agents
+        num_population = len(self.population) if self.population is not None else 0
+        hi = num_population + len(self.agents) if hi is None else hi
+        objects = np.array([a.wealth for a in self.agents[max(0, lo - num_population):max(0, hi - num_population)]],
+                           dtype=np.float64)
+        if lo >= num_population:
+            return objects
+        return np.concatenate([self.population.wealth[lo:min(hi, num_population)], objects])
+
+    def household_spans(self):
+        """
+        (lo, hi) household row ranges to process one at a time: the whole range, or the chunks of a
+        memory-mapped population followed by the object agents.
+        """
+        total = (len(self.population) if self.population is not None else 0) + len(self.agents)
+        if not hasattr(self.population, 'chunk_spans'):
+            return [(0, total)]
+        spans = self.population.chunk_spans()
+        if self.agents:
+            spans.append((len(self.population), total))
+        return spans
+
+    def inequality_stats(self):
+        # Wealth only changes inside step(), so stats are reused until the next round
+        if self._inequality_round != self.round:
+            if hasattr(self.population, 'inequality_stats'):
+                objects = self.wealths(len(self.population)) if self.agents else None
+                self.inequality = self.population.inequality_stats(objects)
+            else:
+                self.inequality = inequality_stats(self.wealths())
+            self._inequality_round = self.round
+        return self.inequality
 
     def _gini(self):
-        # Calculate Gini coefficient for wealth
-        wealths = np.array([a.wealth for a in self.agents])
-        if len(wealths) == 0:
-            return 0
-        diffsum = np.sum(np.abs(wealths[:, None] - wealths))
-        return diffsum / (2 * len(wealths)**2 * np.mean(wealths)) 
\ No newline at end of file
+        return self.inequality_stats()['gini'] 
\ No newline at end of file
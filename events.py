@@ -0,0 +1,171 @@
+"""
+Scenario timeline and event scheduler for the Virtual Economy Simulator.
+The whole run's news and shocks are drawn up front (one seeded vectorized draw) or loaded from a
+scripted scenario, kept as arrays sorted by round, and each round only touches its own events.
+"""
+import functools
+import json
+import os
+import numpy as np
+from news import NEWS_EVENTS, SHOCK_EVENTS, SHOCK_EFFECTS
+
+EFFECTS = ['none', 'price_multiplier', 'wealth_shock', 'policy_toggle']
+EFFECT_CODES = {name: code for code, name in enumerate(EFFECTS)}
+NONE, PRICE_MULTIPLIER, WEALTH_SHOCK, POLICY_TOGGLE = range(len(EFFECTS))
+TIMELINE_CACHE_SIZE = 32  # Seeded timelines kept for reuse by later runs (sweeps, forks, server sessions)
+
+class EventTimeline:
+    """
+    Events stored column-wise and sorted by round (stable, so same-round events keep their order).
+    Texts and targets are interned; a target is a good for price multipliers (empty = all goods),
+    a risk profile or 'businesses' for wealth shocks (empty = all households), or a policy name.
+    """
+    def __init__(self, events=()):
+        events = list(events)
+        texts = [event.get('text', '') for event in events]
+        targets = [event.get('target', '') for event in events]
+        self.texts = list(dict.fromkeys(texts))
+        self.targets = list(dict.fromkeys(targets))
+        text_ids = {t: i for i, t in enumerate(self.texts)}
+        target_ids = {t: i for i, t in enumerate(self.targets)}
+        self._set_columns(
+            np.array([int(event['round']) for event in events], dtype=np.int64),
+            np.array([EFFECT_CODES[event.get('effect', 'none')] for event in events], dtype=np.int8),
+            np.array([float(event.get('value', 1.0)) for event in events], dtype=np.float64),
+            np.array([text_ids[t] for t in texts], dtype=np.int32),
+            np.array([target_ids[t] for t in targets], dtype=np.int32))
+
+    def _set_columns(self, rounds, effects, values, text_ids, target_ids):
+        order = np.argsort(rounds, kind='stable')
+        self.rounds = rounds[order]
+        self.effects = effects[order].astype(np.int8)
+        self.values = values[order].astype(np.float64)
+        self.text_ids = text_ids[order].astype(np.int32)
+        self.target_ids = target_ids[order].astype(np.int32)
+
+    @classmethod
+    def _from_columns(cls, rounds, effects, values, text_ids, target_ids, texts, targets):
+        timeline = cls()
+        timeline.texts, timeline.targets = list(texts), list(targets)
+        timeline._set_columns(np.asarray(rounds, dtype=np.int64), effects, values, text_ids, target_ids)
+        return timeline
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def events(self):
+        for r, e, v, t, g in zip(self.rounds.tolist(), self.effects.tolist(), self.values.tolist(),
+                                 self.text_ids.tolist(), self.target_ids.tolist()):
+            yield {'round': r, 'effect': EFFECTS[e], 'value': v, 'text': self.texts[t], 'target': self.targets[g]}
+
+    def merge(self, *others):
+        """
+        One timeline with every event; on equal rounds, events keep the order of the arguments.
+        """
+        parts = (self,) + others
+        texts = list(dict.fromkeys(t for part in parts for t in part.texts))
+        targets = list(dict.fromkeys(t for part in parts for t in part.targets))
+        text_ids = {t: i for i, t in enumerate(texts)}
+        target_ids = {t: i for i, t in enumerate(targets)}
+        remap = lambda table, ids: np.array([ids[t] for t in table] or [0], dtype=np.int32)
+        return EventTimeline._from_columns(
+            np.concatenate([p.rounds for p in parts]), np.concatenate([p.effects for p in parts]),
+            np.concatenate([p.values for p in parts]),
+            np.concatenate([remap(p.texts, text_ids)[p.text_ids] for p in parts]),
+            np.concatenate([remap(p.targets, target_ids)[p.target_ids] for p in parts]), texts, targets)
+
+    def span(self, round_num):
+        """
+        Index range [start, stop) of the events scheduled for round_num.
+        """
+        start, stop = np.searchsorted(self.rounds, [round_num, round_num + 1])
+        return int(start), int(stop)
+
+    def news(self, round_num, default="Normal trading day."):
+        start, stop = self.span(round_num)
+        if start == stop:
+            return default
+        return " ".join(self.texts[i] for i in self.text_ids[start:stop].tolist() if self.texts[i]) or default
+
+    # --- Construction ---
+    @classmethod
+    def sample(cls, num_rounds, seed, shock_prob=0.05, enable_shocks=True, report_every=50):
+        """
+        Draw a run's background news and shocks in one pass, mirroring news.generate_news:
+        a shock with probability shock_prob, else a quarterly report every report_every rounds,
+        else a random headline. Shocks carry the effects listed in news.SHOCK_EFFECTS.
+        """
+        rng = np.random.default_rng(seed)
+        rounds = np.arange(num_rounds)
+        shock = (rng.random(num_rounds) < shock_prob) & enable_shocks
+        shock_ids = rng.integers(len(SHOCK_EVENTS), size=num_rounds)
+        news_ids = rng.integers(len(NEWS_EVENTS), size=num_rounds)
+        report = ~shock & (rounds % report_every == 0)
+        # Per-shock lookup tables, indexed by shock_ids
+        shock_effects = [SHOCK_EFFECTS.get(text, ('none', 1.0, '')) for text in SHOCK_EVENTS]
+        targets = list(dict.fromkeys([''] + [target for _, _, target in shock_effects]))
+        effect_table = np.array([EFFECT_CODES[effect] for effect, _, _ in shock_effects], dtype=np.int8)
+        value_table = np.array([value for _, value, _ in shock_effects], dtype=np.float64)
+        target_table = np.array([targets.index(target) for _, _, target in shock_effects], dtype=np.int32)
+        texts = NEWS_EVENTS + ["Quarterly economic report released."] + SHOCK_EVENTS
+        text_ids = np.where(shock, len(NEWS_EVENTS) + 1 + shock_ids, np.where(report, len(NEWS_EVENTS), news_ids))
+        return cls._from_columns(rounds, np.where(shock, effect_table[shock_ids], NONE),
+                                 np.where(shock, value_table[shock_ids], 1.0), text_ids,
+                                 np.where(shock, target_table[shock_ids], 0), texts, targets)
+
+    @classmethod
+    def load_scenario(cls, path):
+        """
+        Load round-pinned events from a JSON list of
+        {"round", "text", "effect", "value", "target"} objects (all but round optional).
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_headlines(cls, lines):
+        """
+        Text-only events from "round: text" lines; lines without a round run one per round from 0.
+        """
+        events = []
+        for i, line in enumerate(lines):
+            head, sep, text = line.partition(':')
+            if sep and head.strip().isdigit():
+                events.append({'round': int(head), 'text': text.strip()})
+            else:
+                events.append({'round': i, 'text': line})
+        return cls(events)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(list(self.events()), f)
+
+def timeline_for(params):
+    """
+    The timeline a params namespace describes: sampled news/shocks plus SCENARIO_PATH and CUSTOM_NEWS.
+    """
+    scenario = getattr(params, 'SCENARIO_PATH', '')
+    key = (getattr(params, 'NUM_ROUNDS', 1000), getattr(params, 'RANDOM_SEED', None),
+           getattr(params, 'ENABLE_MARKET_SHOCKS', True), getattr(params, 'SHOCK_PROBABILITY', 0.05),
+           scenario, _file_version(scenario), tuple(getattr(params, 'CUSTOM_NEWS', ())))
+    if key[1] is None:
+        return _build_timeline(*key)  # Unseeded runs each get their own draw
+    return _cached_timeline(*key)
+
+def _file_version(path):
+    # Modification time and size, so an edited scenario file is loaded again instead of served from the cache
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def _build_timeline(num_rounds, seed, shocks, shock_prob, scenario, version, custom):
+    parts = [EventTimeline.sample(num_rounds, seed, shock_prob, shocks)]
+    if scenario:
+        parts.append(EventTimeline.load_scenario(scenario))
+    if custom:
+        parts.append(EventTimeline.from_headlines(custom))
+    return parts[0].merge(*parts[1:])
+
+# Least recently used timelines are dropped, so long sweeps over many seeds stay bounded
+_cached_timeline = functools.lru_cache(maxsize=TIMELINE_CACHE_SIZE)(_build_timeline)
\ No newline at end of file
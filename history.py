@@ -0,0 +1,248 @@
+"""
+Multi-resolution time series for the Virtual Economy Simulator.
+Per-round values (prices, Gini, fiscal flows, metrics) go into growable preallocated arrays, and
+every FACTOR rounds a min/max/mean bucket is rolled up into tiers of FACTOR, FACTOR**2, ... rounds,
+so a chart can ask for any range at a fixed number of points. With a path, the oldest raw values
+spill to one append-only .npy file per series.
+"""
+import os
+import numpy as np
+from data import NpyAppender
+
+FACTOR = 16  # Rounds per bucket of the finest tier; each coarser tier merges FACTOR buckets
+LEVELS = 3  # Tiers kept: buckets of 16, 256 and 4096 rounds
+SPILL_ROUNDS = 1 << 16  # Raw values a spilled series keeps in memory; older blocks go to disk
+POINTS = 500  # Default points per query
+
+class Series:
+    """
+    One float64 value per round from round `start` on. Reads like the list it replaces: len(),
+    indexing, slices (as arrays), iteration and np.asarray; query() returns a range at bounded
+    resolution from the tiers. Rounds skipped by record() are padded with fill.
+    """
+    def __init__(self, start=0, capacity=1024, factor=FACTOR, levels=LEVELS, path=None, spill_rounds=SPILL_ROUNDS,
+                 fill=np.nan):
+        self.start = start
+        self.factor = factor
+        self.fill = fill
+        self.path = path
+        self.spill_rounds = max(factor, spill_rounds - spill_rounds % factor)  # Whole finest buckets per block
+        self._reset(capacity, levels)
+
+    def _reset(self, capacity, levels):
+        # Preallocate up to two spill blocks; past that, memory grows (or spills) as values arrive
+        self._data = np.empty(max(1, min(capacity, 2 * self.spill_rounds)))
+        self._size = 0  # Values in memory (the newest)
+        self._spilled = 0  # Values on disk (the oldest)
+        self._file = NpyAppender(self.path) if self.path else None
+        # Tier t holds (min, max, mean) rows for buckets of factor ** (t + 1) rounds
+        self._tiers = [np.empty((16, 3)) for _ in range(levels)]
+        self._filled = [0] * levels
+
+    def __len__(self):
+        return self._spilled + self._size
+
+    @property
+    def stop(self):
+        """
+        Round after the last recorded one.
+        """
+        return self.start + len(self)
+
+    # --- Writing ---
+    def append(self, value):
+        if self._size == len(self._data):
+            self._make_room()
+        self._data[self._size] = value
+        self._size += 1
+        if len(self) % self.factor == 0:
+            self._roll_up()
+
+    def record(self, round_num, value):
+        """
+        Set the value of round_num, padding any rounds skipped since the last one with fill.
+        """
+        while self.stop < round_num:
+            self.append(self.fill)
+        if round_num < self.stop:
+            raise ValueError(f"Round {round_num} is already recorded")
+        self.append(value)
+
+    def load(self, values):
+        """
+        Replace the contents with values (e.g. from a checkpoint), rebuilding the tiers in bulk.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self._file is not None:
+            self._file.close()
+        self._reset(len(values), len(self._tiers))
+        keep = len(values)
+        if self._file is not None and len(values) > self.spill_rounds:
+            keep = self.spill_rounds + len(values) % self.spill_rounds
+            self._file.append(values[:len(values) - keep])
+            self._spilled = len(values) - keep
+        if keep >= len(self._data):
+            self._data = np.empty(2 * keep)
+        self._data[:keep] = values[len(values) - keep:]
+        self._size = keep
+        level = np.column_stack([values, values, values])
+        for t in range(len(self._tiers)):
+            full = len(level) // self.factor * self.factor
+            blocks = level[:full].reshape(-1, self.factor, 3)
+            level = np.column_stack([blocks[:, :, 0].min(axis=1), blocks[:, :, 1].max(axis=1), blocks[:, :, 2].mean(axis=1)])
+            self._tiers[t] = np.concatenate([level, np.empty((16, 3))])
+            self._filled[t] = len(level)
+
+    def truncate(self, round_num):
+        """
+        Drop the values of round_num and later (e.g. when a run is restored to an earlier round).
+        """
+        if round_num < self.stop:
+            values = self.values(0, max(0, round_num - self.start))
+            self.start = min(self.start, round_num)
+            self.load(values)
+
+    def _make_room(self):
+        if self._file is not None and self._size >= 2 * self.spill_rounds:
+            # Write all but the newest spill_rounds values to disk and move those to the front
+            block = self._size - self.spill_rounds
+            self._file.append(self._data[:block])
+            self._data[:self.spill_rounds] = self._data[block:self._size]
+            self._spilled += block
+            self._size = self.spill_rounds
+            return
+        grown = np.empty(2 * len(self._data))
+        grown[:self._size] = self._data[:self._size]
+        self._data = grown
+
+    def _roll_up(self):
+        block = self._data[self._size - self.factor:self._size]
+        row = (block.min(), block.max(), block.mean())
+        for t in range(len(self._tiers)):
+            tier, n = self._tiers[t], self._filled[t]
+            if n == len(tier):
+                tier = self._tiers[t] = np.concatenate([tier, np.empty_like(tier)])
+            tier[n] = row
+            self._filled[t] = n = n + 1
+            if n % self.factor:
+                break
+            block = tier[n - self.factor:n]
+            row = (block[:, 0].min(), block[:, 1].max(), block[:, 2].mean())
+
+    # --- Reading ---
+    def values(self, lo=0, hi=None):
+        """
+        Raw values at positions [lo, hi) (position 0 is round start), read from disk when spilled.
+        """
+        hi = len(self) if hi is None else min(hi, len(self))
+        lo = max(0, min(lo, hi))
+        parts = [np.empty(0)]
+        if lo < self._spilled:
+            parts.append(np.array(np.load(self.path, mmap_mode='r')[lo:min(hi, self._spilled)]))
+        if hi > self._spilled:
+            parts.append(self._data[max(lo, self._spilled) - self._spilled:hi - self._spilled].copy())
+        return np.concatenate(parts) if len(parts) > 2 else parts[-1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            lo, hi, step = index.indices(len(self))
+            if step != 1:
+                return self.values()[index]
+            return self.values(lo, max(lo, hi))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index >= self._spilled:
+            return float(self._data[index - self._spilled])
+        return float(self.values(index, index + 1)[0])
+
+    def __iter__(self):
+        return iter(self.values().tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.values()
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def tolist(self):
+        return self.values().tolist()
+
+    def query(self, start=None, stop=None, points=POINTS):
+        """
+        Rounds [start, stop) reduced to at most `points` buckets: arrays 'round' (first round of each
+        bucket), 'min', 'max' and 'mean'. Short ranges come back raw; long ones are read from the
+        coarsest tier that still has `points` buckets in the range, so the cost does not grow with the run.
+        """
+        lo = 0 if start is None else max(0, start - self.start)
+        hi = len(self) if stop is None else min(len(self), stop - self.start)
+        if hi - lo <= points:
+            values = self.values(lo, hi)
+            return {'round': np.arange(lo, lo + len(values)) + self.start, 'min': values, 'max': values, 'mean': values}
+        size, level = 1, -1
+        for t in range(len(self._tiers)):
+            if (hi - lo) // self.factor ** (t + 1) < points:
+                break
+            size, level = self.factor ** (t + 1), t
+        if level < 0:
+            parts = [self._raw_buckets(lo, hi)]
+        else:
+            # Raw head up to the first whole bucket, whole tier buckets, raw tail after the last one
+            last = min(hi // size, self._filled[level])
+            first = min(-(-lo // size), last)
+            rows = self._tiers[level][first:last]
+            parts = [self._raw_buckets(lo, first * size),
+                     (np.arange(first, last) * size, rows[:, 0], rows[:, 1], rows[:, 2], np.full(last - first, size)),
+                     self._raw_buckets(last * size, hi)]
+        rounds, mins, maxs, means, counts = (np.concatenate(column) for column in zip(*parts))
+        # Merge neighbouring buckets down to `points`
+        groups = np.unique(np.linspace(0, len(rounds), points, endpoint=False).astype(np.int64))
+        weights = np.add.reduceat(counts, groups)
+        return {'round': rounds[groups] + self.start, 'min': np.minimum.reduceat(mins, groups),
+                'max': np.maximum.reduceat(maxs, groups), 'mean': np.add.reduceat(means * counts, groups) / weights}
+
+    def _raw_buckets(self, lo, hi):
+        values = self.values(lo, hi)
+        return np.arange(lo, hi), values, values, values, np.ones(len(values))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class HistoryStore:
+    """
+    The named Series of one run, e.g. 'price/GoodA', 'gini', 'fiscal/ubi/spending' or
+    'metrics/time_decide'. With path, each series spills to <path>/<name with / as .>.npy.
+    """
+    def __init__(self, path=None, capacity=1024, factor=FACTOR, levels=LEVELS, spill_rounds=SPILL_ROUNDS):
+        self.path = path
+        self.capacity = capacity
+        self.factor, self.levels, self.spill_rounds = factor, levels, spill_rounds
+        self._series = {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def series(self, name, start=0, fill=np.nan):
+        """
+        The series called name, created starting at round `start` if it does not exist yet.
+        """
+        if name not in self._series:
+            path = os.path.join(self.path, name.replace('/', '.') + '.npy') if self.path else None
+            self._series[name] = Series(start, self.capacity, self.factor, self.levels, path, self.spill_rounds, fill)
+        return self._series[name]
+
+    def __getitem__(self, name):
+        return self._series[name]
+
+    def __contains__(self, name):
+        return name in self._series
+
+    def names(self, prefix=''):
+        return [name for name in self._series if name.startswith(prefix)]
+
+    def query(self, name, start=None, stop=None, points=POINTS):
+        return self._series[name].query(start, stop, points)
+
+    def close(self):
+        for series in self._series.values():
+            series.close()
\ No newline at end of file
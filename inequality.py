@@ -0,0 +1,99 @@
+"""
+Inequality metrics for the Virtual Economy Simulator.
+Sort-based O(n log n) Gini plus Theil, Palma and top shares in one pass.
+"""
+import numpy as np
+
+EMPTY_STATS = {'gini': 0.0, 'theil': 0.0, 'palma': 0.0, 'top1_share': 0.0, 'top10_share': 0.0}
+
+def inequality_stats(wealths):
+    """
+    Compute Gini, Theil, Palma ratio and top 1%/10% wealth shares.
+    Uses one sort and one cumulative sum, so memory stays O(n).
+    """
+    x = np.sort(np.asarray(wealths, dtype=np.float64).ravel())
+    n = len(x)
+    if n == 0:
+        return dict(EMPTY_STATS)
+    cum = np.cumsum(x)
+    total = cum[-1]
+    if total == 0:
+        return dict(EMPTY_STATS)
+    # sum_ij |x_i - x_j| = 2 * sum_i (2i - n - 1) x_i for ascending x (1-indexed)
+    ranks = np.arange(1 - n, n, 2, dtype=np.float64)
+    gini = float(np.dot(ranks, x) / (n * total))
+    # Theil T index; 0 * log(0) is taken as 0 and non-positive wealth is skipped
+    ratio = x / (total / n)
+    pos = ratio > 0
+    theil = float(np.sum(ratio[pos] * np.log(ratio[pos])) / n)
+    top10 = _top_share(cum, 0.10)
+    bottom40 = cum[int(np.floor(0.4 * n)) - 1] / total if n >= 3 else 0.0
+    return {
+        'gini': gini,
+        'theil': theil,
+        'palma': float(top10 / bottom40) if bottom40 > 0 else float('inf'),
+        'top1_share': float(_top_share(cum, 0.01)),
+        'top10_share': float(top10),
+    }
+
+def gini(wealths):
+    """
+    Gini coefficient of a wealth vector in O(n log n).
+    """
+    return inequality_stats(wealths)['gini']
+
+def _top_share(cum, fraction):
+    # Share of total held by the richest ceil(fraction * n) holders
+    n = len(cum)
+    k = max(1, int(np.ceil(fraction * n)))
+    below = cum[n - k - 1] if n - k - 1 >= 0 else 0.0
+    return (cum[-1] - below) / cum[-1]
+def chunked_inequality_stats(chunks, n, runs=None):
+    """
+    inequality_stats over wealth given as chunks (e.g. slices of a memory-mapped array) with n values
+    in total, holding about one chunk in RAM at a time. Each chunk is sorted into runs (an array of
+    n values, e.g. a scratch memmap; in RAM by default), and a value's rank in the whole sorted
+    wealth is its position in its run plus its searchsorted position in every other run.
+    """
+    if n == 0:
+        return dict(EMPTY_STATS)
+    runs = np.empty(n) if runs is None else runs
+    bounds = [0]
+    total = 0.0
+    for chunk in chunks:
+        lo, hi = bounds[-1], bounds[-1] + len(chunk)
+        runs[lo:hi] = np.sort(np.asarray(chunk, dtype=np.float64))
+        total += float(runs[lo:hi].sum())
+        bounds.append(hi)
+    if len(bounds) == 2:
+        return inequality_stats(runs)
+    if total == 0:
+        return dict(EMPTY_STATS)
+    # Sums of the smallest k values give the shares: cum[k - 1] in inequality_stats
+    k40 = int(np.floor(0.4 * n)) if n >= 3 else 0
+    k90, k99 = (n - max(1, int(np.ceil(fraction * n))) for fraction in (0.10, 0.01))
+    smallest = {k: 0.0 for k in (k40, k90, k99)}
+    weighted = theil = 0.0
+    spans = list(zip(bounds[:-1], bounds[1:]))
+    for r, (lo, hi) in enumerate(spans):
+        run = np.array(runs[lo:hi])
+        rank = np.arange(hi - lo, dtype=np.int64)
+        # Ties rank after equal values of earlier runs and before those of later ones
+        for s, (other_lo, other_hi) in enumerate(spans):
+            if s != r:
+                rank += np.searchsorted(runs[other_lo:other_hi], run, side='right' if s < r else 'left')
+        weighted += float(np.dot(2.0 * rank + (1 - n), run))
+        for k in smallest:
+            smallest[k] += float(run[rank < k].sum())
+        ratio = run / (total / n)
+        pos = ratio > 0
+        theil += float(np.sum(ratio[pos] * np.log(ratio[pos])))
+    top10 = (total - smallest[k90]) / total
+    bottom40 = smallest[k40] / total if k40 > 0 else 0.0
+    return {
+        'gini': weighted / (n * total),
+        'theil': theil / n,
+        'palma': float(top10 / bottom40) if bottom40 > 0 else float('inf'),
+        'top1_share': float((total - smallest[k99]) / total),
+        'top10_share': float(top10),
+    }
\ No newline at end of file
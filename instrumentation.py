@@ -0,0 +1,145 @@
+"""
+Instrumentation for the Virtual Economy Simulator.
+Per-round phase timers, counters and sampled gauges, with CSV/JSON/Chrome-trace export and a cProfile window.
+"""
+import cProfile
+import contextlib
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+
+class Metrics:
+    """
+    Collects wall time per phase, counters (e.g. actions by type) and watched gauges
+    (e.g. LLM calls, cache hits, bytes written) for every round. With a HistoryStore in history
+    (the Economy attaches its own), every value is also recorded as a 'metrics/<name>' series.
+    """
+    enabled = True
+
+    def __init__(self, trace=False, history=None):
+        self.trace = trace
+        self.history = history
+        self.rounds = []  # One record per finished round
+        self.totals = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.trace_events = []
+        self._watchers = {}
+        self._phases = defaultdict(float)
+        self._counts = defaultdict(int)
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._phases[name] += end - start
+            if self.trace:
+                self.trace_events.append((name, start - self._origin, end - start))
+
+    def count(self, name, n=1):
+        self._counts[name] += n
+
+    def watch(self, name, fn):
+        """
+        Sample fn() at the end of every round and store it under name.
+        """
+        self._watchers[name] = fn
+
+    def end_round(self, round_num):
+        record = {'round': round_num}
+        for name, seconds in self._phases.items():
+            record[f"time_{name}"] = seconds
+            self.totals[name] += seconds
+        for name, n in self._counts.items():
+            record[name] = n
+            self.counters[name] += n
+        for name, fn in self._watchers.items():
+            record[name] = fn()
+        self.rounds.append(record)
+        if self.history is not None:
+            # Phases and counters missing from a round read as 0 there
+            for name, value in record.items():
+                if name != 'round':
+                    self.history.series(f"metrics/{name}", start=round_num, fill=0.0).record(round_num, value)
+        self._phases = defaultdict(float)
+        self._counts = defaultdict(int)
+
+    def summary(self):
+        rounds = max(1, len(self.rounds))
+        return {
+            'rounds': len(self.rounds),
+            'seconds_per_round': {name: total / rounds for name, total in self.totals.items()},
+            'counters': dict(self.counters),
+            'gauges': {name: fn() for name, fn in self._watchers.items()},
+        }
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'rounds': self.rounds}, f)
+
+    def export_csv(self, path):
+        columns = list(dict.fromkeys(key for record in self.rounds for key in record))
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.rounds)
+
+    def export_chrome_trace(self, path):
+        """
+        Write phases as complete events for chrome://tracing or Perfetto.
+        """
+        events = [{'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': os.getpid(), 'tid': 0}
+                  for name, start, duration in self.trace_events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events}, f)
+
+class NullMetrics:
+    """
+    Do-nothing stand-in used when instrumentation is off.
+    """
+    enabled = False
+    _null_phase = contextlib.nullcontext()
+
+    def phase(self, name):
+        return self._null_phase
+
+    def count(self, name, n=1):
+        pass
+
+    def watch(self, name, fn):
+        pass
+
+    def end_round(self, round_num):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+class RoundProfiler:
+    """
+    Runs cProfile over rounds [start_round, start_round + num_rounds) and dumps pstats to path.
+    """
+    def __init__(self, start_round, num_rounds, path):
+        self.start_round = start_round
+        self.stop_round = start_round + num_rounds
+        self.path = path
+        self.profile = None
+
+    def before_round(self, round_num):
+        if round_num == self.start_round:
+            self.profile = cProfile.Profile()
+        if self.profile is not None and round_num < self.stop_round:
+            self.profile.enable()
+
+    def after_round(self, round_num):
+        if self.profile is None:
+            return
+        self.profile.disable()
+        if round_num + 1 >= self.stop_round:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.profile.dump_stats(self.path)
+            self.profile = None
\ No newline at end of file
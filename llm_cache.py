@@ -0,0 +1,87 @@
+"""
+Prompt -> action cache for the LLM interface of the Virtual Economy Simulator.
+In-process LRU with an optional SQLite store that survives across runs and sweeps.
+"""
+import hashlib
+import re
+import sqlite3
+from collections import OrderedDict
+
+WEALTH_PATTERN = re.compile(r'wealth: (-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+
+class PromptCache:
+    """
+    Caches LLM actions keyed by model, temperature and prompt.
+    wealth_bucket > 0 rounds the wealth in prompts down to a bucket so near-identical
+    prompts share one entry. With deterministic_only (the default), the cache is only used at
+    temperature 0, so cached answers are exactly what a replay would get.
+    """
+    def __init__(self, max_size=10000, path=None, wealth_bucket=0, deterministic_only=True):
+        self.max_size = max_size
+        self.wealth_bucket = wealth_bucket
+        self.deterministic_only = deterministic_only
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS actions (key TEXT PRIMARY KEY, action TEXT)")
+            self.db.commit()
+
+    def applies(self, temperature):
+        return not self.deterministic_only or temperature == 0
+
+    def key(self, model, temperature, prompt):
+        if self.wealth_bucket:
+            prompt = WEALTH_PATTERN.sub(self._bucket_wealth, prompt)
+        raw = f"{model}\x00{float(temperature)!r}\x00{prompt}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _bucket_wealth(self, match):
+        bucket = int(float(match.group(1)) // self.wealth_bucket) * self.wealth_bucket
+        return f"wealth: {bucket}"
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        if self.db is not None:
+            row = self.db.execute("SELECT action FROM actions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, row[0])
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, action):
+        self._remember(key, action)
+        if self.db is not None:
+            self.db.execute("INSERT OR REPLACE INTO actions (key, action) VALUES (?, ?)", (key, action))
+            self.db.commit()
+
+    def _remember(self, key, action):
+        self.entries[key] = action
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_hits': self.disk_hits,
+            'size': len(self.entries),
+        }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
\ No newline at end of file
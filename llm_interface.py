@@ -1,60 +1,324 @@
 """
 LLM interface for agent reasoning in the Virtual Economy Simulator.
-Supports OpenAI API and mock (rule-based) fallback.
+Supports OpenAI API, any OpenAI-compatible HTTP endpoint, a deterministic offline FakeModel
+(LLM_MODEL = 'fake') and mock (rule-based) fallback.
+An optional PromptCache (llm_cache.py) answers repeated prompts without an API call.
+Batched mode packs many agents into one prompt and parses one '<number>: <option>' line per agent.
 """
-import openai
+import asyncio
+import json
 import random
+import re
+import threading
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import config
 
-# Safely get ChatCompletion and Completion if available
-ChatCompletion = getattr(openai, 'ChatCompletion', None)
-Completion = getattr(openai, 'Completion', None)
+def _openai():
+    # Imported on first use: the package is slow to load and only needed without LLM_API_BASE
+    import openai
+    return openai
+
+ACTION_OPTIONS = ['buy', 'sell', 'save', 'invest']
+BATCH_ACTIONS = ACTION_OPTIONS + ['hold']  # Valid entries in a batched answer
+BATCH_INSTRUCTIONS = ("Decide for each numbered agent below. Reply with exactly one line per agent "
+                      "in the form '<number>: <option>' and nothing else.")
+BATCH_LINE = re.compile(r'^\W*(?:agent\s*)?(\d+)\s*[:.)=-]\s*([a-z_]+)\W*$')
+
+def build_batch_prompt(context, profiles):
+    """
+    One prompt for several agents: the shared context once, then one numbered profile line per agent.
+    """
+    return "\n".join([context, BATCH_INSTRUCTIONS] + [f"{i + 1}: {p}" for i, p in enumerate(profiles)])
+
+def parse_batch(answer, count):
+    """
+    {agent index: action} for the valid lines of a batched answer; unknown numbers, invalid
+    options and repeated numbers (after the first) are dropped, so those agents count as missing.
+    """
+    actions = {}
+    for line in answer.splitlines():
+        match = BATCH_LINE.match(line.strip())
+        if match is None:
+            continue
+        index, action = int(match.group(1)) - 1, match.group(2)
+        if 0 <= index < count and index not in actions and action in BATCH_ACTIONS:
+            actions[index] = action
+    return actions
+
+class FakeModel:
+    """
+    Deterministic offline stand-in for a chat model, for tests and benchmarks. Each agent's
+    option is a hash of its profile line and the news, so batched and per-agent prompts agree.
+    Answers are cut at max_tokens (about 4 characters per token), and drop_rate / garble_rate
+    leave out or corrupt batch lines (decided by hashing the prompt, so re-queries differ).
+    """
+    def __init__(self, drop_rate=0.0, garble_rate=0.0, seed=0):
+        self.drop_rate = drop_rate
+        self.garble_rate = garble_rate
+        self.seed = seed
+
+    def _hash(self, *parts):
+        return zlib.crc32("\x00".join((str(self.seed),) + parts).encode('utf-8'))
+
+    def _choose(self, profile, news):
+        return BATCH_ACTIONS[self._hash(profile, news) % len(BATCH_ACTIONS)]
+
+    def complete(self, prompt, max_tokens):
+        lines = prompt.lower().splitlines()
+        news = next((line for line in lines if line.startswith('market news:')), '')
+        entries = [line.split(': ', 1) for line in lines if line[:1].isdigit() and ': ' in line]
+        if not entries:
+            profile = next((line for line in lines if line.startswith('agent profile:')), prompt.lower())
+            return self._choose(profile, news)
+        answer, budget = [], 4 * max_tokens
+        for number, profile in entries:
+            roll = self._hash(prompt, number) / 2**32
+            if roll < self.drop_rate:
+                continue
+            option = 'maybe' if roll < self.drop_rate + self.garble_rate else self._choose(profile, news)
+            line = f"{number}: {option}"
+            budget -= len(line) + 1
+            if budget < 0:
+                break
+            answer.append(line)
+        return "\n".join(answer)
 
 class LLMInterface:
     """
     Handles LLM-based decision making for agents.
+    get_actions() sends a whole round of prompts concurrently with a bounded number in flight.
     """
-    def __init__(self, model=None, api_key=None, max_tokens=64, temperature=0.7):
+    def __init__(self, model=None, api_key=None, max_tokens=64, temperature=0.7, api_base=None,
+                 concurrency=None, timeout=None, retries=None, backoff=None, cache=None, batch_size=None,
+                 tokens_per_decision=None, requeries=None):
         self.model = model or config.LLM_MODEL
         self.api_key = api_key or config.LLM_API_KEY
         self.max_tokens = max_tokens
         self.temperature = temperature
-        if self.api_key:
-            openai.api_key = self.api_key
+        self.api_base = api_base if api_base is not None else config.LLM_API_BASE
+        self.concurrency = concurrency or config.LLM_CONCURRENCY
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self.retries = retries if retries is not None else config.LLM_RETRIES
+        self.backoff = backoff if backoff is not None else config.LLM_BACKOFF
+        self.cache = cache
+        self.batch_limit = batch_size or config.LLM_BATCH_SIZE
+        self.tokens_per_decision = tokens_per_decision or config.LLM_TOKENS_PER_DECISION
+        self.requeries = requeries if requeries is not None else config.LLM_BATCH_REQUERIES
+        self.fake = FakeModel() if self.model == 'fake' else None
+        self.calls = 0  # Completion requests sent, including retries
+        self._executor = None
+        self._client = None  # openai.OpenAI client (openai >= 1.0), built on first use
+        self._client_lock = threading.Lock()
+        if self.api_key and not self.api_base and self.fake is None:
+            _openai().api_key = self.api_key
+
+    @property
+    def enabled(self):
+        # Local OpenAI-compatible endpoints may not need a key
+        return bool(self.api_key or self.api_base or self.fake is not None)
+
+    @property
+    def batch_size(self):
+        """
+        Agents per batched prompt: LLM_BATCH_SIZE, capped so every answer line fits in max_tokens.
+        """
+        return max(1, min(self.batch_limit, self.max_tokens // self.tokens_per_decision))
+
+    def _cache_key(self, prompt):
+        if self.cache is None or not self.cache.applies(self.temperature):
+            return None
+        return self.cache.key(self.model, self.temperature, prompt)
 
     def get_action(self, prompt):
-        if not self.api_key:
+        if not self.enabled:
             return self.mock_action(prompt)
+        key = self._cache_key(prompt)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            # Try ChatCompletion (for chat models)
-            if ChatCompletion is not None:
-                response = ChatCompletion.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                )
-                answer = response['choices'][0]['message']['content'].strip().lower()
-            elif Completion is not None:
-                # Fallback for older OpenAI versions
-                response = Completion.create(
-                    model=self.model,
-                    prompt=prompt,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                )
-                answer = response['choices'][0]['text'].strip().lower()
-            else:
-                return self.mock_action(prompt)
-            for option in ['buy', 'sell', 'save', 'invest']:
-                if option in answer:
-                    return option
-            return 'hold'
+            self.calls += 1
+            action = self.parse_action(self._complete(prompt))
         except Exception as e:
             print(f"LLM error: {e}")
             return self.mock_action(prompt)
+        if key is not None:
+            self.cache.put(key, action)
+        return action
+
+    def get_actions(self, prompts):
+        """
+        Get actions for many prompts concurrently. Results are returned in prompt order.
+        """
+        if not self.enabled:
+            return [self.mock_action(p) for p in prompts]
+        return asyncio.run(self.get_actions_async(prompts))
+
+    async def get_actions_async(self, prompts):
+        answers, pending = self._split_cached(prompts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._request_with_retry(p, semaphore) for p, _, _ in pending.values()))
+        return self._finish(prompts, answers, pending, results)
+
+    def get_actions_batched(self, context, profiles, prompts):
+        """
+        Actions for agents sharing context (news and options), packing up to batch_size profile
+        lines into each request. prompts are the equivalent per-agent prompts, used for the cache,
+        de-duplication and the mock fallback. Agents missing or malformed in an answer are asked
+        again in smaller batches up to `requeries` times before falling back to mock_action.
+        """
+        if not self.enabled:
+            return [self.mock_action(p) for p in prompts]
+        return asyncio.run(self.get_actions_batched_async(context, profiles, prompts))
+
+    async def get_actions_batched_async(self, context, profiles, prompts):
+        answers, pending = self._split_cached(prompts)
+        items = list(pending.values())
+        results = [None] * len(items)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        missing, size = list(range(len(items))), self.batch_size
+        for _ in range(self.requeries + 1):
+            if not missing:
+                break
+            batches = [missing[i:i + size] for i in range(0, len(missing), size)]
+            parsed = await asyncio.gather(*(self._request_batch(context, [profiles[items[j][2][0]] for j in batch], semaphore)
+                                            for batch in batches))
+            missing = []
+            for batch, actions in zip(batches, parsed):
+                for k, j in enumerate(batch):
+                    if k in actions:
+                        results[j] = actions[k]
+                    else:
+                        missing.append(j)
+            size = max(1, size // 2)  # Smaller follow-ups in case answers were cut at max_tokens
+        return self._finish(prompts, answers, pending, results)
+
+    async def _request_batch(self, context, profiles, semaphore):
+        prompt = build_batch_prompt(context, profiles)
+        actions = await self._request_with_retry(prompt, semaphore, lambda answer: parse_batch(answer, len(profiles)))
+        return actions or {}
+
+    def _split_cached(self, prompts):
+        # Serve cached prompts and send each distinct uncached prompt only once. Without a cache
+        # key (no cache, or sampling it does not cover) every prompt is its own request
+        answers = [None] * len(prompts)
+        pending = {}
+        for i, prompt in enumerate(prompts):
+            key = self._cache_key(prompt)
+            if key is None:
+                pending[i] = (prompt, None, [i])
+                continue
+            if key in pending:
+                pending[key][2].append(i)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                answers[i] = cached
+            else:
+                pending[key] = (prompt, key, [i])
+        return answers, pending
+
+    def _finish(self, prompts, answers, pending, results):
+        for (prompt, key, indices), action in zip(pending.values(), results):
+            if action is not None and key is not None:
+                self.cache.put(key, action)
+            for i in indices:
+                answers[i] = action
+        # Fallbacks are drawn after gathering, in prompt order, so results stay deterministic
+        return [self.mock_action(p) if a is None else a for p, a in zip(prompts, answers)]
+
+    async def _request_with_retry(self, prompt, semaphore, parse=None):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    self.calls += 1
+                    # Every request carries self.timeout to its HTTP client, so a slow one fails in its
+                    # own thread instead of being abandoned there
+                    answer = await loop.run_in_executor(self._executor, self._complete, prompt)
+                return (parse or self.parse_action)(answer)
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"LLM error: {e}")
+                    return None
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    def _complete(self, prompt):
+        # Return the raw lower-cased answer text; raises on any API error
+        if self.fake is not None:
+            return self.fake.complete(prompt, self.max_tokens).strip().lower()
+        if self.api_base:
+            return self._post_chat(prompt)
+        openai = _openai()
+        if hasattr(openai, 'OpenAI'):
+            response = self._openai_client(openai).chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+            )
+            return response.choices[0].message.content.strip().lower()
+        # Pre-1.0 openai: safely get ChatCompletion and Completion if available
+        ChatCompletion = getattr(openai, 'ChatCompletion', None)
+        Completion = getattr(openai, 'Completion', None)
+        # Try ChatCompletion (for chat models)
+        if ChatCompletion is not None:
+            response = ChatCompletion.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                request_timeout=self.timeout,
+            )
+            return response['choices'][0]['message']['content'].strip().lower()
+        if Completion is not None:
+            # Fallback for older OpenAI versions
+            response = Completion.create(
+                model=self.model,
+                prompt=prompt,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                request_timeout=self.timeout,
+            )
+            return response['choices'][0]['text'].strip().lower()
+        raise RuntimeError("No OpenAI completion API available")
+
+    def _openai_client(self, openai):
+        # One client shared by the worker threads; its timeout cancels the HTTP request, and retries
+        # are left to _request_with_retry
+        with self._client_lock:
+            if self._client is None:
+                self._client = openai.OpenAI(api_key=self.api_key or None, timeout=self.timeout, max_retries=0)
+            return self._client
+
+    def _post_chat(self, prompt):
+        # OpenAI-compatible /chat/completions call (local servers, proxies, test endpoints)
+        body = json.dumps({
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+        }).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.api_base.rstrip('/') + '/chat/completions', data=body, headers=headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read().decode('utf-8'))
+        return payload['choices'][0]['message']['content'].strip().lower()
+
+    def parse_action(self, answer):
+        for option in ACTION_OPTIONS:
+            if option in answer:
+                return option
+        return 'hold'
 
     def mock_action(self, prompt):
         # Fallback: simple rule-based logic
         options = ['buy', 'sell', 'save', 'invest', 'hold']
-        return random.choice(options) 
\ No newline at end of file
+        return random.choice(options)
\ No newline at end of file
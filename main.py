@@ -3,20 +3,19 @@ Main entry point for the Virtual Economy Simulator.
 Initializes agents, environment, runs simulation, saves and visualizes results.
 """
 import config
-from agents import BaseAgent, RuleBasedAgent, LLMAgent, BusinessAgent, GovernmentAgent
+from agents import RuleBasedAgent, LLMAgent, BusinessAgent, GovernmentAgent
 from environment import Economy
-from llm_interface import LLMInterface
-from news import generate_news
-from visualization import plot_wealth_distribution, plot_price_history, plot_gini
-from data import save_wealth_history, save_price_history, save_gini_history
 from utils import set_random_seed
-import os
+from instrumentation import Metrics, RoundProfiler
 
 if __name__ == "__main__":
     set_random_seed(config.RANDOM_SEED)
     # --- Initialize agents ---
     agents = []
-    llm_interface = LLMInterface() if config.USE_LLM else None
+    llm_interface = None
+    if config.USE_LLM:
+        from llm_interface import LLMInterface  # Plotting, saving and LLM modules load only when used
+        llm_interface = LLMInterface()
     for i in range(config.NUM_AGENTS):
         risk = config.RISK_PROFILES[i % len(config.RISK_PROFILES)]
         if config.USE_LLM:
@@ -29,20 +28,54 @@ if __name__ == "__main__":
     # --- Initialize government ---
     government = GovernmentAgent("GOV", 0, 'neutral')
     # --- Initialize environment ---
-    env = Economy(agents, businesses, government, config)
+    metrics = Metrics(trace=config.METRICS_TRACE) if config.ENABLE_METRICS else None
+    profiler = RoundProfiler(config.PROFILE_START_ROUND, config.PROFILE_ROUNDS, config.PROFILE_PATH) if config.PROFILE_ROUNDS else None
+    env = Economy(agents, businesses, government, config, metrics=metrics)
     # --- Run simulation ---
+    writer = None
+    if config.SAVE_RESULTS:
+        from data import save_wealth_history, save_price_history, save_gini_history, ResultsWriter
+    if config.SAVE_RESULTS and config.RESULTS_FORMAT == 'npy':
+        writer = ResultsWriter(config.RESULTS_PATH, len(env.wealths()), config.GOODS,
+                               chunk_rounds=config.RESULTS_CHUNK_ROUNDS)
+        if metrics is not None:
+            metrics.watch('bytes_written', lambda: writer.bytes_written)
+    from visualization import WealthPlotter
+    plotter = WealthPlotter(config.RESULTS_PATH)
     for round_num in range(config.NUM_ROUNDS):
+        if profiler is not None:
+            profiler.before_round(round_num)
         env.step()
-        if config.SAVE_RESULTS:
-            save_wealth_history(agents, round_num, config.RESULTS_PATH)
+        if writer is not None:
+            prices = {name: good.price for name, good in env.market.goods.items()}
+            with env.metrics.phase('save'):
+                writer.append(round_num, env.wealths(), prices, env.gini_history[-1])
+        elif config.SAVE_RESULTS:
+            with env.metrics.phase('save'):
+                save_wealth_history(agents, round_num, config.RESULTS_PATH)
         if round_num % config.PLOT_INTERVAL == 0:
-            plot_wealth_distribution(agents, round_num, config.RESULTS_PATH)
+            with env.metrics.phase('plot'):
+                plotter.submit(env.wealths(), round_num)
+        if profiler is not None:
+            profiler.after_round(round_num)
+        env.metrics.end_round(round_num)
+    plotter.close()
+    if metrics is not None and config.METRICS_PATH:
+        metrics.export_json(config.METRICS_PATH + '.json')
+        metrics.export_csv(config.METRICS_PATH + '.csv')
+        if config.METRICS_TRACE:
+            metrics.export_chrome_trace(config.METRICS_PATH + '.trace.json')
     # --- Save and plot summary results ---
+    if writer is not None:
+        writer.close()  # Prices and Gini are already in the store
     if config.SAVE_RESULTS:
-        save_price_history(env.market, config.RESULTS_PATH)
-        save_gini_history(env.gini_history, config.RESULTS_PATH)
+        if writer is None:
+            save_price_history(env.market, config.RESULTS_PATH)
+            save_gini_history(env.gini_history, config.RESULTS_PATH)
+        from visualization import plot_price_history, plot_gini
         plot_price_history(env.market, config.RESULTS_PATH)
         plot_gini(env.gini_history, config.RESULTS_PATH)
+    env.close()  # Saves the action log when ACTION_LOG_PATH is set
     # --- Optionally launch dashboard ---
     if config.ENABLE_DASHBOARD:
         try:
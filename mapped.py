@@ -0,0 +1,211 @@
+"""
+Memory-mapped household population for the Virtual Economy Simulator.
+Household arrays are .npy files in one run directory opened as np.memmap, so the population can
+outgrow RAM; decide/apply walk it in chunks of whole RNG blocks. Mutable arrays have two
+generations: a round writes one while the other keeps the last committed round, and commit()
+flushes the written pages and records the round, so a crashed run resumes from its files.
+A new population built over a committed run leaves it resumable until its own first commit.
+"""
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+from population import AgentPopulation, AgentStreams, BLOCK_SIZE, rule_actions, apply_actions, ACTIONS
+from memory import MemoryStore
+from checkpoint import capture, read_checkpoint, write_checkpoint
+from inequality import chunked_inequality_stats
+
+MAP_CHUNK = 1 << 20  # Agents per decide/apply chunk
+MUTABLE = {'wealth': np.float64, 'last_action': np.uint8, 'inventory': np.float64}
+STATE_FILE = 'state.npz'  # Last committed round: a checkpoint without the mapped arrays
+
+class MappedPopulation(AgentPopulation):
+    """
+    AgentPopulation whose wealth, risk, last action, inventory and memory arrays live in path.
+    Draws and results match an in-RAM AgentPopulation with the same seed and block size.
+    """
+    def __init__(self, num_agents, initial_wealth, risk_profiles, path, seed=None, good='GoodA', initial_inventory=0,
+                 block_size=BLOCK_SIZE, chunk_size=MAP_CHUNK, commit_every=1):
+        os.makedirs(path, exist_ok=True)
+        if seed is None:
+            seed = np.random.SeedSequence().entropy  # Recorded so a resumed run rebuilds the same streams
+        profile_names = list(dict.fromkeys(risk_profiles))
+        self.meta = {'num_agents': num_agents, 'profile_names': profile_names, 'seed': seed, 'good': good,
+                     'block_size': block_size, 'chunk_size': chunk_size, 'commit_every': commit_every}
+        codes = np.array([profile_names.index(p) for p in risk_profiles], dtype=np.int8)
+        state_path = os.path.join(path, STATE_FILE)
+        self._memory_head = 0
+        if os.path.exists(state_path):
+            # A committed run lives here (e.g. Simulation(params) before resume()): start in the
+            # other generation and leave the committed one, its memory and state.npz untouched
+            _, header = read_checkpoint(state_path)
+            committed = header['mapped']
+            if (committed['num_agents'], committed['profile_names'], committed['commit_every']) != (
+                    num_agents, profile_names, commit_every):
+                raise ValueError(f"{path} holds a different run; resume it or use another POPULATION_PATH")
+            self._open(path, 'r+', committed['generation'])
+            self._bind(1 - committed['generation'])
+            self._memory_head = header['memory_cursor'][0]  # Fresh rounds go to the spare slots
+        else:
+            self._open(path, 'w+')
+        # Profiles are assigned round-robin, as in Simulation.reset
+        for lo, hi, _, _ in self._chunks:
+            risk = codes[np.arange(lo, hi) % len(codes)]
+            if not np.array_equal(self.risk[lo:hi], risk):
+                if self.resumed:
+                    raise ValueError(f"{path} holds a run with other risk profiles; use another POPULATION_PATH")
+                self.risk[lo:hi] = risk
+            self.wealth[lo:hi] = initial_wealth
+            self.inventory[lo:hi] = initial_inventory
+            self.last_action[lo:hi] = 0
+        self.risk.flush()
+
+    @classmethod
+    def open(cls, path):
+        """
+        Reopen the population of a run in path at its last committed round.
+        """
+        _, header = read_checkpoint(os.path.join(path, STATE_FILE))
+        population = cls.__new__(cls)
+        population.meta = dict(header['mapped'])
+        population._memory_head = 0
+        population._open(path, 'r+', header['mapped']['generation'])
+        return population
+
+    def _open(self, path, mode, generation=0):
+        meta = self.meta
+        num_agents = meta['num_agents']
+        self.path = path
+        self.resumed = mode == 'r+'
+        self.profile_names = meta['profile_names']
+        self.good = meta['good']
+        self.memory = None
+        self.commit_every = max(1, meta['commit_every'])
+        self.streams = AgentStreams(meta['seed'], num_agents, meta['block_size'])
+        blocks = max(1, meta['chunk_size'] // meta['block_size'])
+        self._chunks = []
+        for first in range(0, len(self.streams.generators), blocks):
+            lo = first * meta['block_size']
+            self._chunks.append((lo, min(num_agents, lo + blocks * meta['block_size']), first, first + blocks))
+
+        def array(name, dtype):
+            file = os.path.join(path, f"{name}.npy")
+            if mode == 'r+':
+                return np.load(file, mmap_mode='r+')
+            return open_memmap(file, mode='w+', dtype=dtype, shape=(num_agents,))
+
+        self.risk = array('risk', np.int8)
+        self._generations = [{name: array(f"{name}.{g}", dtype) for name, dtype in MUTABLE.items()} for g in (0, 1)]
+        self.committed = generation
+        self._bind(generation)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.path, STATE_FILE)
+
+    def _bind(self, generation):
+        self.live = generation
+        for name, array in self._generations[generation].items():
+            setattr(self, name, array)
+
+    def open_memory(self, num_agents, memory_length, shared_fields, agent_fields):
+        """
+        The Economy's MemoryStore, mapped to memory.npy in the run directory, with a spare slot
+        for each round written between commits.
+        """
+        memory = MemoryStore(num_agents, memory_length, shared_fields, agent_fields,
+                             path=os.path.join(self.path, 'memory.npy'), mode='r+' if self.resumed else 'w+',
+                             spare=self.commit_every)
+        memory.head = self._memory_head
+        return memory
+
+    def chunk_spans(self):
+        """
+        (lo, hi) row ranges of the chunks the population is processed in.
+        """
+        return [(lo, hi) for lo, hi, _, _ in self._chunks]
+
+    def scratch(self, size):
+        """
+        A float64 work array of size in the run directory (sorted wealth runs for chunked statistics).
+        """
+        if getattr(self, '_scratch', None) is None or len(self._scratch) != size:
+            self._scratch = open_memmap(os.path.join(self.path, 'scratch.npy'), mode='w+', dtype=np.float64, shape=(size,))
+        return self._scratch
+
+    # --- Generations ---
+    def begin_round(self):
+        """
+        Called before a round mutates the arrays: after a commit, switch to the other generation
+        and bring it up to date, leaving the committed one untouched until the next commit.
+        Only the RNG blocks that differ are written, so unchanged pages are never dirtied.
+        """
+        if self.live != self.committed:
+            return
+        source = self._generations[self.committed]
+        self._bind(1 - self.committed)
+        block_size = self.meta['block_size']
+        for lo, hi, _, _ in self._chunks:
+            starts = np.arange(0, hi - lo, block_size)
+            for name in MUTABLE:
+                new, old = source[name][lo:hi], getattr(self, name)[lo:hi]
+                changed = np.add.reduceat(new != old, starts) > 0
+                for block in np.flatnonzero(changed):
+                    a = starts[block]
+                    old[a:a + block_size] = new[a:a + block_size]
+
+    def commit(self, sim):
+        """
+        Make sim's current round the restart point (every commit_every rounds and on the last one):
+        flush the live generation and the memory, then atomically replace the state file.
+        """
+        if sim.round_num % self.commit_every and not sim.done:
+            return
+        self.flush()
+        if self.memory is not None:
+            self.memory.flush()
+        arrays, header = capture(sim, mapped_arrays=False)
+        header['mapped'] = dict(self.meta, generation=self.live)
+        path = self.state_path
+        with open(path + '.tmp', 'wb') as f:
+            write_checkpoint(arrays, header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self.committed = self.live
+
+    def flush(self):
+        for array in self._generations[self.live].values():
+            array.flush()
+
+    def close(self):
+        self.flush()
+
+    # --- Chunked rules ---
+    def decide(self, env_state, last_price=None):
+        """
+        Chunked AgentPopulation.decide; returns the mapped last_action array.
+        """
+        price = env_state['prices'][self.good]
+        last = self.last_price if last_price is None else last_price
+        taker = self.profile_names.index('risk_taker') if 'risk_taker' in self.profile_names else -1
+        for lo, hi, first, stop in self._chunks:
+            part = last if np.ndim(last) == 0 else last[lo:hi]
+            self.last_action[lo:hi] = rule_actions(price, part, self.risk[lo:hi] == taker,
+                                                   self.streams.uniform(first, stop))
+        return self.last_action
+
+    def inequality_stats(self, objects=None):
+        """
+        inequality_stats over the mapped wealth (then objects, e.g. per-object agents), one chunk in RAM at a time.
+        """
+        chunks = [self.wealth[lo:hi] for lo, hi in self.chunk_spans()]
+        if objects is not None and len(objects):
+            chunks.append(objects)
+        n = len(self) + (0 if objects is None else len(objects))
+        return chunked_inequality_stats(chunks, n, self.scratch(n) if len(chunks) > 1 else None)
+
+    def apply(self, actions, price):
+        counts = np.zeros(len(ACTIONS), dtype=np.int64)
+        for lo, hi, _, _ in self._chunks:
+            counts += apply_actions(actions[lo:hi], price, self.wealth[lo:hi])
+        return counts
\ No newline at end of file
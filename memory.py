@@ -0,0 +1,130 @@
+"""
+Shared agent memory for the Virtual Economy Simulator.
+A preallocated NumPy ring buffer holding the last memory_length rounds for every household,
+written once per round by the Economy and read by agents through cheap views.
+"""
+import numpy as np
+from numpy.lib.format import open_memmap
+
+SHARED_FIELDS = ('price',)  # Same value for every agent in a round (stored once per slot)
+AGENT_FIELDS = ('action', 'wealth')  # One value per agent per round
+
+class MemoryStore:
+    """
+    Ring buffer of per-round memories. Agent fields are laid out slot-major as
+    (slots, fields, num_agents), so each round's write is contiguous.
+    With path, agent fields live in a memory-mapped .npy file (opened with mode 'w+' or 'r+');
+    spare extra slots let that many rounds be written without overwriting the last committed memories.
+    """
+    def __init__(self, num_agents, memory_length, shared_fields=SHARED_FIELDS, agent_fields=AGENT_FIELDS,
+                 path=None, mode='w+', spare=0):
+        self.num_agents = num_agents
+        self.memory_length = memory_length
+        self.capacity = memory_length + spare  # Physical slots
+        self.path = path
+        self.shared_fields = {name: i for i, name in enumerate(shared_fields)}
+        self.agent_fields = {name: i for i, name in enumerate(agent_fields)}
+        self.shared = np.full((self.capacity, len(shared_fields)), np.nan)
+        shape = (self.capacity, len(agent_fields), num_agents)
+        if path is None:
+            self.data = np.full(shape, np.nan)
+        elif mode == 'r+':
+            self.data = np.load(path, mmap_mode='r+')
+            if self.data.shape != shape:
+                raise ValueError(f"{path} holds memory of shape {self.data.shape}, expected {shape}")
+        else:
+            self.data = open_memmap(path, mode='w+', dtype=np.float64, shape=shape)
+            for slot in self.data:
+                slot[...] = np.nan
+        self.head = 0  # Slot written next
+        self.count = 0  # Filled slots
+
+    def record(self, **values):
+        """
+        Write one round: scalars for shared fields, length-num_agents arrays (or a list of arrays
+        covering the agents in order) for agent fields.
+        """
+        slot = self.head
+        for name, value in values.items():
+            if name in self.shared_fields:
+                self.shared[slot, self.shared_fields[name]] = value
+            elif isinstance(value, list):
+                row, offset = self.data[slot, self.agent_fields[name]], 0
+                for part in value:
+                    row[offset:offset + len(part)] = part
+                    offset += len(part)
+            else:
+                self.data[slot, self.agent_fields[name]] = value
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.memory_length)
+
+    def _slot(self, k):
+        # k follows list indexing over the filled slots, oldest first
+        if k < 0:
+            k += self.count
+        if not 0 <= k < self.count:
+            raise IndexError(k)
+        return (self.head - self.count + k) % self.capacity
+
+    def last(self, name):
+        """
+        Most recent value of a field: a scalar for shared fields, a read-only view for agent fields.
+        """
+        if self.count == 0:
+            return np.nan if name in self.shared_fields else np.full(self.num_agents, np.nan)
+        slot = self._slot(-1)
+        if name in self.shared_fields:
+            return self.shared[slot, self.shared_fields[name]]
+        view = self.data[slot, self.agent_fields[name]]
+        view.flags.writeable = False
+        return view
+
+    def entry(self, row, k):
+        slot = self._slot(k)
+        entry = {name: self.shared[slot, i] for name, i in self.shared_fields.items()}
+        for name, i in self.agent_fields.items():
+            entry[name] = self.data[slot, i, row]
+        return entry
+
+    def flush(self):
+        if self.path is not None:
+            self.data.flush()
+
+    def agent_view(self, row):
+        return AgentMemory(self, row)
+
+    def resize(self, memory_length):
+        """
+        Change the memory length, keeping the most recent entries in order.
+        """
+        if self.path is not None or self.capacity != self.memory_length:
+            raise ValueError("A memory-mapped MemoryStore cannot be resized")
+        keep = min(self.count, memory_length)
+        order = [self._slot(k) for k in range(self.count - keep, self.count)]
+        shared = np.full((memory_length,) + self.shared.shape[1:], np.nan)
+        data = np.full((memory_length,) + self.data.shape[1:], np.nan)
+        shared[:keep] = self.shared[order]
+        data[:keep] = self.data[order]
+        self.shared, self.data = shared, data
+        self.memory_length = self.capacity = memory_length
+        self.count = keep
+        self.head = keep % memory_length
+
+class AgentMemory:
+    """
+    One agent's read-only window onto a MemoryStore; indexes like a list of dicts, oldest first.
+    """
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __len__(self):
+        return self.store.count
+
+    def __getitem__(self, k):
+        return self.store.entry(self.row, k)
+
+    def __iter__(self):
+        return (self.store.entry(self.row, k) for k in range(self.store.count))
\ No newline at end of file
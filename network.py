@@ -0,0 +1,203 @@
+"""
+Trade-network topologies for the Virtual Economy Simulator.
+Agents sit on an undirected graph stored in CSR form (indptr/indices); neighbour sums are
+chunked gathers plus np.add.reduceat, so 1M agents with 20M edges never build per-edge Python
+objects or temporaries larger than one chunk.
+"""
+import json
+import os
+import numpy as np
+from data import NpyAppender
+
+CHUNK_EDGES = 1 << 22  # Directed edges gathered per reduceat pass
+NETWORK_STREAM = 0x6E6574  # Mixed into RANDOM_SEED so the network RNG is independent of agent streams
+
+class TradeNetwork:
+    """
+    Undirected graph over num_agents nodes; every edge is stored in both directions,
+    so neighbor_sum(x) is both A @ x and A.T @ x.
+    """
+    def __init__(self, num_agents, indptr, indices):
+        self.num_agents = num_agents
+        self.indptr = indptr
+        self.indices = indices
+        self.degree = np.diff(indptr)
+        # Row ranges holding at most CHUNK_EDGES edges each (a single huge row gets its own chunk)
+        bounds = [0]
+        while bounds[-1] < num_agents:
+            lo = bounds[-1]
+            hi = int(np.searchsorted(indptr, indptr[lo] + CHUNK_EDGES, side='right')) - 1
+            bounds.append(min(num_agents, max(hi, lo + 1)))
+        self._chunks = list(zip(bounds[:-1], bounds[1:]))
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_edges(cls, num_agents, src, dst):
+        """
+        Build from undirected edge lists; self-loops and duplicate edges are dropped.
+        """
+        src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        # Sorted row-major keys are the CSR order; sort in place and drop repeats
+        keys = np.concatenate([src * num_agents + dst, dst * num_agents + src])
+        del src, dst, keep
+        keys.sort()
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        indptr = np.searchsorted(keys, np.arange(num_agents + 1, dtype=np.int64) * num_agents)
+        indices = (keys % num_agents).astype(np.int32 if num_agents < 2**31 else np.int64)
+        return cls(num_agents, indptr, indices)
+
+    # --- Generators ---
+    @classmethod
+    def lattice(cls, num_agents, degree=4):
+        """
+        Ring lattice: each agent linked to its degree // 2 nearest neighbours on either side.
+        """
+        src = np.repeat(np.arange(num_agents, dtype=np.int64), degree // 2)
+        offsets = np.tile(np.arange(1, degree // 2 + 1, dtype=np.int64), num_agents)
+        return cls.from_edges(num_agents, src, (src + offsets) % num_agents)
+
+    @classmethod
+    def small_world(cls, num_agents, degree=4, rewire=0.1, rng=None):
+        """
+        Watts-Strogatz: a ring lattice whose edges each move to a random endpoint with probability rewire.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        src = np.repeat(np.arange(num_agents, dtype=np.int64), degree // 2)
+        dst = (src + np.tile(np.arange(1, degree // 2 + 1, dtype=np.int64), num_agents)) % num_agents
+        moved = rng.random(len(dst)) < rewire
+        dst[moved] = rng.integers(num_agents, size=int(moved.sum()))
+        return cls.from_edges(num_agents, src, dst)
+
+    @classmethod
+    def scale_free(cls, num_agents, degree=4, rng=None):
+        """
+        Barabasi-Albert preferential attachment with degree // 2 edges per new agent, using the
+        Batagelj-Brandes edge-copy scheme: each new edge's target copies a uniformly chosen
+        earlier endpoint. The copy chains are resolved by pointer jumping instead of a loop.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        m = max(1, degree // 2)
+        num_slots = 2 * num_agents * m
+        # Even slots hold the new agent, odd slots point at an earlier slot to copy
+        pointer = np.arange(num_slots, dtype=np.int64)
+        odd = pointer[1::2]
+        pointer[1::2] = (rng.random(len(odd)) * odd).astype(np.int64)
+        while True:
+            jumped = pointer[pointer]
+            if np.array_equal(jumped, pointer):
+                break
+            pointer = jumped
+        nodes = pointer // (2 * m)  # Slot 2 * (v * m + i) belongs to agent v
+        return cls.from_edges(num_agents, nodes[0::2], nodes[1::2])
+
+    @classmethod
+    def generate(cls, kind, num_agents, degree=4, rewire=0.1, rng=None):
+        if kind == 'lattice':
+            return cls.lattice(num_agents, degree)
+        if kind == 'small_world':
+            return cls.small_world(num_agents, degree, rewire, rng)
+        if kind == 'scale_free':
+            return cls.scale_free(num_agents, degree, rng)
+        raise ValueError(f"Unknown network type {kind!r}")
+
+    # --- Sparse operations ---
+    def neighbor_sum(self, x):
+        """
+        Sum of x over each agent's neighbours (A @ x). x may be (n,) or (n, k) to push k
+        vectors through one pass over the edges.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        # Columns are gathered one at a time: 1-D takes are much faster than row gathers
+        columns = [x] if x.ndim == 1 else [np.ascontiguousarray(x[:, j]) for j in range(x.shape[1])]
+        out = np.zeros((len(columns), self.num_agents))
+        gathered = np.empty(min(len(self.indices), CHUNK_EDGES) + 1)
+        for lo, hi in self._chunks:
+            start, stop = self.indptr[lo], self.indptr[hi]
+            if start == stop:
+                continue
+            if stop - start >= len(gathered):
+                gathered = np.empty(stop - start + 1)  # A single row larger than CHUNK_EDGES
+            # One trailing zero keeps every start index valid, including trailing empty rows;
+            # reduceat gives an empty row the value at its start index, so those are masked below
+            buffer = gathered[:stop - start + 1]
+            buffer[-1] = 0
+            offsets = self.indptr[lo:hi] - start
+            for column, row in zip(columns, out):
+                np.take(column, self.indices[start:stop], out=buffer[:-1], mode='clip')
+                row[lo:hi] = np.add.reduceat(buffer, offsets)
+        out[:, self.degree == 0] = 0
+        return out[0] if x.ndim == 1 else out.T
+
+    def neighbor_mean(self, x):
+        total = self.neighbor_sum(x)
+        degree = np.maximum(self.degree, 1)
+        return total / (degree if total.ndim == 1 else degree[:, None])
+
+    def edge_values(self, row_values, col_values):
+        """
+        Per-edge products row_values[source] * col_values[target], in CSR edge order, for the
+        nonzero edges only: returns (edge ids, values).
+        """
+        edges, values = [], []
+        for lo, hi in self._chunks:
+            start, stop = self.indptr[lo], self.indptr[hi]
+            rows = np.repeat(np.arange(lo, hi), self.degree[lo:hi])
+            chunk = row_values[rows] * col_values[self.indices[start:stop]]
+            nonzero = np.flatnonzero(chunk)
+            edges.append(nonzero + start)
+            values.append(chunk[nonzero])
+        return np.concatenate(edges), np.concatenate(values)
+
+    def save(self, path):
+        np.savez(path, num_agents=self.num_agents, indptr=self.indptr, indices=self.indices)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(int(data['num_agents']), data['indptr'], data['indices'])
+
+class EdgeFlowLog:
+    """
+    Per-round money flows along edges, stored CSR-by-round in save_path: edges.npy (edge ids into
+    the network's CSR order), amounts.npy (float32) and offsets.npy (first entry of each round),
+    plus the network itself (network.npz) so edge ids can be mapped back to agent pairs.
+    """
+    def __init__(self, save_path, network):
+        os.makedirs(save_path, exist_ok=True)
+        self.save_path = save_path
+        network.save(os.path.join(save_path, 'network.npz'))
+        self.edges = NpyAppender(os.path.join(save_path, 'edges.npy'), dtype=np.int64)
+        self.amounts = NpyAppender(os.path.join(save_path, 'amounts.npy'), dtype=np.float32)
+        self.offsets = NpyAppender(os.path.join(save_path, 'offsets.npy'), dtype=np.int64)
+        self.rounds = []
+
+    def append(self, round_num, edges, amounts):
+        self.offsets.append([self.edges.rows])
+        self.edges.append(edges)
+        self.amounts.append(amounts)
+        self.rounds.append(round_num)
+
+    def close(self):
+        for appender in (self.edges, self.amounts, self.offsets):
+            appender.close()
+        with open(os.path.join(self.save_path, 'meta.json'), 'w') as f:
+            json.dump({'rounds': self.rounds}, f)
+
+def load_edge_flows(save_path, k):
+    """
+    (sources, targets, amounts) of the k-th logged round.
+    """
+    network = TradeNetwork.load(os.path.join(save_path, 'network.npz'))
+    offsets = np.load(os.path.join(save_path, 'offsets.npy'))
+    edges = np.load(os.path.join(save_path, 'edges.npy'), mmap_mode='r')
+    amounts = np.load(os.path.join(save_path, 'amounts.npy'), mmap_mode='r')
+    stop = offsets[k + 1] if k + 1 < len(offsets) else len(edges)
+    ids = np.asarray(edges[offsets[k]:stop])
+    sources = np.searchsorted(network.indptr, ids, side='right') - 1
+    return sources, network.indices[ids], np.asarray(amounts[offsets[k]:stop])
\ No newline at end of file
@@ -21,6 +21,15 @@ SHOCK_EVENTS = [
     "Energy crisis.",
 ]
 
+# Effect of each shock on the economy: (effect, value, target), see events.EventTimeline
+SHOCK_EFFECTS = {
+    "Sudden market crash!": ('price_multiplier', 0.8, ''),
+    "Unexpected boom!": ('price_multiplier', 1.2, ''),
+    "Currency devaluation.": ('wealth_shock', 0.95, ''),
+    "Pandemic outbreak.": ('wealth_shock', 0.9, ''),
+    "Energy crisis.": ('price_multiplier', 1.1, ''),
+}
+
 def generate_news(round_num, enable_shocks=True):
     """
     Generate market news, with occasional shocks.
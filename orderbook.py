@@ -0,0 +1,171 @@
+"""
+Limit order book matching engine for the Virtual Economy Simulator.
+Orders live in growable arrays; single orders match continuously through price-time priority heaps
+in O(log n), and bulk submissions match in one vectorized pass over sorted arrays.
+"""
+import heapq
+import numpy as np
+
+BID, ASK = 0, 1
+
+class _Columns:
+    """
+    Growable set of equally long NumPy columns.
+    """
+    def __init__(self, dtypes, capacity=1024):
+        self.dtypes = dtypes
+        self.size = 0
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(next(iter(self.columns.values())))
+        if needed > capacity:
+            capacity = max(needed, 2 * capacity)
+            for name, column in self.columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+
+    def extend(self, **values):
+        n = len(next(iter(values.values())))
+        self.reserve(n)
+        start = self.size
+        for name, value in values.items():
+            self.columns[name][start:start + n] = value
+        self.size += n
+        return start
+
+    def __getitem__(self, name):
+        return self.columns[name][:self.size]
+
+class OrderBook:
+    """
+    Price-time priority limit order book for one good.
+    Market orders are limit orders at an unbounded price whose unfilled remainder is cancelled.
+    Every fill is appended to the trade tape (buyer, seller, price, qty, round).
+    """
+    def __init__(self, capacity=1024):
+        self.orders = _Columns({'owner': np.int64, 'side': np.int8, 'price': np.float64, 'qty': np.float64}, capacity)
+        self.tape = _Columns({'buyer': np.int64, 'seller': np.int64, 'price': np.float64,
+                              'qty': np.float64, 'round': np.int64}, capacity)
+        self.round = 0
+        self._bids = []  # Heap of (-price, order index)
+        self._asks = []  # Heap of (price, order index)
+        self._heaps_stale = False
+
+    # --- Continuous matching ---
+    def submit(self, owner, side, qty, price=None):
+        """
+        Submit one order and match it immediately. Returns the order index.
+        """
+        self._ensure_heaps()
+        market = price is None
+        if market:
+            price = np.inf if side == BID else 0.0
+        oid = self.orders.extend(owner=[owner], side=[side], price=[price], qty=[qty])
+        remaining = float(qty)
+        book = self._asks if side == BID else self._bids
+        qtys, prices, owners = self.orders['qty'], self.orders['price'], self.orders['owner']
+        while remaining > 0 and book:
+            key, rid = book[0]
+            if qtys[rid] <= 0:
+                heapq.heappop(book)
+                continue
+            if (side == BID and prices[rid] > price) or (side == ASK and prices[rid] < price):
+                break
+            fill = min(remaining, qtys[rid])
+            buyer, seller = (owner, owners[rid]) if side == BID else (owners[rid], owner)
+            self._record_trades([buyer], [seller], [prices[rid]], [fill])
+            qtys[rid] -= fill
+            remaining -= fill
+            if qtys[rid] <= 0:
+                heapq.heappop(book)
+        qtys = self.orders['qty']
+        qtys[oid] = 0.0 if market else remaining
+        if remaining > 0 and not market:
+            heapq.heappush(self._bids if side == BID else self._asks, (-price if side == BID else price, oid))
+        return oid
+
+    def _ensure_heaps(self):
+        # Rebuild heaps after a batch match changed resting orders
+        if not self._heaps_stale:
+            return
+        live = np.flatnonzero(self.orders['qty'] > 0)
+        sides, prices = self.orders['side'][live], self.orders['price'][live]
+        self._bids = list(zip((-prices[sides == BID]).tolist(), live[sides == BID].tolist()))
+        self._asks = list(zip(prices[sides == ASK].tolist(), live[sides == ASK].tolist()))
+        heapq.heapify(self._bids)
+        heapq.heapify(self._asks)
+        self._heaps_stale = False
+
+    # --- Batch matching ---
+    def submit_batch(self, owners, sides, qtys, prices):
+        """
+        Add many limit orders at once (arrival order = array order) without matching.
+        """
+        start = self.orders.extend(owner=owners, side=sides, price=prices, qty=qtys)
+        self._heaps_stale = True
+        return start
+
+    def match_batch(self):
+        """
+        Cross all resting orders in one vectorized pass. Bids are ranked by (price desc, arrival)
+        and asks by (price asc, arrival); each fill trades at the price of the earlier order.
+        Returns the number of trades.
+        """
+        qty = self.orders['qty']
+        live = np.flatnonzero(qty > 0)
+        side, price = self.orders['side'][live], self.orders['price'][live]
+        bids, asks = live[side == BID], live[side == ASK]
+        if len(bids) == 0 or len(asks) == 0:
+            return 0
+        all_price = self.orders['price']
+        bids = bids[np.lexsort((bids, -all_price[bids]))]
+        asks = asks[np.lexsort((asks, all_price[asks]))]
+        bid_cum, ask_cum = np.cumsum(qty[bids]), np.cumsum(qty[asks])
+        # Fills are the segments between consecutive cumulative-quantity breakpoints
+        ends = np.union1d(bid_cum, ask_cum)
+        ends = ends[ends <= min(bid_cum[-1], ask_cum[-1])]
+        starts = np.concatenate(([0.0], ends[:-1]))
+        b = bids[np.searchsorted(bid_cum, starts, side='right')]
+        a = asks[np.searchsorted(ask_cum, starts, side='right')]
+        crossing = all_price[b] >= all_price[a]
+        n = len(crossing) if crossing.all() else int(np.argmin(crossing))
+        if n == 0:
+            return 0
+        b, a, fills = b[:n], a[:n], (ends - starts)[:n]
+        trade_price = np.where(b < a, all_price[b], all_price[a])
+        self._record_trades(self.orders['owner'][b], self.orders['owner'][a], trade_price, fills)
+        np.subtract.at(qty, b, fills)
+        np.subtract.at(qty, a, fills)
+        qty[np.abs(qty) < 1e-12] = 0.0
+        self._heaps_stale = True
+        return n
+
+    # --- Tape and lifecycle ---
+    def _record_trades(self, buyers, sellers, prices, qtys):
+        self.tape.extend(buyer=buyers, seller=sellers, price=prices, qty=qtys,
+                         round=np.full(len(qtys), self.round, dtype=np.int64))
+
+    def trades(self, start=0):
+        """
+        Views of the trade tape columns from trade index start onwards.
+        """
+        return {name: self.tape[name][start:] for name in self.tape.columns}
+
+    def best_bid(self):
+        live = (self.orders['qty'] > 0) & (self.orders['side'] == BID)
+        return float(self.orders['price'][live].max()) if live.any() else None
+
+    def best_ask(self):
+        live = (self.orders['qty'] > 0) & (self.orders['side'] == ASK)
+        return float(self.orders['price'][live].min()) if live.any() else None
+
+    def clear_orders(self):
+        """
+        Cancel all resting orders (day orders); the trade tape is kept.
+        """
+        self.orders.size = 0
+        self._bids, self._asks = [], []
+        self._heaps_stale = False
\ No newline at end of file
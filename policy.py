@@ -0,0 +1,270 @@
+"""
+Vectorized policy engine for the Virtual Economy Simulator.
+Each policy is a small declarative object mapping a wealth vector to one array of transfers
+(positive = paid out, negative = collected; a scalar applies to everyone). The PolicyEngine applies active policies in order
+and books each one's revenue and spending per round in preallocated arrays.
+"""
+import numpy as np
+from population import BUY, SELL
+
+class Policy:
+    """
+    Base policy. target is 'households' or 'businesses'; switch names an Economy.policies
+    flag that must be on for the policy to act (None = always on).
+    """
+    name = 'policy'
+    target = 'households'
+    needs_trades = False  # Set when transfers() reads state['traded']
+
+    def __init__(self, switch=None, name=None):
+        self.switch = switch
+        if name is not None:
+            self.name = name
+
+    def active(self, policies):
+        return self.switch is None or policies.get(self.switch, False)
+
+    def transfers(self, wealth, state):
+        raise NotImplementedError
+
+class UBI(Policy):
+    """
+    Flat payment to every household.
+    """
+    name = 'ubi'
+
+    def __init__(self, amount, switch='UBI', name=None):
+        super().__init__(switch, name)
+        self.amount = amount
+
+    def transfers(self, wealth, state):
+        return float(self.amount)
+
+class MeansTestedUBI(Policy):
+    """
+    Full amount below threshold; above it the payment is withdrawn at taper per unit of
+    wealth (taper=None cuts it off at the threshold).
+    """
+    name = 'means_tested_ubi'
+
+    def __init__(self, amount, threshold, taper=None, switch='UBI', name=None):
+        super().__init__(switch, name)
+        self.amount, self.threshold, self.taper = amount, threshold, taper
+
+    def transfers(self, wealth, state):
+        if self.taper is None:
+            return np.where(wealth < self.threshold, float(self.amount), 0.0)
+        excess = np.maximum(wealth - self.threshold, 0.0)
+        return np.maximum(self.amount - self.taper * excess, 0.0)
+
+class WealthTax(Policy):
+    """
+    Flat tax of rate on wealth each round.
+    """
+    name = 'wealth_tax'
+
+    def __init__(self, rate, switch=None, name=None):
+        super().__init__(switch, name)
+        self.rate = rate
+
+    def transfers(self, wealth, state):
+        return -(wealth * self.rate)
+
+class ProgressiveTax(Policy):
+    """
+    Marginal wealth-tax brackets: rates[k] applies to wealth between thresholds[k] and
+    thresholds[k + 1]. Bracket lookup is one np.searchsorted over the whole population.
+    """
+    name = 'progressive_tax'
+
+    def __init__(self, thresholds, rates, switch=None, name=None):
+        super().__init__(switch, name)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        if len(self.thresholds) != len(self.rates) or np.any(np.diff(self.thresholds) <= 0):
+            raise ValueError("thresholds must be increasing and match rates in length")
+        # Lookup tables indexed by searchsorted(thresholds, wealth): slot 0 is the untaxed range
+        # below the first threshold, slot k + 1 carries bracket k's start, rate and tax owed below it
+        base = np.concatenate(([0.0], np.cumsum(np.diff(self.thresholds) * self.rates[:-1])))
+        self._starts = np.concatenate((self.thresholds[:1], self.thresholds))
+        self._rates = np.concatenate(([0.0], self.rates))
+        self._base = np.concatenate(([0.0], base))
+
+    def transfers(self, wealth, state):
+        slot = np.searchsorted(self.thresholds, wealth, side='right')
+        owed = wealth - self._starts.take(slot)
+        owed *= self._rates.take(slot)
+        owed += self._base.take(slot)
+        return np.negative(owed, out=owed)
+
+class TransactionTax(Policy):
+    """
+    Tax of rate times the price on every household that bought or sold this round.
+    """
+    name = 'transaction_tax'
+    needs_trades = True
+
+    def __init__(self, rate, switch=None, name=None):
+        super().__init__(switch, name)
+        self.rate = rate
+
+    def transfers(self, wealth, state):
+        return -(state['traded'] * (self.rate * state['price']))
+
+class BusinessSubsidy(Policy):
+    """
+    Payment to every business whose wealth is below max_wealth.
+    """
+    name = 'business_subsidy'
+    target = 'businesses'
+
+    def __init__(self, amount, max_wealth=np.inf, switch=None, name=None):
+        super().__init__(switch, name)
+        self.amount, self.max_wealth = amount, max_wealth
+
+    def transfers(self, wealth, state):
+        return np.where(wealth < self.max_wealth, float(self.amount), 0.0)
+
+POLICY_TYPES = {cls.name: cls for cls in (UBI, MeansTestedUBI, WealthTax, ProgressiveTax, TransactionTax, BusinessSubsidy)}
+
+def build_policies(config):
+    """
+    Policies described by config: UBI (switched by the government) and the flat wealth tax
+    as before, then every spec in POLICIES, e.g. {'type': 'progressive_tax', 'thresholds': [...], 'rates': [...]}.
+    """
+    policies = [UBI(config.UBI_AMOUNT)]
+    if config.ENABLE_WEALTH_TAX:
+        policies.append(WealthTax(config.WEALTH_TAX_RATE))
+    for spec in getattr(config, 'POLICIES', []):
+        spec = dict(spec)  # The caller's spec keeps its 'type'
+        kind = spec.pop('type', None)
+        if kind not in POLICY_TYPES:
+            raise ValueError(f"Unknown policy type {kind!r} in POLICIES; valid types: {', '.join(POLICY_TYPES)}")
+        policies.append(POLICY_TYPES[kind](**spec))
+    return policies
+
+class PolicyEngine:
+    """
+    Applies policies to the Economy's households and businesses in order (each sees the wealth
+    left by the previous one) and records per-policy revenue and spending for every round, also
+    as 'fiscal/<name>/revenue' and 'fiscal/<name>/spending' series when given a HistoryStore.
+    """
+    def __init__(self, policies, num_rounds=1000, history=None):
+        self.policies = list(policies)
+        self.names = [p.name for p in self.policies]
+        self.history = history
+        self._flow_series = self._series() if history is not None else None
+        capacity = max(1, min(num_rounds, 4096))
+        self.revenue = np.zeros((capacity, len(self.policies)))
+        self.spending = np.zeros((capacity, len(self.policies)))
+        self.rounds = 0  # Rows filled
+
+    def _row(self, round_num):
+        if round_num >= len(self.revenue):
+            capacity = max(round_num + 1, 2 * len(self.revenue))
+            for name in ('revenue', 'spending'):
+                grown = np.zeros((capacity,) + getattr(self, name).shape[1:])
+                grown[:len(getattr(self, name))] = getattr(self, name)
+                setattr(self, name, grown)
+        self.rounds = max(self.rounds, round_num + 1)
+        return round_num
+
+    def apply(self, env):
+        """
+        Apply every active policy for env.round; returns the net budget (revenue - spending).
+        """
+        row = self._row(env.round)
+        active = [(i, p) for i, p in enumerate(self.policies) if p.active(env.policies)]
+        if not active:
+            self._record(row)
+            return 0.0
+        totals = np.zeros(len(self.policies))
+        price = env.market.goods['GoodA'].price
+        household_policies = [(i, p) for i, p in active if p.target == 'households']
+        if household_policies:
+            # Policies act per household, so each span (the whole population unless it is memory-mapped)
+            # goes through all of them before the next one is read
+            for lo, hi in env.household_spans():
+                state = {'price': price}
+                if any(p.needs_trades for _, p in household_policies):
+                    state['traded'] = self._traded(env, lo, hi)
+                wealth = env.wealths(lo, hi)
+                self._transfer(household_policies, wealth, state, totals)
+                self._write_back(env, wealth, lo)
+        business_policies = [(i, p) for i, p in active if p.target == 'businesses']
+        if business_policies:
+            businesses = np.array([b.wealth for b in env.businesses], dtype=np.float64)
+            self._transfer(business_policies, businesses, {'price': price}, totals)
+            for business, value in zip(env.businesses, businesses.tolist()):
+                business.wealth = value
+        # Every policy is either a tax or a benefit, so one sum books its flow
+        for i, _ in active:
+            if totals[i] < 0:
+                self.revenue[row, i] = -totals[i]
+            else:
+                self.spending[row, i] = totals[i]
+        self._record(row)
+        return float(self.revenue[row].sum() - self.spending[row].sum())
+
+    @staticmethod
+    def _transfer(policies, wealth, state, totals):
+        if len(wealth) == 0:
+            return
+        for i, policy in policies:
+            transfer = policy.transfers(wealth, state)
+            wealth += transfer
+            totals[i] += float(np.sum(transfer)) * (len(wealth) if np.ndim(transfer) == 0 else 1)
+
+    def _series(self):
+        # (revenue, spending) Series per policy; repeated names are told apart by position
+        labels = [name if self.names.count(name) == 1 else f"{name}.{i}" for i, name in enumerate(self.names)]
+        return [(self.history.series(f"fiscal/{label}/revenue", fill=0.0),
+                 self.history.series(f"fiscal/{label}/spending", fill=0.0)) for label in labels]
+
+    def _record(self, row):
+        if self._flow_series is None:
+            return
+        for i, (revenue, spending) in enumerate(self._flow_series):
+            revenue.record(row, self.revenue[row, i])
+            spending.record(row, self.spending[row, i])
+
+    @staticmethod
+    def _traded(env, lo, hi):
+        # Households lo:hi that bought or sold this round, in env.wealths() order
+        num_population = len(env.population) if env.population is not None else 0
+        agents = env.agents[max(0, lo - num_population):max(0, hi - num_population)]
+        objects = np.fromiter((a.last_action in ('buy', 'sell') for a in agents), dtype=bool, count=len(agents))
+        if lo >= num_population:
+            return objects
+        codes = env.population.last_action[lo:min(hi, num_population)]
+        return np.concatenate([(codes == BUY) | (codes == SELL), objects])
+
+    @staticmethod
+    def _write_back(env, wealth, lo=0):
+        # wealth holds households lo:lo + len(wealth)
+        num_population = len(env.population) if env.population is not None else 0
+        hi = lo + len(wealth)
+        if lo < num_population:
+            env.population.wealth[lo:min(hi, num_population)] = wealth[:num_population - lo]
+        agents = env.agents[max(0, lo - num_population):max(0, hi - num_population)]
+        for agent, value in zip(agents, wealth[max(0, num_population - lo):].tolist()):
+            agent.wealth = value
+
+    def restore(self, revenue, spending):
+        # Recorded flows from a checkpoint
+        self.rounds = 0
+        if len(revenue):
+            self._row(len(revenue) - 1)
+        self.revenue[:self.rounds] = revenue
+        self.spending[:self.rounds] = spending
+        if self._flow_series is not None:
+            for i, (revenue_series, spending_series) in enumerate(self._flow_series):
+                revenue_series.load(self.revenue[:self.rounds, i])
+                spending_series.load(self.spending[:self.rounds, i])
+
+    def flows(self):
+        """
+        Per-policy revenue and spending arrays over the recorded rounds.
+        """
+        return {name: {'revenue': self.revenue[:self.rounds, i], 'spending': self.spending[:self.rounds, i]}
+                for i, name in enumerate(self.names)}
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Struct-of-arrays agent population for the Virtual Economy Simulator.
+Stores rule-based households as NumPy arrays and runs decide/apply as batched operations.
+"""
+import numpy as np
+
+ACTIONS = ['hold', 'buy', 'sell', 'invest', 'save', 'produce', 'adjust_price']
+ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+HOLD, BUY, SELL, INVEST, SAVE, PRODUCE, ADJUST_PRICE = range(len(ACTIONS))
+BLOCK_SIZE = 4096  # Agents per independent random stream
+
+class AgentStreams:
+    """
+    Independent random streams for fixed-size blocks of agents, spawned from one SeedSequence.
+    A block's draws depend only on the seed and the block index, so any split of the agents
+    along block boundaries (see sharding.py) sees exactly the same numbers.
+    Covers blocks [first_block, first_block + num_blocks) of a population of num_agents.
+    """
+    def __init__(self, seed, num_agents, block_size=BLOCK_SIZE, first_block=0, num_blocks=None):
+        total_blocks = -(-num_agents // block_size)
+        if num_blocks is None:
+            num_blocks = total_blocks - first_block
+        children = np.random.SeedSequence(seed).spawn(total_blocks)[first_block:first_block + num_blocks]
+        self.block_size = block_size
+        self.start = first_block * block_size
+        self.stop = min(num_agents, (first_block + num_blocks) * block_size)
+        self.generators = [np.random.Generator(np.random.PCG64(child)) for child in children]
+
+    def uniform(self, first=0, stop=None):
+        """
+        One uniform draw in [0, 1) per covered agent, or only for the agents of blocks [first, stop)
+        (counted from the first covered block).
+        """
+        stop = len(self.generators) if stop is None else stop
+        lo = self.start + first * self.block_size
+        out = np.empty(min(self.stop, self.start + stop * self.block_size) - lo)
+        for i, gen in enumerate(self.generators[first:stop]):
+            gen.random(out=out[i * self.block_size:(i + 1) * self.block_size])
+        return out
+
+    @property
+    def state(self):
+        return [gen.bit_generator.state for gen in self.generators]
+
+    @state.setter
+    def state(self, states):
+        for gen, state in zip(self.generators, states):
+            gen.bit_generator.state = state
+
+def rule_actions(price, last, risk_taker, draws):
+    """
+    RuleBasedAgent.decide over arrays: buy if the price dropped below last, sell if it rose,
+    and risk takers invest when their draw is below 0.2. draws may carry a leading replica
+    axis (ensemble.py), with price and last broadcasting against it.
+    """
+    last = np.where(np.isnan(last), price, last)
+    actions = np.empty(np.shape(draws), dtype=np.uint8)
+    actions[...] = np.where(price < last, BUY, np.where(price > last, SELL, HOLD))
+    actions[risk_taker & (draws < 0.2)] = INVEST
+    return actions
+
+def apply_actions(actions, price, wealth):
+    """
+    Apply buy/sell/invest effects to wealth in place and return per-action counts of effective
+    actions. Buys only go through for agents that can afford the price, as in Economy._apply_action.
+    With a leading replica axis (ensemble.py), price is a (K, 1) column and counts are (K, actions).
+    """
+    buy = (actions == BUY) & (wealth > price)
+    np.subtract(wealth, price, out=wealth, where=buy)
+    np.add(wealth, price, out=wealth, where=actions == SELL)
+    np.multiply(wealth, 1.01, out=wealth, where=actions == INVEST)
+    effective = np.where((actions == BUY) & ~buy, HOLD, actions)
+    if effective.ndim == 1:
+        return np.bincount(effective, minlength=len(ACTIONS))
+    # One bincount over all replicas, each offset into its own row of counts
+    rows = np.arange(len(effective))[:, None] * len(ACTIONS)
+    counts = np.bincount((rows + effective).ravel(), minlength=len(effective) * len(ACTIONS))
+    return counts.reshape(len(effective), len(ACTIONS))
+
+class AgentView:
+    """
+    Lightweight per-agent handle into an AgentPopulation (reads and writes the arrays).
+    """
+    __slots__ = ('population', 'index')
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    @property
+    def agent_id(self):
+        return self.index
+
+    @property
+    def wealth(self):
+        return float(self.population.wealth[self.index])
+
+    @wealth.setter
+    def wealth(self, value):
+        self.population.wealth[self.index] = value
+
+    @property
+    def risk_profile(self):
+        return self.population.profile_names[self.population.risk[self.index]]
+
+    @property
+    def last_action(self):
+        return ACTIONS[self.population.last_action[self.index]]
+
+class AgentPopulation:
+    """
+    Rule-based household agents stored as arrays: wealth, risk profile, inventory and last action.
+    The last seen price comes from the shared MemoryStore the Economy attaches (rows [0, n)).
+    Behaves like a read-only sequence of AgentView objects for code that walks agents.
+    Randomness comes from per-block AgentStreams derived from seed.
+    """
+    def __init__(self, num_agents, initial_wealth, risk_profiles, seed=None, good='GoodA', initial_inventory=0,
+                 block_size=BLOCK_SIZE):
+        self.profile_names = list(dict.fromkeys(risk_profiles))
+        codes = [self.profile_names.index(p) for p in risk_profiles]
+        self.wealth = np.full(num_agents, float(initial_wealth))
+        # Profiles are assigned round-robin, as in Simulation.reset
+        self.risk = np.resize(np.array(codes, dtype=np.int8), num_agents)
+        self.memory = None
+        self.last_action = np.zeros(num_agents, dtype=np.uint8)
+        self.inventory = np.full(num_agents, float(initial_inventory))  # Units held (order-book mode)
+        self.streams = AgentStreams(seed, num_agents, block_size)
+        self.good = good
+
+    @classmethod
+    def from_arrays(cls, profile_names, wealth, risk, last_action, inventory, streams, good='GoodA'):
+        """
+        Wrap existing arrays (e.g. one shard's slice of shared memory) without copying.
+        """
+        population = cls.__new__(cls)
+        population.profile_names = profile_names
+        population.wealth, population.risk = wealth, risk
+        population.last_action, population.inventory = last_action, inventory
+        population.memory = None
+        population.streams = streams
+        population.good = good
+        return population
+
+    @property
+    def last_price(self):
+        if self.memory is None:
+            return np.nan
+        last = self.memory.last('price')
+        return last if np.ndim(last) == 0 else last[:len(self)]
+
+    def __len__(self):
+        return len(self.wealth)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return AgentView(self, index)
+
+    def __iter__(self):
+        return (AgentView(self, i) for i in range(len(self)))
+
+    def profile_mask(self, name):
+        if name not in self.profile_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.risk == self.profile_names.index(name)
+
+    def uniform(self):
+        """
+        One uniform draw per agent from its block stream.
+        """
+        return self.streams.uniform()
+
+    def rng_state(self):
+        return self.streams.state
+
+    def set_rng_state(self, state):
+        self.streams.state = state
+
+    def reseed(self, seed):
+        self.streams = AgentStreams(seed, len(self), self.streams.block_size)
+
+    def decide(self, env_state, last_price=None):
+        """
+        Vectorized RuleBasedAgent.decide: buy if price dropped, sell if it rose, risk takers may invest.
+        last_price overrides the remembered price (used by shard workers, which hold no memory).
+        """
+        price = env_state['prices'][self.good]
+        last = self.last_price if last_price is None else last_price
+        # Every agent draws each round so streams stay aligned whatever the profile mix
+        actions = rule_actions(price, last, self.profile_mask('risk_taker'), self.uniform())
+        self.last_action[:] = actions
+        return actions
+
+    def apply(self, actions, price):
+        """
+        Apply buy/sell/invest effects in place and return per-action counts of effective actions.
+        """
+        return apply_actions(actions, price, self.wealth)
\ No newline at end of file
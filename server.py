@@ -0,0 +1,584 @@
+"""
+Local simulation server for the Virtual Economy Simulator.
+An asyncio HTTP + websocket server (standard library only) hosting many Simulation sessions.
+Sessions live in a pool of worker processes, so stepping never blocks the event loop; clients
+create, step, run, pause, checkpoint and destroy sessions with JSON requests and receive
+snapshots over a websocket at a per-client rate. client.py is the matching Python client.
+
+Example:
+    python server.py --port 8765 --workers 4
+
+Routes:
+    GET    /health                      server status
+    GET    /sessions                    list sessions
+    POST   /sessions                    create a session; body: config overrides, e.g. {"NUM_AGENTS": 10000}
+    GET    /sessions/<id>               latest snapshot summary
+    POST   /sessions/<id>/step          step now; body: {"rounds": N}
+    POST   /sessions/<id>/run           step in the background; body: {"rounds": N or null, "every": K}
+    POST   /sessions/<id>/pause         stop a background run after its current batch
+    GET    /sessions/<id>/checkpoint    checkpoint bytes (application/octet-stream)
+    POST   /sessions/<id>/restore       restore from checkpoint bytes
+    DELETE /sessions/<id>               destroy the session
+    GET    /sessions/<id>/stream        websocket of snapshots; query: rate=<per second>, wealths=1
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing as mp
+import secrets
+import struct
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import config
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+TEXT, BINARY, CLOSE, PING, PONG = 0x1, 0x2, 0x8, 0x9, 0xA  # Websocket opcodes
+MAX_BODY = 1 << 30  # Largest accepted request body (checkpoint uploads)
+# Config keys a client may override when creating a session. File paths, LLM endpoints and
+# keys stay as the server operator configured them.
+SESSION_KEYS = frozenset({
+    'NUM_AGENTS', 'NUM_BUSINESSES', 'NUM_ROUNDS', 'GOODS', 'INITIAL_WEALTH', 'INITIAL_BUSINESS_WEALTH',
+    'INITIAL_INVENTORY', 'RISK_PROFILES', 'MEMORY_LENGTH', 'AGENT_BACKEND', 'NUM_SHARDS', 'RNG_BLOCK_SIZE',
+    'USE_LLM', 'LLM_MAX_TOKENS', 'LLM_TEMPERATURE', 'LLM_BATCH_SIZE',
+    'ENABLE_UBI', 'UBI_AMOUNT', 'ENABLE_WEALTH_TAX', 'WEALTH_TAX_RATE', 'POLICIES',
+    'ENABLE_MARKET_SHOCKS', 'SHOCK_PROBABILITY', 'CUSTOM_NEWS', 'MARKET_MODE', 'ORDER_SPREAD',
+    'NETWORK_TYPE', 'NETWORK_DEGREE', 'NETWORK_REWIRE', 'NETWORK_PRICE_SENSITIVITY', 'NETWORK_PRICE_NOISE',
+    'NETWORK_NEWS_SEED', 'NETWORK_NEWS_SPREAD', 'NETWORK_NEWS_DECAY',
+    'SAVE_RESULTS', 'ACTION_LOG', 'ACTION_LOG_CHUNK_ROUNDS', 'ACTION_LOG_KEYFRAME_EVERY', 'ENABLE_METRICS', 'RANDOM_SEED',
+})
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class SessionError(Exception):
+    """
+    A command failed inside the worker hosting the session.
+    """
+
+# --- Worker processes ---
+def summarize(sim, wealths=False):
+    """
+    (summary, wealth bytes or None): round, prices, Gini, news and wealth quantiles of a Simulation,
+    plus its household wealth as little-endian float64 bytes when wealths is set.
+    """
+    snapshot = sim.snapshot()
+    values = snapshot['wealths']
+    summary = {name: snapshot[name] for name in ('round', 'done', 'prices', 'gini', 'news')}
+    summary['wealth'] = None
+    if len(values):
+        p10, p50, p90 = np.percentile(values, [10, 50, 90])
+        summary['wealth'] = {'mean': float(values.mean()), 'min': float(values.min()), 'p10': float(p10),
+                             'p50': float(p50), 'p90': float(p90), 'max': float(values.max())}
+    return summary, values.astype('<f8').tobytes() if wealths else None
+
+def _worker_main(conn):
+    from simulation import Simulation
+    from sweep import default_params
+    sessions = {}
+    for command, session_id, args in iter(conn.recv, None):
+        try:
+            if command == 'create':
+                sim = Simulation(default_params(**args))
+                sim.isolate()  # Sessions sharing this process interleave their rounds
+                sessions[session_id] = sim
+                result = summarize(sim)
+            elif command == 'step':
+                rounds, wealths = args
+                sim = sessions[session_id]
+                for _ in range(rounds):
+                    if sim.done:
+                        break
+                    sim.step()
+                result = summarize(sim, wealths)
+            elif command == 'checkpoint':
+                result = sessions[session_id].checkpoint()
+            elif command == 'restore':
+                sessions[session_id].restore(args)
+                result = summarize(sessions[session_id])
+            elif command == 'destroy':
+                sessions.pop(session_id).env.close()
+                result = None
+            else:
+                raise ValueError(f"Unknown command {command!r}")
+            conn.send((True, result))
+        except Exception as exc:
+            conn.send((False, f"{type(exc).__name__}: {exc}"))
+    for sim in sessions.values():
+        sim.env.close()
+
+def _shutdown(workers):
+    for worker in workers:
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+    for worker in workers:
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.terminate()
+        worker.conn.close()
+
+class Worker:
+    """
+    One worker process and its pipe; call() is blocking and runs one command at a time.
+    """
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        # Not a daemon, so sessions can start their own shard workers (NUM_SHARDS > 1)
+        self.process = ctx.Process(target=_worker_main, args=(child,))
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+        self.num_sessions = 0
+
+    def call(self, command, session_id=None, args=None):
+        with self.lock:
+            self.conn.send((command, session_id, args))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise SessionError(result)
+        return result
+
+# --- Websocket framing ---
+def encode_frame(opcode, payload, mask=False):
+    """
+    One final websocket frame; clients must mask their frames, servers must not.
+    """
+    head = bytes([0x80 | opcode])
+    length = len(payload)
+    bit = 0x80 if mask else 0
+    if length < 126:
+        head += bytes([bit | length])
+    elif length < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack('>H', length)
+    else:
+        head += bytes([bit | 127]) + struct.pack('>Q', length)
+    if not mask:
+        return head + payload
+    key = secrets.token_bytes(4)
+    return head + key + unmask(payload, key)
+
+def unmask(payload, key):
+    data = np.frombuffer(payload, dtype=np.uint8)
+    pad = np.resize(np.frombuffer(key, dtype=np.uint8), len(data))
+    return (data ^ pad).tobytes()
+
+def parse_frame_header(head):
+    """
+    (opcode, masked, length code) from the first two bytes of a frame.
+    """
+    return head[0] & 0x0F, bool(head[1] & 0x80), head[1] & 0x7F
+
+async def _read_frame(reader):
+    opcode, masked, length = parse_frame_header(await reader.readexactly(2))
+    if length == 126:
+        length = struct.unpack('>H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', await reader.readexactly(8))[0]
+    key = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    return opcode, unmask(payload, key) if masked else payload
+
+# --- HTTP ---
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "Bad Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
+
+def _response(status, payload, keep_alive=True):
+    if isinstance(payload, bytes):
+        body, content_type = payload, 'application/octet-stream'
+    else:
+        body, content_type = json.dumps(payload).encode(), 'application/json'
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+class RateLimiter:
+    """
+    Token bucket per client key: rate requests per second with bursts of up to burst (0 disables).
+    A bucket left idle long enough to refill is the same as no bucket, so those are dropped.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.idle = self.burst / rate if rate else 0.0  # Seconds for an empty bucket to refill
+        self.buckets = {}
+        self._swept = time.monotonic()
+
+    def allow(self, key):
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        if now - self._swept >= self.idle:
+            self.buckets = {k: (tokens, last) for k, (tokens, last) in self.buckets.items() if now - last < self.idle}
+            self._swept = now
+        tokens, last = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - allowed, now)
+        return allowed
+
+# --- Sessions ---
+class StreamClient:
+    """
+    One websocket subscriber. Only the newest pending snapshot is kept, so a slow or
+    rate-limited client skips rounds instead of queueing them.
+    """
+    def __init__(self, writer, rate, wealths):
+        self.writer = writer
+        self.interval = 1.0 / rate if rate else 0.0
+        self.wealths = wealths
+        self.pending = None
+        self.skipped = 0
+        self.ready = asyncio.Event()
+
+    def offer(self, summary, wealths):
+        # A snapshot without wealth bytes never replaces one that has them
+        if self.pending is not None and self.pending[1] is not None and wealths is None:
+            self.skipped += 1
+            return
+        if self.pending is not None:
+            self.skipped += 1
+        self.pending = (summary, wealths)
+        self.ready.set()
+
+    async def pump(self, session_id):
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                summary, wealths = self.pending
+                self.pending = None
+                follow = self.wealths and wealths is not None
+                message = dict(summary, session=session_id, skipped=self.skipped, wealths_follow=follow)
+                self.writer.write(encode_frame(TEXT, json.dumps(message).encode()))
+                if follow:
+                    self.writer.write(encode_frame(BINARY, wealths))
+                await self.writer.drain()
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+        except ConnectionError:
+            pass
+
+class Session:
+    def __init__(self, session_id, worker, summary):
+        self.id = session_id
+        self.worker = worker
+        self.summary = summary
+        self.lock = asyncio.Lock()  # One worker command at a time per session
+        self.task = None  # Background run
+        self.stopping = False
+        self.clients = set()
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def describe(self):
+        return dict(self.summary, id=self.id, running=self.running, clients=len(self.clients))
+
+    def publish(self, summary, wealths):
+        self.summary = summary
+        for client in self.clients:
+            client.offer(summary, wealths)
+
+class SimulationServer:
+    """
+    Hosts sessions on num_workers processes; each session stays on the worker that created it.
+    """
+    def __init__(self, host=None, port=None, num_workers=None, rate_limit=None, stream_rate=None, max_sessions=None):
+        self.host = host or getattr(config, 'SERVER_HOST', '127.0.0.1')
+        self.port = getattr(config, 'SERVER_PORT', 8765) if port is None else port
+        self.num_workers = num_workers or getattr(config, 'SERVER_WORKERS', 2)
+        self.limiter = RateLimiter(getattr(config, 'SERVER_RATE_LIMIT', 50) if rate_limit is None else rate_limit)
+        self.stream_rate = getattr(config, 'SERVER_STREAM_RATE', 10) if stream_rate is None else stream_rate
+        self.max_sessions = max_sessions or getattr(config, 'SERVER_MAX_SESSIONS', 64)
+        self.sessions = {}
+        self.workers = []
+        self.server = None
+        self._connections = set()  # Open client writers, closed on shutdown
+
+    async def start(self):
+        ctx = mp.get_context()
+        self.workers = [Worker(ctx) for _ in range(self.num_workers)]
+        self._finalizer = weakref.finalize(self, _shutdown, self.workers)
+        self.executor = ThreadPoolExecutor(max_workers=2 * self.num_workers)
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # Resolves port 0
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        for session in list(self.sessions.values()):
+            await self._destroy(session)
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self.server.wait_closed()
+        self._finalizer()
+        self.executor.shutdown()
+
+    async def _call(self, session, command, args=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, session.worker.call, command, session.id, args)
+
+    def _session(self, session_id):
+        if session_id not in self.sessions:
+            raise HTTPError(404, f"No session {session_id!r}")
+        return self.sessions[session_id]
+
+    # --- Lifecycle ---
+    async def create(self, overrides):
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPError(503, "Session limit reached")
+        overrides = {name.upper(): value for name, value in overrides.items()}
+        unknown = [name for name in overrides if not hasattr(config, name)]
+        if unknown:
+            raise HTTPError(400, f"Unknown config keys: {', '.join(unknown)}")
+        locked = sorted(name for name in overrides if name not in SESSION_KEYS)
+        if locked:
+            raise HTTPError(400, f"Config keys not settable per session: {', '.join(locked)}")
+        worker = min(self.workers, key=lambda w: w.num_sessions)
+        session = Session(secrets.token_hex(6), worker, None)
+        worker.num_sessions += 1
+        try:
+            session.summary, _ = await self._call(session, 'create', overrides)
+        except SessionError:
+            worker.num_sessions -= 1
+            raise
+        self.sessions[session.id] = session
+        return session
+
+    async def step(self, session, rounds):
+        if session.running:
+            raise HTTPError(409, "Session is running; pause it first")
+        async with session.lock:
+            summary, wealths = await self._call(session, 'step', (rounds, self._wants_wealths(session)))
+        session.publish(summary, wealths)
+        return summary
+
+    def run(self, session, rounds=None, every=1):
+        if session.running:
+            raise HTTPError(409, "Session is already running")
+        session.stopping = False
+        session.task = asyncio.create_task(self._run(session, rounds, max(1, every)))
+
+    async def _run(self, session, rounds, every):
+        stepped = 0
+        while not session.stopping and (rounds is None or stepped < rounds) and not session.summary['done']:
+            batch = every if rounds is None else min(every, rounds - stepped)
+            async with session.lock:
+                summary, wealths = await self._call(session, 'step', (batch, self._wants_wealths(session)))
+            stepped += batch
+            session.publish(summary, wealths)
+
+    async def pause(self, session):
+        if session.running:
+            session.stopping = True
+            await session.task
+        return session.summary
+
+    async def checkpoint(self, session):
+        async with session.lock:
+            return await self._call(session, 'checkpoint')
+
+    async def restore(self, session, data):
+        if session.running:
+            raise HTTPError(409, "Session is running; pause it first")
+        async with session.lock:
+            summary, _ = await self._call(session, 'restore', data)
+        session.publish(summary, None)
+        return summary
+
+    async def _destroy(self, session):
+        await self.pause(session)
+        self.sessions.pop(session.id, None)
+        for client in list(session.clients):
+            client.writer.write(encode_frame(CLOSE, struct.pack('>H', 1000)))
+            client.writer.close()
+        async with session.lock:
+            await self._call(session, 'destroy')
+        session.worker.num_sessions -= 1
+
+    @staticmethod
+    def _wants_wealths(session):
+        return any(client.wealths for client in session.clients)
+
+    # --- HTTP ---
+    async def _dispatch(self, method, parts, body):
+        payload = {}
+        if body and parts[-1:] != ['restore']:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "Expected a JSON object")
+        if parts == ['health']:
+            return 200, {'sessions': len(self.sessions), 'workers': len(self.workers),
+                         'alive': sum(w.process.is_alive() for w in self.workers)}
+        if parts == ['sessions']:
+            if method == 'GET':
+                return 200, [session.describe() for session in self.sessions.values()]
+            if method == 'POST':
+                return 201, (await self.create(payload)).describe()
+        elif len(parts) == 2 and parts[0] == 'sessions':
+            session = self._session(parts[1])
+            if method == 'GET':
+                return 200, session.describe()
+            if method == 'DELETE':
+                await self._destroy(session)
+                return 200, {'id': session.id, 'destroyed': True}
+        elif len(parts) == 3 and parts[0] == 'sessions':
+            session, action = self._session(parts[1]), parts[2]
+            if (method, action) == ('POST', 'step'):
+                return 200, await self.step(session, int(payload.get('rounds', 1)))
+            if (method, action) == ('POST', 'run'):
+                rounds = payload.get('rounds')
+                self.run(session, None if rounds is None else int(rounds), int(payload.get('every', 1)))
+                return 202, session.describe()
+            if (method, action) == ('POST', 'pause'):
+                await self.pause(session)
+                return 200, session.describe()
+            if (method, action) == ('GET', 'checkpoint'):
+                return 200, await self.checkpoint(session)
+            if (method, action) == ('POST', 'restore'):
+                return 200, await self.restore(session, body)
+        else:
+            raise HTTPError(404, "Not found")
+        raise HTTPError(405, f"{method} not allowed here")
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if peer else ''
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as exc:
+                    writer.write(_response(exc.status, {'error': str(exc)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                url = urlsplit(target)
+                parts = [part for part in url.path.split('/') if part]
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                if not self.limiter.allow(client):
+                    status, payload = 429, {'error': "Rate limit exceeded"}
+                elif headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(reader, writer, parts, query, headers)
+                    break
+                else:
+                    try:
+                        status, payload = await self._dispatch(method, parts, body)
+                    except HTTPError as exc:
+                        status, payload = exc.status, {'error': str(exc)}
+                    except SessionError as exc:
+                        status, payload = 400, {'error': str(exc)}
+                    except (ValueError, TypeError, AttributeError) as exc:
+                        status, payload = 400, {'error': f"Bad request: {exc}"}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _websocket(self, reader, writer, parts, query, headers):
+        if len(parts) != 3 or parts[0] != 'sessions' or parts[2] != 'stream' or parts[1] not in self.sessions:
+            writer.write(_response(404, {'error': "No such stream"}, keep_alive=False))
+            return
+        session = self.sessions[parts[1]]
+        key = headers.get('sec-websocket-key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode('latin-1'))
+        # Clients may ask for a lower rate than the server's cap, never a higher one
+        try:
+            rate = float(query.get('rate', self.stream_rate) or 0)
+        except ValueError:
+            rate = self.stream_rate
+        if self.stream_rate:
+            rate = min(rate, self.stream_rate) if rate > 0 else self.stream_rate
+        stream = StreamClient(writer, rate, query.get('wealths', '0') not in ('0', '', 'false'))
+        session.clients.add(stream)
+        stream.offer(session.summary, None)  # Current state right away
+        pump = asyncio.create_task(stream.pump(session.id))
+        try:
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == CLOSE:
+                    writer.write(encode_frame(CLOSE, payload[:2]))
+                    break
+                if opcode == PING:
+                    writer.write(encode_frame(PONG, payload))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            session.clients.discard(stream)
+            pump.cancel()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', help="SERVER_HOST")
+    parser.add_argument('--port', type=int, help="SERVER_PORT (0 picks a free port)")
+    parser.add_argument('--workers', type=int, help="SERVER_WORKERS (session worker processes)")
+    parser.add_argument('--rate-limit', type=float, help="SERVER_RATE_LIMIT (requests per second per client)")
+    parser.add_argument('--stream-rate', type=float, help="SERVER_STREAM_RATE (max snapshots per second per stream)")
+    return parser
+
+async def _serve(args):
+    server = await SimulationServer(args.host, args.port, args.workers, args.rate_limit, args.stream_rate).start()
+    print(f"Serving on http://{server.host}:{server.port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
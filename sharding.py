@@ -0,0 +1,157 @@
+"""
+Sharded household population for the Virtual Economy Simulator.
+Population arrays live in shared memory; worker processes each own a contiguous range of
+RNG blocks and run decide/apply on their slice in parallel, while the Economy reduces the
+per-shard action counts into supply and demand and runs the government phase afterwards.
+"""
+import multiprocessing as mp
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from population import AgentPopulation, AgentStreams, BLOCK_SIZE
+
+# Shared arrays: name -> dtype
+SHARED_ARRAYS = {'wealth': np.float64, 'risk': np.int8, 'last_action': np.uint8,
+                 'inventory': np.float64, 'draws': np.float64}
+
+def _attach(names, num_agents):
+    segments = {name: shared_memory.SharedMemory(name=shm_name) for name, shm_name in names.items()}
+    arrays = {name: np.ndarray((num_agents,), dtype=SHARED_ARRAYS[name], buffer=segments[name].buf)
+              for name in names}
+    return segments, arrays
+
+def _shard_main(conn, names, num_agents, seed, block_size, first_block, num_blocks, profile_names, good):
+    segments, arrays = _attach(names, num_agents)
+    streams = AgentStreams(seed, num_agents, block_size, first_block, num_blocks)
+    part = slice(streams.start, streams.stop)
+    shard = AgentPopulation.from_arrays(profile_names, arrays['wealth'][part], arrays['risk'][part],
+                                        arrays['last_action'][part], arrays['inventory'][part], streams, good)
+    try:
+        for command, *args in iter(conn.recv, None):
+            if command == 'decide':
+                prices, last_price = args
+                shard.decide({'prices': prices}, last_price=last_price)
+                conn.send(None)
+            elif command == 'apply':
+                conn.send(shard.apply(shard.last_action, args[0]))
+            elif command == 'uniform':
+                arrays['draws'][part] = streams.uniform()
+                conn.send(None)
+            elif command == 'get_state':
+                conn.send(streams.state)
+            elif command == 'set_state':
+                streams.state = args[0]
+                conn.send(None)
+            elif command == 'reseed':
+                streams = shard.streams = AgentStreams(args[0], num_agents, block_size, first_block, num_blocks)
+                conn.send(None)
+    finally:
+        del shard, arrays
+        for segment in segments.values():
+            segment.close()
+
+def _shutdown(workers, segments):
+    for process, conn in workers:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process, conn in workers:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+        conn.close()
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+class ShardedPopulation(AgentPopulation):
+    """
+    AgentPopulation whose decide/apply run in num_shards worker processes over shared memory.
+    Shards split on RNG block boundaries, so results are identical to the single-process
+    population with the same seed, whatever the number of shards. Call close() when done
+    (it also runs at garbage collection / interpreter exit); the arrays stay readable afterwards.
+    """
+    def __init__(self, num_agents, initial_wealth, risk_profiles, seed=None, good='GoodA', initial_inventory=0,
+                 block_size=BLOCK_SIZE, num_shards=2):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy  # Every shard must derive from the same root
+        super().__init__(num_agents, initial_wealth, risk_profiles, seed=seed, good=good,
+                         initial_inventory=initial_inventory, block_size=block_size)
+        self._segments = []
+        names = {}
+        for name, dtype in SHARED_ARRAYS.items():
+            segment = shared_memory.SharedMemory(create=True, size=max(1, num_agents * np.dtype(dtype).itemsize))
+            shared = np.ndarray((num_agents,), dtype=dtype, buffer=segment.buf)
+            if name != 'draws':
+                shared[:] = getattr(self, name)
+                setattr(self, name, shared)
+            else:
+                self._draws = shared
+            self._segments.append(segment)
+            names[name] = segment.name
+        # Parent-side streams are unused; each worker owns its blocks' generators
+        self.streams = None
+        total_blocks = -(-num_agents // block_size)
+        # Shard i owns RNG blocks [bounds[i], bounds[i + 1])
+        self._bounds = np.linspace(0, total_blocks, min(num_shards, max(total_blocks, 1)) + 1).astype(int)
+        ctx = mp.get_context()
+        self._workers = []
+        for first, last in zip(self._bounds[:-1], self._bounds[1:]):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_shard_main, daemon=True,
+                                  args=(child_conn, names, num_agents, seed, block_size, first, last - first,
+                                        self.profile_names, good))
+            process.start()
+            child_conn.close()
+            self._workers.append((process, parent_conn))
+        self._finalizer = weakref.finalize(self, _shutdown, self._workers, self._segments)
+
+    @property
+    def num_shards(self):
+        return len(self._workers)
+
+    def _broadcast(self, command, *args, per_shard=None):
+        for i, (_, conn) in enumerate(self._workers):
+            conn.send((command,) + ((per_shard[i],) if per_shard is not None else args))
+        return [conn.recv() for _, conn in self._workers]
+
+    def uniform(self):
+        self._broadcast('uniform')
+        return self._draws
+
+    def rng_state(self):
+        return [state for shard_states in self._broadcast('get_state') for state in shard_states]
+
+    def set_rng_state(self, state):
+        bounds = self._bounds
+        self._broadcast('set_state', per_shard=[state[a:b] for a, b in zip(bounds[:-1], bounds[1:])])
+
+    def reseed(self, seed):
+        self._broadcast('reseed', seed)
+
+    def decide(self, env_state, last_price=None):
+        last = self.last_price if last_price is None else last_price
+        if np.ndim(last) or np.ndim(env_state['prices'][self.good]):
+            raise ValueError("ShardedPopulation only supports a shared price (no NETWORK_TYPE)")
+        self._broadcast('decide', {self.good: env_state['prices'][self.good]}, float(last))
+        return self.last_action
+
+    def apply(self, actions, price):
+        """
+        Apply in the shards when actions are the shards' own decisions; other action arrays
+        (e.g. with trades masked out in order-book mode) are applied here on the shared arrays.
+        """
+        if actions is not self.last_action:
+            return super().apply(actions, price)
+        return np.sum(self._broadcast('apply', price), axis=0)
+
+    def close(self):
+        # The arrays are views on the segments about to be unmapped: keep private copies so the final
+        # state stays readable (stepping again fails on the closed pipes instead)
+        if self._finalizer.alive:
+            for name in SHARED_ARRAYS:
+                if name != 'draws':
+                    setattr(self, name, np.array(getattr(self, name)))
+            self._draws = None
+        self._finalizer()
\ No newline at end of file
@@ -5,8 +5,14 @@ Encapsulates all logic for running, pausing, resetting, and retrieving results.
 import config
 from agents import BaseAgent, RuleBasedAgent, LLMAgent, BusinessAgent, GovernmentAgent
 from environment import Economy
-from llm_interface import LLMInterface
+from population import AgentPopulation, BLOCK_SIZE
+import numpy as np
+import random
+import threading
 from utils import set_random_seed
+from instrumentation import Metrics, RoundProfiler
+from checkpoint import save_checkpoint, load_checkpoint
+from streaming import SnapshotBus
 
 class Simulation:
     """
@@ -14,34 +20,125 @@ class Simulation:
     """
     def __init__(self, params=None):
         self.params = params or config
+        self.bus = SnapshotBus()  # Subscribers outlive reset()
         self.reset()
 
-    def reset(self):
+    def reset(self, resume=False):
+        if getattr(self, 'env', None) is not None:
+            self.env.close()  # Stop shard workers and flush logs of the previous run
         set_random_seed(self.params.RANDOM_SEED)
+        self._rng_states = None  # Private random/np.random states when isolated (see fork)
         self.round_num = 0
         self.agents = []
-        self.llm_interface = LLMInterface() if getattr(self.params, 'USE_LLM', False) else None
-        for i in range(getattr(self.params, 'NUM_AGENTS', 100)):
+        self.llm_interface = None
+        if getattr(self.params, 'USE_LLM', False):
+            from llm_interface import LLMInterface
+            from llm_cache import PromptCache
+            cache = None
+            if getattr(self.params, 'LLM_CACHE_SIZE', 0):
+                cache = PromptCache(self.params.LLM_CACHE_SIZE, path=getattr(self.params, 'LLM_CACHE_PATH', '') or None,
+                                    wealth_bucket=getattr(self.params, 'LLM_CACHE_WEALTH_BUCKET', 0),
+                                    deterministic_only=getattr(self.params, 'LLM_CACHE_DETERMINISTIC_ONLY', True))
+            self.llm_interface = LLMInterface(
+                model=getattr(self.params, 'LLM_MODEL', None), api_key=getattr(self.params, 'LLM_API_KEY', None),
+                max_tokens=getattr(self.params, 'LLM_MAX_TOKENS', 64), temperature=getattr(self.params, 'LLM_TEMPERATURE', 0.7),
+                api_base=getattr(self.params, 'LLM_API_BASE', None), concurrency=getattr(self.params, 'LLM_CONCURRENCY', None),
+                timeout=getattr(self.params, 'LLM_TIMEOUT', None), retries=getattr(self.params, 'LLM_RETRIES', None),
+                backoff=getattr(self.params, 'LLM_BACKOFF', None), batch_size=getattr(self.params, 'LLM_BATCH_SIZE', None),
+                tokens_per_decision=getattr(self.params, 'LLM_TOKENS_PER_DECISION', None),
+                requeries=getattr(self.params, 'LLM_BATCH_REQUERIES', None),
+                cache=cache)
+        population = self._build_population(resume)
+        for i in range(0 if population is not None else getattr(self.params, 'NUM_AGENTS', 100)):
             risk = self.params.RISK_PROFILES[i % len(self.params.RISK_PROFILES)]
             if getattr(self.params, 'USE_LLM', False):
                 agent = LLMAgent(i, self.params.INITIAL_WEALTH, risk, llm_interface=self.llm_interface)
             else:
                 agent = RuleBasedAgent(i, self.params.INITIAL_WEALTH, risk)
+            agent.inventory = getattr(self.params, 'INITIAL_INVENTORY', 0)
             self.agents.append(agent)
         self.businesses = [BusinessAgent(f"B{i}", self.params.INITIAL_BUSINESS_WEALTH, 'neutral') for i in range(getattr(self.params, 'NUM_BUSINESSES', 5))]
         self.government = GovernmentAgent("GOV", 0, 'neutral')
-        self.env = Economy(self.agents, self.businesses, self.government, self.params)
+        self.metrics = Metrics(trace=getattr(self.params, 'METRICS_TRACE', False)) if getattr(self.params, 'ENABLE_METRICS', False) else None
+        self.profiler = None
+        if getattr(self.params, 'PROFILE_ROUNDS', 0):
+            self.profiler = RoundProfiler(getattr(self.params, 'PROFILE_START_ROUND', 0), self.params.PROFILE_ROUNDS,
+                                          getattr(self.params, 'PROFILE_PATH', 'results/profile.prof'))
+        self.env = Economy(self.agents, self.businesses, self.government, self.params, population=population, metrics=self.metrics)
+        if self.metrics is not None and self.llm_interface is not None:
+            self.metrics.watch('llm_calls', lambda: self.llm_interface.calls)
+            if self.llm_interface.cache is not None:
+                self.metrics.watch('cache_hits', lambda: self.llm_interface.cache.hits)
+                self.metrics.watch('cache_misses', lambda: self.llm_interface.cache.misses)
+        if population is not None:
+            self.agents = population  # Sequence of AgentView handles for consumers
         self.running = False
         self.done = False
 
+    def _build_population(self, resume=False):
+        # Vectorized households: in RAM, sharded across processes or memory-mapped; None for per-object agents
+        if getattr(self.params, 'USE_LLM', False) or getattr(self.params, 'AGENT_BACKEND', 'vectorized') != 'vectorized':
+            return None
+        shards = getattr(self.params, 'NUM_SHARDS', 1)
+        kwargs = dict(seed=self.params.RANDOM_SEED, initial_inventory=getattr(self.params, 'INITIAL_INVENTORY', 0),
+                      block_size=getattr(self.params, 'RNG_BLOCK_SIZE', BLOCK_SIZE))
+        path = getattr(self.params, 'POPULATION_PATH', '')
+        if path:
+            from mapped import MappedPopulation
+            if resume:
+                population = MappedPopulation.open(path)
+            else:
+                population = MappedPopulation(getattr(self.params, 'NUM_AGENTS', 100), self.params.INITIAL_WEALTH,
+                                              self.params.RISK_PROFILES, path,
+                                              chunk_size=getattr(self.params, 'MAP_CHUNK_SIZE', 1 << 20),
+                                              commit_every=getattr(self.params, 'MAP_COMMIT_EVERY', 1), **kwargs)
+        elif shards > 1:
+            from sharding import ShardedPopulation
+            population = ShardedPopulation(getattr(self.params, 'NUM_AGENTS', 100), self.params.INITIAL_WEALTH,
+                                           self.params.RISK_PROFILES, num_shards=shards, **kwargs)
+        else:
+            population = AgentPopulation(getattr(self.params, 'NUM_AGENTS', 100), self.params.INITIAL_WEALTH,
+                                         self.params.RISK_PROFILES, **kwargs)
+        return population
+
     def step(self):
         if not self.done:
-            self.env.step()
-            self.round_num += 1
-            if self.round_num >= getattr(self.params, 'NUM_ROUNDS', 1000):
-                self.done = True
+            self._load_rng()
+            if self.profiler is not None:
+                self.profiler.before_round(self.round_num)
+            if self.metrics is not None:
+                with self.metrics.phase('round'):
+                    self.env.step()
+                self.metrics.end_round(self.round_num)
+            else:
+                self.env.step()
+            if self.profiler is not None:
+                self.profiler.after_round(self.round_num)
+            self._end_round()
         return self.get_state()
 
+    def _load_rng(self):
+        # Isolated simulations draw from their private random/np.random states
+        if self._rng_states is not None:
+            random.setstate(self._rng_states[0])
+            np.random.set_state(self._rng_states[1])
+
+    def _save_rng(self):
+        if self._rng_states is not None:
+            self._rng_states = (random.getstate(), np.random.get_state())
+
+    def _end_round(self):
+        # Bookkeeping after env.step(): round counter, private RNG states, restart points and keyframes
+        self.round_num += 1
+        self._save_rng()
+        if self.round_num >= getattr(self.params, 'NUM_ROUNDS', 1000):
+            self.done = True
+        if hasattr(self.env.population, 'commit'):
+            self.env.population.commit(self)
+        every = getattr(self.params, 'ACTION_LOG_KEYFRAME_EVERY', 0)
+        if self.env.action_log is not None and every and self.round_num % every == 0:
+            self.env.action_log.add_keyframe(self.round_num, self.checkpoint())
+
     def run(self, max_steps=None):
         steps = max_steps or getattr(self.params, 'NUM_ROUNDS', 1000)
         for _ in range(steps):
@@ -61,9 +158,181 @@ class Simulation:
             'done': self.done,
         }
 
+    def snapshot(self):
+        """
+        Compact, immutable view of the current round: household wealth (read-only copy),
+        prices, Gini and news, plus round metadata.
+        """
+        env = self.env
+        wealths = env.wealths()  # Always a fresh array, so freezing it is safe
+        wealths.flags.writeable = False
+        return {
+            'round': self.round_num,
+            'done': self.done,
+            'wealths': wealths,
+            'prices': {name: good.price for name, good in env.market.goods.items()},
+            'gini': env.gini_history[-1] if env.gini_history else env.inequality_stats()['gini'],
+            'news': env.news,
+        }
+
+    def stream(self, every=1, max_rounds=None):
+        """
+        Step the simulation and yield a snapshot every `every` rounds (and on the last round),
+        publishing each one to self.bus subscribers as well.
+        """
+        every = max(1, every)
+        steps = 0
+        while not self.done and (max_rounds is None or steps < max_rounds):
+            self.step()
+            steps += 1
+            if self.done or self.round_num % every == 0:
+                snapshot = self.snapshot()
+                self.bus.publish(snapshot)
+                yield snapshot
+
+    def subscribe(self, maxsize=4, block=False):
+        return self.bus.subscribe(maxsize, block)
+
+    def checkpoint(self, path=None):
+        """
+        Save the full simulation state; returns bytes when no path is given.
+        """
+        return save_checkpoint(self, path)
+
+    def restore(self, source):
+        load_checkpoint(self, source)
+        self._save_rng()
+        self._restart_action_log()
+
+    def _restart_action_log(self):
+        # Logged rounds no longer lead to the restored state, so the log starts over from it
+        if self.env.action_log is not None:
+            self.env.action_log.restart(self.round_num, self.checkpoint())
+
+    def resume(self):
+        """
+        Reopen the memory-mapped run in POPULATION_PATH at its last committed round, e.g. after a crash.
+        """
+        self.reset(resume=True)
+        load_checkpoint(self, self.env.population.state_path)
+        self._save_rng()
+        self._restart_action_log()
+        return self.get_state()
+
+    def fork(self, branches, seeds=None):
+        """
+        Create one Simulation per params namespace in branches (None keeps this simulation's
+        params), each continuing from the current state. Forks keep private copies of the
+        random/np.random states, so branches can be stepped in any interleaving. With seeds,
+        each branch is reseeded after restoring so identical params still diverge.
+        """
+        parent_states = (random.getstate(), np.random.get_state())
+        data = self.checkpoint()
+        forks = []
+        for i, params in enumerate(branches):
+            params = params or self.params
+            path = getattr(params, 'POPULATION_PATH', '')
+            if path and path == getattr(self.params, 'POPULATION_PATH', ''):
+                raise ValueError("Forks of a memory-mapped run need their own POPULATION_PATH")
+            history_path = getattr(params, 'HISTORY_PATH', '')
+            if history_path and history_path == getattr(self.params, 'HISTORY_PATH', ''):
+                raise ValueError("Forks that spill history need their own HISTORY_PATH")
+            sim = Simulation(params)
+            sim.restore(data)
+            if seeds is not None:
+                set_random_seed(seeds[i])
+                if sim.env.population is not None:
+                    sim.env.population.reseed(seeds[i])
+            sim.isolate()
+            forks.append(sim)
+        random.setstate(parent_states[0])
+        np.random.set_state(parent_states[1])
+        return forks
+
+    def isolate(self):
+        """
+        Keep private copies of the current random/np.random states, so this simulation can be
+        stepped interleaved with others (forks, server sessions) and stay reproducible.
+        """
+        self._rng_states = (random.getstate(), np.random.get_state())
+
     def set_running(self, running=True):
         self.running = running
 
     def set_params(self, params):
         self.params = params
-        self.reset() 
\ No newline at end of file
+        self.reset() 
+
+class SimulationWorker:
+    """
+    Runs a Simulation in a background thread and publishes snapshots for polling UIs.
+    A Simulation.snapshot() is published every publish_every rounds, both for latest()
+    and to the simulation's SnapshotBus.
+    """
+    def __init__(self, sim, publish_every=10):
+        self.sim = sim
+        self.publish_every = max(1, publish_every)
+        self.lock = threading.Lock()
+        self._active = threading.Event()
+        self._stopped = False
+        self._snapshot = self._make_snapshot()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _make_snapshot(self):
+        snapshot = self.sim.snapshot()
+        self.sim.bus.publish(snapshot)
+        return snapshot
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            if self._stopped:
+                return
+            with self.lock:
+                self.sim.step()
+                if self.sim.done or self.sim.round_num % self.publish_every == 0:
+                    self._snapshot = self._make_snapshot()
+            if self.sim.done:
+                self._active.clear()
+
+    @property
+    def running(self):
+        return self._active.is_set() and not self.sim.done
+
+    def resume(self):
+        self.sim.set_running(True)
+        self._active.set()
+
+    def pause(self):
+        self._active.clear()
+        with self.lock:
+            self.sim.set_running(False)
+            self._snapshot = self._make_snapshot()
+
+    def stop(self):
+        self._stopped = True
+        self._active.set()
+        self._thread.join()
+
+    def latest(self):
+        return self._snapshot
+
+    def history_since(self, start, stop):
+        """
+        Price and Gini history for rounds [start, stop), read under the step lock.
+        """
+        with self.lock:
+            prices = {name: history[start:stop] for name, history in self.sim.env.market.history.items()}
+            return prices, self.sim.env.gini_history[start:stop]
+
+    def history_points(self, start, stop, points):
+        """
+        Mean price and Gini over at most `points` buckets of rounds [start, stop), read from the
+        history tiers (so the cost does not grow with the run), plus the first round of each bucket.
+        """
+        with self.lock:
+            env = self.sim.env
+            prices = {name: history.query(start, stop, points)['mean'] for name, history in env.market.history.items()}
+            gini = env.gini_history.query(start, stop, points)
+            return gini['round'], prices, gini['mean']
\ No newline at end of file
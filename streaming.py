@@ -0,0 +1,129 @@
+"""
+Snapshot streaming for the Virtual Economy Simulator.
+Simulation.stream() yields compact per-round snapshots and publishes them on a SnapshotBus,
+where any number of subscribers (writers, plotters, metrics) read through bounded queues.
+"""
+import queue
+import threading
+
+_CLOSED = object()  # Queue sentinel: no more snapshots
+
+class Subscription:
+    """
+    Bounded queue of snapshots for one consumer. When full, a blocking subscription makes
+    the publisher wait (backpressure); otherwise the oldest queued snapshot is dropped.
+    Iterating yields snapshots until the bus or the subscription is closed. Once closed, put()
+    returns at once and a publisher waiting for a slot is released.
+    """
+    def __init__(self, bus, maxsize=4, block=False):
+        self.bus = bus
+        self.maxsize = max(1, maxsize)
+        self.block = block
+        # Unbounded underneath so the close sentinel always fits; maxsize bounds snapshots only
+        self.queue = queue.Queue()
+        self.dropped = 0
+        self.errors = 0  # Exceptions raised by an attached callback
+        self.closed = False
+        self.thread = None
+        self._slots = threading.Semaphore(self.maxsize)
+        self._lock = threading.Lock()
+
+    def put(self, snapshot):
+        if self.closed:
+            return
+        if self.block:
+            self._slots.acquire()
+            if not self.closed:
+                self.queue.put(snapshot)
+            return
+        with self._lock:
+            while self.queue.qsize() >= self.maxsize:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    break
+            self.queue.put(snapshot)
+
+    def get(self, timeout=None):
+        """
+        Next snapshot, or None once closed (raises queue.Empty on timeout).
+        """
+        snapshot = self.queue.get(timeout=timeout)
+        if snapshot is _CLOSED:
+            self.queue.put(_CLOSED)  # Keep later get() calls returning None
+            return None
+        if self.block:
+            self._slots.release()
+        return snapshot
+
+    def __iter__(self):
+        return iter(self.get, None)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.bus.unsubscribe(self)
+        if self.block:
+            for _ in range(self.maxsize):
+                self._slots.release()  # Wake a publisher blocked on a full queue
+        self.queue.put(_CLOSED)
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+class SnapshotBus:
+    """
+    Fan-out of snapshots to subscribers. Snapshots are immutable (read-only arrays), so every
+    subscriber receives the same objects without copying.
+    """
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=4, block=False):
+        subscription = Subscription(self, maxsize, block)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def attach(self, fn, maxsize=4, block=False):
+        """
+        Call fn(snapshot) for each snapshot on a background thread. Returns the subscription;
+        close() it (or the bus) and join() to wait for queued snapshots to be handled. By default
+        the oldest snapshot is dropped when fn falls behind; block=True makes the publisher wait.
+        An exception from fn is reported and counted, and the next snapshot is still handled.
+        """
+        subscription = self.subscribe(maxsize, block)
+
+        def consume():
+            for snapshot in subscription:
+                try:
+                    fn(snapshot)
+                except Exception as e:
+                    subscription.errors += 1
+                    print(f"Snapshot subscriber error: {e!r}")
+
+        subscription.thread = threading.Thread(target=consume, daemon=True)
+        subscription.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, snapshot):
+        for subscription in self.subscribers:
+            subscription.put(snapshot)
+
+    def close(self):
+        for subscription in self.subscribers:
+            subscription.close()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Parameter sweeps and Monte Carlo runs for the Virtual Economy Simulator.
+Fans Simulation runs out across a process pool and collects compact summary arrays.
+"""
+import hashlib
+import itertools
+import json
+import os
+import types
+import numpy as np
+import config
+
+WEALTH_QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+def default_params(**overrides):
+    """
+    Parameter namespace with the same shape the dashboard builds: config values plus overrides.
+    """
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update(overrides)
+    return types.SimpleNamespace(**values)
+
+def param_grid(base=None, **axes):
+    """
+    Cartesian product of parameter axes, e.g. param_grid(UBI_AMOUNT=[0, 50], WEALTH_TAX_RATE=[0.01, 0.02]).
+    """
+    base = vars(base) if base is not None else vars(default_params())
+    names = list(axes)
+    grid = []
+    for combo in itertools.product(*(axes[name] for name in names)):
+        values = dict(base)
+        values.update(zip(names, combo))
+        grid.append(types.SimpleNamespace(**values))
+    return grid
+
+def run_key(params, seed):
+    """
+    Stable identifier of one (parameters, seed) run, used for resume-on-crash.
+    """
+    values = {name: value for name, value in sorted(vars(params).items()) if name.isupper() and name != 'RANDOM_SEED'}
+    raw = json.dumps(values, sort_keys=True, default=repr) + f"|{seed}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def run_one(values, seed):
+    """
+    Run one simulation in the current process and return only summary arrays.
+    """
+    from simulation import Simulation
+    params = types.SimpleNamespace(**values)
+    params.RANDOM_SEED = seed
+    sim = Simulation(params)
+    for _ in range(params.NUM_ROUNDS):
+        sim.step()
+    market = sim.env.market
+    return {
+        'gini': np.asarray(sim.env.gini_history, dtype=np.float64),
+        'prices': np.column_stack([np.asarray(market.history[name], dtype=np.float64) for name in market.goods]),
+        'wealth_quantiles': np.quantile(sim.env.wealths(), WEALTH_QUANTILES),
+    }
+
+def _load_summary(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def _save_summary(path, summary):
+    # Write then rename, so a crash never leaves a half-written result behind
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **summary)
+    os.replace(tmp_path, path)
+
+def run_sweep(param_sets, seeds, processes=None, results_dir=None):
+    """
+    Run every parameter namespace with every seed across a process pool.
+    Returns a list of (params, seed, summary) in input order. With results_dir, each finished
+    run is saved as <run_key>.npz and runs already on disk are skipped, so a crashed sweep resumes.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed  # Not needed by default_params users (cli.py)
+    runs = [(params, seed) for params in param_sets for seed in seeds]
+    summaries = [None] * len(runs)
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+    todo = []
+    for i, (params, seed) in enumerate(runs):
+        path = os.path.join(results_dir, run_key(params, seed) + '.npz') if results_dir else None
+        if path and os.path.exists(path):
+            summaries[i] = _load_summary(path)
+        else:
+            todo.append((i, path))
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        futures = {pool.submit(run_one, vars(runs[i][0]), runs[i][1]): (i, path) for i, path in todo}
+        for future in as_completed(futures):
+            i, path = futures[future]
+            summaries[i] = future.result()
+            if path:
+                _save_summary(path, summaries[i])
+    return [(params, seed, summary) for (params, seed), summary in zip(runs, summaries)]
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the Virtual Economy Simulator tests.
+The modules live at the repository root, which is put on sys.path here.
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def make_params():
+    """
+    default_params with small, fast defaults; keyword overrides win.
+    """
+    from sweep import default_params
+
+    def make(**overrides):
+        values = dict(NUM_AGENTS=200, NUM_BUSINESSES=5, NUM_ROUNDS=60, SAVE_RESULTS=False, ENABLE_DASHBOARD=False)
+        values.update(overrides)
+        return default_params(**values)
+    return make
+
+def run_to_end(sim):
+    while not sim.done:
+        sim.step()
+    return sim
\ No newline at end of file
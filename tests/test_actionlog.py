@@ -0,0 +1,56 @@
+"""
+Action log replay and diffing.
+"""
+import numpy as np
+import pytest
+from conftest import run_to_end
+from actionlog import ActionLog, Replay, diff_logs
+from simulation import Simulation
+
+MODES = {
+    'dealer': {},
+    'orderbook': dict(MARKET_MODE='orderbook', INITIAL_INVENTORY=2),
+    'network': dict(NETWORK_TYPE='small_world'),
+    'objects': dict(AGENT_BACKEND='objects', NUM_AGENTS=100),
+    'llm': dict(USE_LLM=True, LLM_MODEL='fake', NUM_AGENTS=40),
+    'policies': dict(ENABLE_WEALTH_TAX=True, POLICIES=[{'type': 'transaction_tax', 'rate': 0.01}]),
+}
+
+def outcome(sim):
+    env = sim.env
+    return env.wealths(), env.gini_history.values(), [b.wealth for b in env.businesses], env.government.wealth
+
+def assert_same(a, b):
+    assert np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+    assert a[2:] == b[2:]
+
+@pytest.mark.parametrize('mode', list(MODES))
+def test_replay_reproduces_the_run(make_params, tmp_path, mode):
+    plain = run_to_end(Simulation(make_params(**MODES[mode])))
+    logged = run_to_end(Simulation(make_params(ACTION_LOG=True, ACTION_LOG_KEYFRAME_EVERY=20, **MODES[mode])))
+    assert_same(outcome(logged), outcome(plain))  # Logging does not change the run
+    logged.env.action_log.save(str(tmp_path / 'run.log'))
+    log = ActionLog.load(str(tmp_path / 'run.log'))
+    assert diff_logs(logged.env.action_log, log) is None
+    replay = Replay(log)
+    calls = replay.sim.llm_interface.calls if replay.sim.llm_interface is not None else 0
+    assert_same(outcome(replay.seek(log.stop)), outcome(logged))
+    if replay.sim.llm_interface is not None:
+        assert replay.sim.llm_interface.calls == calls  # Nothing was asked of the model
+    # Seeking back starts from a keyframe and lands on the round a fresh run reaches
+    reference = Simulation(make_params(**MODES[mode]))
+    for _ in range(33):
+        reference.step()
+    assert_same(outcome(replay.seek(33)), outcome(reference))
+
+def test_diff_finds_first_divergence(make_params, tmp_path):
+    scenario = tmp_path / 'spike.json'
+    scenario.write_text('[{"round": 30, "text": "Shortage", "effect": "price_multiplier", "value": 2.0}]')
+    a = run_to_end(Simulation(make_params(ACTION_LOG=True))).env.action_log
+    b = run_to_end(Simulation(make_params(ACTION_LOG=True))).env.action_log
+    spiked = run_to_end(Simulation(make_params(ACTION_LOG=True, SCENARIO_PATH=str(scenario)))).env.action_log
+    assert diff_logs(a, b) is None
+    diff = diff_logs(a, spiked)
+    assert diff['round'] == 30 and len(diff['agents'])
+    assert set(diff['b']) == {'sell'}  # Households sell into the spike
+    assert diff_logs(a, spiked, stop=30) is None
\ No newline at end of file
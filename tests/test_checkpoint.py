@@ -0,0 +1,62 @@
+"""
+Checkpoints restore a run bit for bit.
+"""
+import numpy as np
+import pytest
+from conftest import run_to_end
+from simulation import Simulation
+
+MODES = {
+    'dealer': {},
+    'orderbook': dict(MARKET_MODE='orderbook', INITIAL_INVENTORY=2),
+    'network': dict(NETWORK_TYPE='small_world'),
+    'objects': dict(AGENT_BACKEND='objects'),
+    'llm': dict(USE_LLM=True, LLM_MODEL='fake', NUM_AGENTS=40),
+    'policies': dict(ENABLE_WEALTH_TAX=True, POLICIES=[{'type': 'progressive_tax', 'thresholds': [0, 1000], 'rates': [0, 0.01]},
+                                                       {'type': 'transaction_tax', 'rate': 0.01}]),
+    'sharded': dict(NUM_SHARDS=2, NUM_AGENTS=1000, RNG_BLOCK_SIZE=128),
+}
+
+def state(sim):
+    env = sim.env
+    return (sim.round_num, env.wealths(), env.gini_history.values(), env.market.history['GoodA'].values(),
+            [b.wealth for b in env.businesses], env.government.wealth, dict(env.policies), env.memory.data.copy())
+
+def assert_same(a, b):
+    for x, y in zip(a, b):
+        if isinstance(x, np.ndarray):
+            assert np.array_equal(x, y, equal_nan=True)
+        else:
+            assert x == y
+
+@pytest.mark.parametrize('mode', list(MODES))
+def test_restore_continues_bit_identically(make_params, tmp_path, mode):
+    params = make_params(**MODES[mode])
+    sim = Simulation(params)
+    for _ in range(25):
+        sim.step()
+    data = sim.checkpoint()
+    sim.checkpoint(str(tmp_path / 'run.npz'))
+    expected = state(run_to_end(sim))
+    sim.env.close()
+    for source in (data, str(tmp_path / 'run.npz')):
+        restored = Simulation(params)
+        restored.restore(source)
+        assert restored.round_num == 25
+        assert_same(state(run_to_end(restored)), expected)
+        restored.env.close()
+
+def test_restore_rewinds_the_same_simulation(make_params):
+    sim = Simulation(make_params())
+    for _ in range(10):
+        sim.step()
+    data = sim.checkpoint()
+    expected = state(run_to_end(sim))
+    sim.restore(data)
+    assert sim.round_num == 10 and not sim.done
+    assert_same(state(run_to_end(sim)), expected)
+
+def test_restore_rejects_other_population(make_params):
+    data = Simulation(make_params()).checkpoint()
+    with pytest.raises(ValueError):
+        Simulation(make_params(NUM_AGENTS=100)).restore(data)
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Headless CLI runs.
+"""
+import cli
+
+def test_sharded_run_summary(make_params):
+    summary = cli.run(make_params(NUM_AGENTS=2000, NUM_ROUNDS=10, NUM_SHARDS=2))
+    assert summary['rounds'] == 10
+    assert summary['mean_wealth'] > 0
\ No newline at end of file
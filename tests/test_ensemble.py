@@ -0,0 +1,33 @@
+"""
+Ensemble replicas against separate Simulation runs.
+"""
+import numpy as np
+from conftest import run_to_end
+from ensemble import Ensemble
+from simulation import Simulation
+
+def test_replicas_match_seeded_simulations(make_params):
+    overrides = dict(NUM_AGENTS=500, RNG_BLOCK_SIZE=128, SHOCK_PROBABILITY=0.2, ENABLE_WEALTH_TAX=True,
+                     POLICIES=[{'type': 'transaction_tax', 'rate': 0.01}])
+    ensemble = Ensemble(make_params(**overrides), seeds=[3, 11, 42]).run()
+    assert ensemble.round == 60 and ensemble.done
+    flows = ensemble.flows()
+    for k, seed in enumerate(ensemble.seeds):
+        sim = run_to_end(Simulation(make_params(RANDOM_SEED=seed, **overrides)))
+        assert np.array_equal(ensemble.gini_history[k], sim.env.gini_history.values())
+        assert np.array_equal(ensemble.price_history['GoodA'][k], sim.env.market.history['GoodA'].values())
+        assert np.array_equal(ensemble.wealth[k], sim.env.wealths())
+        assert np.array_equal(flows['transaction_tax']['revenue'][k], sim.env.policy_engine.flows()['transaction_tax']['revenue'])
+        assert ensemble.sims[k].env.government.wealth == sim.env.government.wealth
+    assert not np.array_equal(ensemble.gini_history[0], ensemble.gini_history[1])
+
+def test_replica_continues_alone(make_params):
+    ensemble = Ensemble(make_params(), seeds=[5, 6]).run(30)
+    reference = Simulation(make_params(RANDOM_SEED=6))
+    reference.isolate()
+    for _ in range(30):
+        reference.step()
+    replica = ensemble.sims[1]
+    run_to_end(replica)
+    run_to_end(reference)
+    assert np.array_equal(replica.env.wealths(), reference.env.wealths())
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""
+Economy round: price dynamics.
+"""
+import numpy as np
+import pytest
+from conftest import run_to_end
+from simulation import Simulation
+from sweep import default_params
+
+@pytest.mark.parametrize('backend', ['vectorized', 'objects'])
+def test_default_run_keeps_prices_bounded(backend):
+    # Full default config (1000 rounds); the price step moves at most 1% per round plus rare shocks
+    sim = run_to_end(Simulation(default_params(AGENT_BACKEND=backend, SAVE_RESULTS=False, ENABLE_DASHBOARD=False)))
+    prices = np.concatenate([np.asarray(series.values()) for series in sim.env.market.history.values()])
+    wealth = np.concatenate([sim.env.wealths(), [b.wealth for b in sim.businesses]])
+    assert len(prices) == sim.params.NUM_ROUNDS
+    assert np.isfinite(prices).all() and prices.max() < 1e5
+    assert np.isfinite(wealth).all() and wealth.max() < 1e7
+@pytest.mark.parametrize('backend', ['vectorized', 'objects'])
+def test_metrics_do_not_change_seeded_runs(make_params, backend):
+    runs = [run_to_end(Simulation(make_params(AGENT_BACKEND=backend, RANDOM_SEED=7, ENABLE_METRICS=enabled)))
+            for enabled in (False, True)]
+    plain, timed = runs
+    assert np.array_equal(plain.env.market.history['GoodA'].values(), timed.env.market.history['GoodA'].values())
+    assert np.array_equal(plain.env.wealths(), timed.env.wealths())
+    assert [b.wealth for b in plain.businesses] == [b.wealth for b in timed.businesses]
+    assert plain.metrics is None
+    assert all('time_decide' in record and 'time_apply' in record for record in timed.metrics.rounds)
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+Event timelines.
+"""
+import json
+import os
+import events
+
+def test_timeline_cache_is_bounded(make_params):
+    first = events.timeline_for(make_params(RANDOM_SEED=0))
+    assert events.timeline_for(make_params(RANDOM_SEED=0)) is first
+    for seed in range(1, 2 * events.TIMELINE_CACHE_SIZE):
+        events.timeline_for(make_params(RANDOM_SEED=seed))
+    assert events._cached_timeline.cache_info().currsize == events.TIMELINE_CACHE_SIZE
+    rebuilt = events.timeline_for(make_params(RANDOM_SEED=0))
+    assert rebuilt is not first and list(rebuilt.events()) == list(first.events())
+
+def test_edited_scenario_is_reloaded(make_params, tmp_path):
+    path = tmp_path / 'scenario.json'
+    path.write_text(json.dumps([{'round': 3, 'text': "Port strike"}]))
+    params = make_params(RANDOM_SEED=0, ENABLE_MARKET_SHOCKS=False, SCENARIO_PATH=str(path))
+    assert "Port strike" in [e['text'] for e in events.timeline_for(params).events()]
+    path.write_text(json.dumps([{'round': 3, 'text': "Port reopens"}]))
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))  # Coarse filesystem clocks may not have moved yet
+    texts = [e['text'] for e in events.timeline_for(params).events()]
+    assert "Port reopens" in texts and "Port strike" not in texts
\ No newline at end of file
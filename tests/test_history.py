@@ -0,0 +1,39 @@
+"""
+Multi-resolution history series.
+"""
+import numpy as np
+import pytest
+from history import HistoryStore, Series
+
+def check_buckets(result, raw, start, stop):
+    # Each returned bucket runs from its round to the next bucket's round (the last one to stop)
+    edges = np.append(result['round'], stop)
+    assert edges[0] == start and np.all(np.diff(edges) > 0)
+    for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:])):
+        assert result['min'][i] == raw[lo:hi].min()
+        assert result['max'][i] == raw[lo:hi].max()
+        assert result['mean'][i] == pytest.approx(raw[lo:hi].mean(), rel=1e-9)
+
+@pytest.mark.parametrize('spill', [False, True])
+def test_query_matches_raw_values(tmp_path, spill):
+    raw = np.random.default_rng(1).standard_normal(70000).cumsum()
+    series = Series(capacity=1024, path=str(tmp_path / 'x.npy') if spill else None, spill_rounds=4096)
+    for value in raw:
+        series.append(value)
+    assert np.array_equal(series.values(), raw)
+    for start, stop, points in [(0, 70000, 500), (123, 65432, 300), (5000, 5400, 500), (17, 9000, 40), (0, 300, 100)]:
+        result = series.query(start, stop, points)
+        assert len(result['round']) <= points
+        check_buckets(result, raw, start, stop)
+    series.close()
+
+def test_series_offsets_and_store(tmp_path):
+    store = HistoryStore(path=str(tmp_path), capacity=16, spill_rounds=32)
+    late = store.series('metrics/late', start=100)
+    for value in range(1000):
+        late.append(float(value))
+    assert late.stop == 1100 and late[0] == 0.0 and late[-1] == 999.0
+    result = store.query('metrics/late', 100, 1100, points=50)
+    assert result['round'][0] == 100 and len(result['round']) <= 50
+    check_buckets(dict(result, round=result['round'] - 100), np.arange(1000.0), 0, 1000)
+    store.close()
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+LLM requests against local OpenAI-compatible endpoints.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from conftest import run_to_end
+from llm_cache import PromptCache
+from llm_interface import LLMInterface
+from simulation import Simulation
+
+class Endpoint:
+    """
+    Local /v1/chat/completions server. reply(prompt) gives the answer text, or None for a 500,
+    after delay(prompt) seconds. Records each request's path and prompt, and the most requests
+    it had in flight at once.
+    """
+    def __init__(self, reply=lambda prompt: 'buy', delay=lambda prompt: 0.0):
+        self.reply = reply
+        self.delay = delay
+        self.paths = []
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                endpoint.handle(self, body['messages'][0]['content'])
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def handle(self, request, prompt):
+        with self.lock:
+            self.paths.append(request.path)
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay(prompt))
+            answer = self.reply(prompt)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        if answer is None:
+            request.send_response(500)
+            request.end_headers()
+            return
+        payload = json.dumps({'choices': [{'message': {'content': answer}}]}).encode('utf-8')
+        request.send_response(200)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+@pytest.fixture
+def serve():
+    endpoints = []
+
+    def start(**kwargs):
+        endpoints.append(Endpoint(**kwargs))
+        return endpoints[-1]
+    yield start
+    for endpoint in endpoints:
+        endpoint.server.shutdown()
+
+def slow(prompt):
+    return 3.0
+
+@pytest.mark.parametrize('via', ['api_base', 'openai'])
+def test_timeout_cancels_the_request(serve, monkeypatch, via):
+    endpoint = serve(reply=lambda prompt: None, delay=slow)
+    if via == 'openai':
+        monkeypatch.setenv('OPENAI_BASE_URL', endpoint.url)
+        llm = LLMInterface(model='test', api_key='key', api_base='', timeout=0.5, retries=0)
+    else:
+        llm = LLMInterface(model='test', api_base=endpoint.url, timeout=0.5, retries=0)
+    start = time.perf_counter()
+    actions = llm.get_actions(["Choose one: buy, sell, save, invest"])
+    assert time.perf_counter() - start < 2.5
+    assert len(actions) == 1  # Mock fallback
+    assert endpoint.paths == ['/v1/chat/completions']
+
+def test_simulation_passes_request_settings(serve, make_params):
+    endpoint = serve(reply=lambda prompt: None, delay=slow)
+    params = make_params(NUM_AGENTS=2, NUM_BUSINESSES=1, NUM_ROUNDS=1, AGENT_BACKEND='objects', USE_LLM=True,
+                         LLM_MODEL='test', LLM_API_BASE=endpoint.url, LLM_CACHE_SIZE=0,
+                         LLM_TIMEOUT=0.5, LLM_RETRIES=1, LLM_BACKOFF=0.01)
+    start = time.perf_counter()
+    run_to_end(Simulation(params))
+    assert time.perf_counter() - start < 2.5
+    assert len(endpoint.prompts) == 4  # Each agent: first try and one retry
+
+def test_concurrency_is_bounded(serve):
+    endpoint = serve(delay=lambda prompt: 0.2)
+    llm = LLMInterface(model='test', api_base=endpoint.url, concurrency=3, retries=0)
+    actions = llm.get_actions([f"Agent {i}: choose one: buy, sell, save, invest" for i in range(9)])
+    assert actions == ['buy'] * 9
+    assert len(endpoint.prompts) == 9
+    assert 1 < endpoint.max_in_flight <= 3
+
+def test_results_follow_prompt_order(serve):
+    options = ['buy', 'sell', 'save', 'invest']
+
+    def agent(prompt):
+        return int(prompt.split()[1])
+
+    # Later agents are answered first
+    endpoint = serve(reply=lambda prompt: options[agent(prompt) % 4], delay=lambda prompt: 0.05 * (8 - agent(prompt)))
+    llm = LLMInterface(model='test', api_base=endpoint.url, concurrency=8, retries=0)
+    actions = llm.get_actions([f"Agent {i} chooses" for i in range(8)])
+    assert actions == [options[i % 4] for i in range(8)]
+
+def test_retries_back_off_then_fall_back(serve, capsys):
+    endpoint = serve(reply=lambda prompt: None)
+    llm = LLMInterface(model='test', api_base=endpoint.url, retries=2, backoff=0.1)
+    start = time.perf_counter()
+    actions = llm.get_actions(["Choose one: buy, sell, save, invest"])
+    assert time.perf_counter() - start >= 0.1 + 0.2
+    assert len(endpoint.prompts) == 3
+    assert llm.calls == 3
+    assert actions[0] in ('buy', 'sell', 'save', 'invest', 'hold')  # mock_action
+    assert "LLM error" in capsys.readouterr().out
+    # A request that fails once is answered by its retry
+    failures = iter([True])
+    endpoint = serve(reply=lambda prompt: None if next(failures, False) else 'sell')
+    llm = LLMInterface(model='test', api_base=endpoint.url, retries=2, backoff=0.01)
+    assert llm.get_actions(["Choose one: buy, sell, save, invest"]) == ['sell']
+    assert len(endpoint.prompts) == 2
+
+@pytest.mark.parametrize('cache', [None, PromptCache()])
+def test_sampled_prompts_are_not_merged(serve, cache):
+    endpoint = serve()
+    llm = LLMInterface(model='test', api_base=endpoint.url, temperature=0.7, retries=0, cache=cache)
+    prompt = "Choose one: buy, sell, save, invest"
+    assert llm.get_actions([prompt, prompt]) == ['buy', 'buy']
+    assert endpoint.prompts == [prompt, prompt]
+    # Deterministic answers can be shared
+    llm = LLMInterface(model='test', api_base=endpoint.url, temperature=0, retries=0, cache=PromptCache())
+    assert llm.get_actions([prompt, prompt]) == ['buy', 'buy']
+    assert len(endpoint.prompts) == 3
\ No newline at end of file
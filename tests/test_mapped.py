@@ -0,0 +1,67 @@
+"""
+Memory-mapped population: results match the in-RAM population, and a killed run resumes.
+"""
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+from conftest import ROOT, run_to_end
+from simulation import Simulation
+
+CRASH_SCRIPT = """
+import json, os, signal, sys
+sys.path.insert(0, {root!r})
+from sweep import default_params
+from simulation import Simulation
+sim = Simulation(default_params(**json.loads({overrides!r})))
+for _ in range({rounds}):
+    sim.step()
+os.kill(os.getpid(), signal.SIGKILL)
+"""
+
+def overrides(path, **extra):
+    values = dict(NUM_AGENTS=1000, NUM_BUSINESSES=5, NUM_ROUNDS=50, SAVE_RESULTS=False, ENABLE_DASHBOARD=False,
+                  ENABLE_WEALTH_TAX=True, WEALTH_TAX_RATE=0.01, POPULATION_PATH=path)
+    values.update(extra)
+    return values
+
+def test_mapped_matches_in_ram(tmp_path, make_params):
+    expected = run_to_end(Simulation(make_params(**overrides(''))))
+    mapped = run_to_end(Simulation(make_params(**overrides(str(tmp_path / 'run')))))
+    assert np.array_equal(mapped.env.wealths(), expected.env.wealths())
+    assert np.array_equal(np.asarray(mapped.env.gini_history), np.asarray(expected.env.gini_history))
+
+def test_chunked_mapped_matches_in_ram(tmp_path, make_params):
+    # Several map chunks: chunked statistics and policies agree with the whole-array path
+    expected = run_to_end(Simulation(make_params(**overrides('', RNG_BLOCK_SIZE=64))))
+    mapped = run_to_end(Simulation(make_params(**overrides(str(tmp_path / 'run'), RNG_BLOCK_SIZE=64, MAP_CHUNK_SIZE=256))))
+    assert np.allclose(mapped.env.wealths(), expected.env.wealths(), rtol=1e-12)
+    assert np.allclose(np.asarray(mapped.env.gini_history), np.asarray(expected.env.gini_history), rtol=1e-12)
+
+def test_killed_run_resumes(tmp_path, make_params):
+    path = str(tmp_path / 'run')
+    values = overrides(path)
+    script = CRASH_SCRIPT.format(root=ROOT, overrides=json.dumps(values), rounds=30)
+    result = subprocess.run([sys.executable, '-c', script])
+    assert result.returncode != 0  # Killed, not finished
+    assert os.path.exists(os.path.join(path, 'state.npz'))
+    sim = Simulation(make_params(**values))  # Building the simulation must leave the crashed run intact
+    sim.resume()
+    assert sim.round_num == 30
+    assert not np.all(sim.env.wealths() == sim.params.INITIAL_WEALTH)
+    run_to_end(sim)
+    expected = run_to_end(Simulation(make_params(**overrides(''))))
+    assert np.array_equal(sim.env.wealths(), expected.env.wealths())
+    assert np.array_equal(np.asarray(sim.env.gini_history), np.asarray(expected.env.gini_history))
+
+def test_fresh_run_over_committed_run(tmp_path, make_params):
+    path = str(tmp_path / 'run')
+    run_to_end(Simulation(make_params(**overrides(path, RANDOM_SEED=7))))
+    sim = run_to_end(Simulation(make_params(**overrides(path))))
+    expected = run_to_end(Simulation(make_params(**overrides(''))))
+    assert np.array_equal(sim.env.wealths(), expected.env.wealths())
+    resumed = Simulation(make_params(**overrides(path)))
+    resumed.resume()
+    assert resumed.round_num == 50
+    assert np.array_equal(resumed.env.wealths(), expected.env.wealths())
\ No newline at end of file
@@ -0,0 +1,13 @@
+"""
+Policy specs.
+"""
+import pytest
+from policy import build_policies
+
+def test_unknown_policy_type_is_named(make_params):
+    spec = {'type': 'flat_tax', 'rate': 0.1}
+    with pytest.raises(ValueError, match=r"'flat_tax'.*wealth_tax"):
+        build_policies(make_params(POLICIES=[spec]))
+    assert spec == {'type': 'flat_tax', 'rate': 0.1}
+    with pytest.raises(ValueError, match="None"):
+        build_policies(make_params(POLICIES=[{'rate': 0.1}]))
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Simulation server sessions over HTTP, through client.py.
+"""
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pytest
+from conftest import ROOT
+from client import ServerError, SimulationClient, _read_frame
+from server import RateLimiter, StreamClient
+
+SESSION = dict(NUM_AGENTS=300, NUM_BUSINESSES=5, NUM_ROUNDS=50, SAVE_RESULTS=False)
+
+@contextlib.contextmanager
+def serving(cwd, *args):
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--port', '0', *args],
+                               cwd=cwd, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        assert line.startswith('Serving on'), line
+        client = SimulationClient(port=int(line.rsplit(':', 1)[1]), timeout=60)
+        yield client
+        client.close()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    with serving(tmp_path_factory.mktemp('server'), '--workers', '2', '--rate-limit', '0') as client:
+        yield client
+
+class Touch:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return open, (self.path, 'w')
+
+def test_create_rejects_operator_keys(client):
+    for key, value in (('RESULTS_PATH', '/tmp/elsewhere'), ('LLM_API_BASE', 'http://169.254.169.254/'),
+                       ('POPULATION_PATH', '/'), ('ACTION_LOG_PATH', 'log.npz')):
+        with pytest.raises(ServerError) as error:
+            client.create(**SESSION, **{key: value})
+        assert error.value.status == 400 and key in str(error.value)
+    assert client.sessions() == []
+
+def test_checkpoint_restore_round_trip(client):
+    session = client.create(**SESSION)['id']
+    client.step(session, 10)
+    data = client.checkpoint(session)
+    expected = client.step(session, 10)
+    restored = client.restore(session, data)
+    assert restored['round'] == 10
+    assert client.step(session, 10) == expected
+    client.destroy(session)
+
+def test_restore_never_unpickles(client, tmp_path):
+    session = client.create(**SESSION)['id']
+    marker = tmp_path / 'pwned'
+    buffer = io.BytesIO()
+    np.savez(buffer, header=np.frombuffer(pickle.dumps(Touch(str(marker))), dtype=np.uint8))
+    with pytest.raises(ServerError) as error:
+        client.restore(session, buffer.getvalue())
+    assert error.value.status == 400
+    assert not marker.exists()
+    client.destroy(session)
+
+def test_only_gets_are_retried(monkeypatch):
+    attempts = []
+
+    class Dropped:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def request(self, method, *args, **kwargs):
+            attempts.append(method)
+            raise ConnectionResetError
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(http.client, 'HTTPConnection', Dropped)
+    client = SimulationClient()
+    with pytest.raises(ConnectionError):
+        client.step('abc', 1)
+    assert attempts == ['POST']
+    with pytest.raises(ConnectionError):
+        client.health()
+    assert attempts == ['POST', 'GET', 'GET']
+
+def test_stream_sends_snapshots(client):
+    session = client.create(**SESSION)['id']
+    stream = client.stream(session, wealths=True)
+    first = next(stream)
+    assert first['session'] == session and first['round'] == 0
+    assert 'wealths' not in first  # The state on connect carries no wealth bytes
+    client.step(session, 5)
+    snapshot = next(stream)
+    assert snapshot['round'] == 5
+    assert snapshot['wealths'].shape == (SESSION['NUM_AGENTS'],)
+    stream.close()
+    client.destroy(session)
+
+def test_stream_rate_skips_rounds(client):
+    session = client.create(**SESSION)['id']
+    stream = client.stream(session, rate=0.5)
+    assert next(stream)['round'] == 0
+    start = time.perf_counter()
+    for _ in range(5):
+        client.step(session, 1)
+    snapshot = next(stream)
+    assert time.perf_counter() - start > 1.5  # One snapshot per 2 s
+    assert snapshot['round'] == 5 and snapshot['skipped'] == 4
+    stream.close()
+    client.destroy(session)
+
+def test_stream_client_keeps_only_the_newest_snapshot():
+    class Writer:
+        def __init__(self):
+            self.data = io.BytesIO()
+
+        def write(self, frame):
+            self.data.write(frame)
+
+        async def drain(self):
+            pass
+
+    async def scenario(writer):
+        stream = StreamClient(writer, rate=5, wealths=True)
+        pump = asyncio.create_task(stream.pump('s'))
+        stream.offer({'round': 0}, None)
+        await asyncio.sleep(0.05)
+        stream.offer({'round': 1}, np.zeros(2).tobytes())
+        stream.offer({'round': 2}, None)  # Never replaces a snapshot with wealths
+        stream.offer({'round': 3}, np.ones(2).tobytes())
+        await asyncio.sleep(0.05)
+        sent = writer.data.tell()
+        await asyncio.sleep(0.3)
+        pump.cancel()
+        return sent
+
+    writer = Writer()
+    sent_within_interval = asyncio.run(scenario(writer))
+    writer.data.seek(0)
+    frames = []
+    while writer.data.tell() < len(writer.data.getvalue()):
+        frames.append(_read_frame(writer.data))
+    assert len(frames) == 3
+    messages = [json.loads(payload) for _, payload in frames[:2]]
+    assert [m['round'] for m in messages] == [0, 3]
+    assert [m['skipped'] for m in messages] == [0, 2]
+    assert np.frombuffer(frames[2][1]).tolist() == [1.0, 1.0]
+    assert sent_within_interval == len(frames[0][1]) + 2  # Only round 0 before the interval passed
+
+def test_rate_limit_returns_429(tmp_path):
+    with serving(tmp_path, '--workers', '1', '--rate-limit', '2') as client:
+        client.health()
+        client.health()
+        with pytest.raises(ServerError) as error:
+            client.health()
+        assert error.value.status == 429
+        time.sleep(0.6)
+        assert client.health()['workers'] == 1
+
+def test_rate_limiter_drops_idle_buckets():
+    limiter = RateLimiter(50, burst=5)
+    for key in range(100):
+        assert limiter.allow(key)
+    assert len(limiter.buckets) == 100
+    time.sleep(limiter.idle + 0.05)
+    assert limiter.allow('fresh')
+    assert list(limiter.buckets) == ['fresh']
+
+def test_run_and_pause(client):
+    session = client.create(**dict(SESSION, NUM_ROUNDS=10**6))['id']
+    assert client.run(session)['running']
+    with pytest.raises(ServerError) as error:
+        client.step(session, 1)
+    assert error.value.status == 409
+    time.sleep(0.2)
+    paused = client.pause(session)
+    assert not paused['running'] and paused['round'] > 0
+    time.sleep(0.2)
+    assert client.status(session)['round'] == paused['round']
+    client.run(session, rounds=5)
+    while client.status(session)['running']:
+        time.sleep(0.05)
+    assert client.status(session)['round'] == paused['round'] + 5
+    client.destroy(session)
+
+def test_sessions_step_concurrently(client):
+    solo = client.create(**SESSION)['id']
+    expected = client.step(solo, 20)
+    client.destroy(solo)
+    sessions = [client.create(**SESSION)['id'] for _ in range(2)]
+    results, spans = {}, {}
+
+    def drive(session):
+        own = SimulationClient(port=client.port, timeout=60)
+        start = time.perf_counter()
+        for _ in range(20):
+            results[session] = own.step(session, 1)
+        spans[session] = (start, time.perf_counter())
+        own.close()
+
+    threads = [threading.Thread(target=drive, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(results[session] == expected for session in sessions)
+    (a_start, a_end), (b_start, b_end) = spans.values()
+    assert a_start < b_end and b_start < a_end
+    assert client.health()['workers'] == 2
+    for session in sessions:
+        client.destroy(session)
\ No newline at end of file
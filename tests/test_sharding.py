@@ -0,0 +1,27 @@
+"""
+Sharded population: results do not depend on the number of shards, and close() keeps the state readable.
+"""
+import numpy as np
+import pytest
+from conftest import run_to_end
+from simulation import Simulation
+
+@pytest.mark.parametrize('market', ['dealer', 'orderbook'])
+def test_results_invariant_to_shard_count(make_params, market):
+    results = []
+    for shards in (1, 2, 3):
+        sim = run_to_end(Simulation(make_params(NUM_AGENTS=3000, NUM_ROUNDS=20, RNG_BLOCK_SIZE=256,
+                                                NUM_SHARDS=shards, MARKET_MODE=market, INITIAL_INVENTORY=2)))
+        results.append((sim.env.wealths(), np.asarray(sim.env.gini_history), sim.env.market.goods['GoodA'].price))
+        sim.env.close()
+    for wealths, gini, price in results[1:]:
+        assert np.array_equal(wealths, results[0][0])
+        assert np.array_equal(gini, results[0][1])
+        assert price == results[0][2]
+
+def test_arrays_readable_after_close(make_params):
+    sim = run_to_end(Simulation(make_params(NUM_AGENTS=2000, NUM_ROUNDS=5, NUM_SHARDS=2)))
+    before = sim.env.wealths()
+    sim.env.close()
+    assert np.array_equal(sim.env.wealths(), before)
+    assert sim.env.inequality_stats()['gini'] >= 0
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Snapshot bus: closed or failing subscribers never stall the publisher.
+"""
+import threading
+from streaming import SnapshotBus
+
+def publish_in_thread(bus, snapshots):
+    thread = threading.Thread(target=lambda: [bus.publish(s) for s in snapshots], daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    return not thread.is_alive()
+
+def test_closing_a_full_blocking_subscription_releases_the_publisher():
+    bus = SnapshotBus()
+    subscription = bus.subscribe(maxsize=2, block=True)
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: ([bus.publish(i) for i in range(5)], done.set()), daemon=True)
+    thread.start()
+    assert not done.wait(0.2)  # Blocked on the full queue
+    subscription.close()
+    assert done.wait(5)
+    assert publish_in_thread(bus, range(10))
+
+def test_failing_callback_does_not_stall_publishing():
+    bus = SnapshotBus()
+    seen = []
+
+    def handler(snapshot):
+        seen.append(snapshot)
+        raise RuntimeError("boom")
+
+    subscription = bus.attach(handler, maxsize=1, block=True)
+    assert publish_in_thread(bus, range(20))
+    bus.close()
+    subscription.join(5)
+    assert seen == list(range(20))
+    assert subscription.errors == 20
+
+def test_attach_drops_oldest_by_default():
+    bus = SnapshotBus()
+    release = threading.Event()
+    subscription = bus.attach(lambda snapshot: release.wait(5), maxsize=2)
+    assert publish_in_thread(bus, range(50))
+    release.set()
+    bus.close()
+    subscription.join(5)
+    assert subscription.dropped > 0
\ No newline at end of file
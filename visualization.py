@@ -1,47 +1,126 @@
 """
 Visualization utilities for the Virtual Economy Simulator.
 Plots wealth, prices, Gini coefficient, and agent networks.
+WealthPlotter renders wealth histograms in a background process on one reused Agg figure.
 """
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.pyplot as plt
+import multiprocessing
+import queue
 import numpy as np
 import os
 
+HIST_BINS = 30
+
+class WealthFigure:
+    """
+    Persistent wealth histogram: bars are created once and updated in place for each frame.
+    """
+    def __init__(self, bins=HIST_BINS):
+        self.bins = bins
+        self.fig = Figure(figsize=(8, 4))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self.bars = self.ax.bar(np.arange(bins), np.zeros(bins), width=1.0, align='edge',
+                                color='skyblue', edgecolor='black')
+        self.title = self.ax.set_title("")
+        self.ax.set_xlabel("Wealth")
+        self.ax.set_ylabel("Number of Agents")
+
+    def draw(self, wealths, round_num):
+        counts, edges = np.histogram(wealths, bins=self.bins)
+        for bar, count, left, right in zip(self.bars, counts, edges[:-1], edges[1:]):
+            bar.set_x(left)
+            bar.set_width(right - left)
+            bar.set_height(count)
+        self.ax.set_xlim(edges[0], edges[-1])
+        self.ax.set_ylim(0, max(1, counts.max()) * 1.05)
+        self.title.set_text(f"Wealth Distribution (Round {round_num})")
+
+    def save(self, path):
+        self.fig.savefig(path)
+
 def plot_wealth_distribution(agents, round_num, save_path=None):
     """
     Plot histogram of agent wealth.
     """
-    wealths = [a.wealth for a in agents]
-    plt.figure(figsize=(8, 4))
-    plt.hist(wealths, bins=30, color='skyblue', edgecolor='black')
-    plt.title(f"Wealth Distribution (Round {round_num})")
-    plt.xlabel("Wealth")
-    plt.ylabel("Number of Agents")
+    wealths = np.fromiter((a.wealth for a in agents), dtype=np.float64)
+    figure = WealthFigure()
+    figure.draw(wealths, round_num)
     if save_path:
-        plt.savefig(os.path.join(save_path, f"wealth_{round_num}.png"))
-    plt.close()
+        figure.save(os.path.join(save_path, f"wealth_{round_num}.png"))
+
+def _render_loop(frames, save_path):
+    # Runs in the worker process until the None sentinel arrives
+    os.makedirs(save_path, exist_ok=True)
+    figure = WealthFigure()
+    for wealths, round_num in iter(frames.get, None):
+        figure.draw(wealths, round_num)
+        figure.save(os.path.join(save_path, f"wealth_{round_num}.png"))
+
+class WealthPlotter:
+    """
+    Hands wealth snapshots to a background process that renders wealth_{round}.png files.
+    submit() never blocks: when more than max_pending frames are waiting, new frames are dropped.
+    """
+    def __init__(self, save_path, max_pending=16):
+        self.dropped = 0
+        self.submitted = 0
+        self._frames = multiprocessing.Queue(maxsize=max_pending)
+        self._process = multiprocessing.Process(target=_render_loop, args=(self._frames, save_path), daemon=True)
+        self._process.start()
+
+    def submit(self, wealths, round_num):
+        try:
+            self._frames.put_nowait((np.array(wealths, dtype=np.float64), round_num))
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._frames.put(None)
+        self._process.join()
 
 def plot_price_history(market, save_path=None):
     """
     Plot price history for all goods.
     """
+    fig, ax = plt.subplots()
     for name, history in market.history.items():
-        plt.plot(history, label=name)
-    plt.title("Price History")
-    plt.xlabel("Round")
-    plt.ylabel("Price")
-    plt.legend()
+        ax.plot(history, label=name)
+    ax.set_title("Price History")
+    ax.set_xlabel("Round")
+    ax.set_ylabel("Price")
+    ax.legend()
     if save_path:
-        plt.savefig(os.path.join(save_path, "prices.png"))
-    plt.close()
+        fig.savefig(os.path.join(save_path, "prices.png"))
+    plt.close(fig)
 
 def plot_gini(gini_history, save_path=None):
     """
     Plot Gini coefficient over time.
     """
-    plt.plot(gini_history, color='purple')
-    plt.title("Gini Coefficient Over Time")
-    plt.xlabel("Round")
-    plt.ylabel("Gini Coefficient")
+    fig, ax = plt.subplots()
+    ax.plot(gini_history, color='purple')
+    ax.set_title("Gini Coefficient Over Time")
+    ax.set_xlabel("Round")
+    ax.set_ylabel("Gini Coefficient")
+    if save_path:
+        fig.savefig(os.path.join(save_path, "gini.png"))
+    plt.close(fig)
+
+def plot_network_degrees(network, save_path=None):
+    """
+    Plot the degree distribution of a TradeNetwork (log-log, so scale-free tails show as lines).
+    """
+    counts = np.bincount(network.degree)
+    degrees = np.flatnonzero(counts)
+    fig, ax = plt.subplots()
+    ax.loglog(degrees, counts[degrees], 'o', markersize=3)
+    ax.set_title("Trade Network Degree Distribution")
+    ax.set_xlabel("Degree")
+    ax.set_ylabel("Agents")
     if save_path:
-        plt.savefig(os.path.join(save_path, "gini.png"))
-    plt.close() 
\ No newline at end of file
+        fig.savefig(os.path.join(save_path, "network_degrees.png"))
+    plt.close(fig)
\ No newline at end of file